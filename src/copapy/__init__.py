@@ -34,7 +34,8 @@ Example usage:
 """
 
 from ._target import Target, jit
-from ._basic_types import NumLike, value, generic_sdb, iif
+from ._target_pool import TargetPool
+from ._basic_types import NumLike, value, iif
 from ._vectors import vector, distance, scalar_projection, angle_between, rotate_vector, vector_projection
 from ._quaternion import quaternion
 from ._tensors import tensor, zeros, ones, arange, eye, identity, diagonal, concat
@@ -42,12 +43,17 @@ from ._math import sqrt, abs, sign, sin, cos, tan, asin, acos, atan, atan2, log,
 from ._nn import relu, sigmoid
 from ._autograd import grad
 from ._tensors import tensor as matrix
+from ._graph_file import save_graph, load_graph
 from ._version import __version__  # Run "pip install -e ." to generate _version.py
+from ._basic_types import __getattr__  # generic_sdb is loaded on first use to keep the import fast
 
 
 __all__ = [
     "__version__",
     "Target",
+    "TargetPool",
+    "save_graph",
+    "load_graph",
     "NumLike",
     "value",
     "generic_sdb",
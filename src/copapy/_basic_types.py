@@ -1,6 +1,9 @@
 import pkgutil
+import sys
+import math
+import weakref
 from typing import Any, Sequence, TypeVar, overload, TypeAlias, Generic, Callable
-from ._stencils import stencil_database, detect_process_arch
+from ._stencils import stencil_database, stencil_index, detect_process_arch
 import copapy as cp
 from ._helper_types import TNum
 
@@ -13,6 +16,13 @@ TVarNumb: TypeAlias = 'value[Any] | int | float'
 
 stencil_cache: dict[tuple[str, str], stencil_database] = {}
 
+# Interning table for hash-consing: maps op name and operand Nets
+# (or type and value for anonymous constants) to the resulting Net
+net_table: 'weakref.WeakValueDictionary[tuple[Any, ...], Net]' = weakref.WeakValueDictionary()
+
+# Typed op name and result type for each op name and argument types
+typed_op_table: dict[tuple[str, tuple[str, ...]], tuple[str, str]] = {}
+
 
 def get_var_name(var: Any, scope: dict[str, Any] = globals()) -> list[str]:
     return [name for name, value in scope.items() if value is var]
@@ -27,12 +37,25 @@ def stencil_db_from_package(arch: str = 'native', optimization: str = 'O3') -> s
         arch = detect_process_arch()
     stencil_data = pkgutil.get_data(__name__, f"obj/stencils_{arch}_{optimization}.o")
     assert stencil_data, f"stencils_{arch}_{optimization} not found"
-    sdb = stencil_database(stencil_data)
+    sdb: stencil_database
+    try:
+        # Prefer the precompiled stencil index over parsing the ELF file
+        index_data = pkgutil.get_data(__name__, f"obj/stencils_{arch}_{optimization}.idx")
+        sdb = stencil_index(index_data or b'', stencil_data)
+    except (OSError, ValueError):
+        # No index or index outdated
+        sdb = stencil_database(stencil_data)
     stencil_cache[ci] = sdb
     return sdb
 
 
-generic_sdb = stencil_db_from_package()
+def __getattr__(name: str) -> stencil_database:
+    # The stencil database for the native architecture is loaded on
+    # first use, importing copapy does not load any stencils. This is
+    # also the module __getattr__ of the copapy package.
+    if name == 'generic_sdb':
+        return stencil_db_from_package()
+    raise AttributeError(f"copapy has no attribute {name!r}")
 
 
 def transl_type(t: str) -> str:
@@ -48,10 +71,11 @@ class Node:
         args (list[Net]): The input Nets to this Node.
         name (str): The name of the operation this Node represents.
     """
+    __slots__ = ('args', 'name', '__weakref__')
+
     def __init__(self) -> None:
         self.args: tuple[Net, ...] = tuple()
         self.name: str = ''
-        self.node_hash = 0
 
     def __repr__(self) -> str:
         return f"Node:{self.name}({', '.join(str(a) for a in self.args) if self.args else (self.value if isinstance(self, CPConstant) else '')})"
@@ -65,6 +89,8 @@ class Net:
         dtype (str): The data type of this Net.
         source (Node): The Node that produces the value for this Net.
     """
+    __slots__ = ('dtype', 'source', '__weakref__')
+
     def __init__(self, dtype: str, source: Node):
         self.dtype = dtype
         self.source = source
@@ -74,7 +100,7 @@ class Net:
         return f"{'name:' + names[0] if names else 'h:' + str(hash(self))[-5:]}"
 
     def __hash__(self) -> int:
-        return self.source.node_hash
+        return hash(self.source)
 
     def __eq__(self, other: object) -> bool:
         return isinstance(other, Net) and self.source == other.source
@@ -87,6 +113,8 @@ class value(Generic[TNum]):
     Attributes:
         dtype (str): Data type of this value.
     """
+    __slots__ = ('net', 'dtype')
+
     def __init__(self, source: TNum | Net, dtype: str | None = None):
         """Instance a value.
 
@@ -123,7 +151,7 @@ class value(Generic[TNum]):
 
     def __repr__(self) -> str:
         names = get_var_name(self)
-        return f"{'name:' + names[0] if names else 'h:' + str(self.net.source.node_hash)[-5:]}"
+        return f"{'name:' + names[0] if names else 'h:' + str(hash(self.net))[-5:]}"
 
     @overload
     def __add__(self: 'value[TNum]', other: 'value[TNum] | TNum') -> 'value[TNum]': ...
@@ -334,6 +362,8 @@ class value(Generic[TNum]):
 
 
 class CPConstant(Node):
+    __slots__ = ('value', 'dtype', 'node_hash', 'anonymous')
+
     def __init__(self, value: Any, anonymous: bool = True):
         if isinstance(value, int):
             self.value: int | float =  value
@@ -346,7 +376,8 @@ class CPConstant(Node):
 
         self.name = 'const_' + self.dtype
         self.args = tuple()
-        self.node_hash = hash(value) ^ hash(self.dtype) if anonymous else id(self)
+        # The sign distinguishes -0.0 from 0.0, which compare equal
+        self.node_hash = hash((value, self.dtype, math.copysign(1, value))) if anonymous else id(self)
         self.anonymous = anonymous
 
     def __eq__(self, other: object) -> bool:
@@ -354,13 +385,16 @@ class CPConstant(Node):
                                    isinstance(other, CPConstant) and
                                    other.anonymous and
                                    self.value == other.value and
-                                   self.dtype == other.dtype)
+                                   self.dtype == other.dtype and
+                                   math.copysign(1, self.value) == math.copysign(1, other.value))
 
     def __hash__(self) -> int:
         return self.node_hash
 
 
 class Store(Node):
+    __slots__ = ()
+
     def __init__(self, input: value[Any] | Net | int | float):
         if isinstance(input, value):
             net = input.net
@@ -372,62 +406,25 @@ class Store(Node):
 
         self.name = 'store_' + transl_type(net.dtype)
         self.args = (net,)
-        self.node_hash = hash(self.name) ^ hash(net.source.node_hash)
 
 
 class Op(Node):
+    """An operation in the computation graph. Ops are created by add_op and
+    interned there, so structurally identical ops are the same object and
+    equality is identity.
+
+    Attributes:
+        name (str): The typed name of the operation
+        args (tuple[Net, ...]): The input Nets to this operation
+        commutative (bool): Operands can be swapped
+    """
+    __slots__ = ('commutative',)
+
     def __init__(self, typed_op_name: str, args: Sequence[Net], commutative: bool = False):
         self.name: str = typed_op_name
         self.args: tuple[Net, ...] = tuple(args)
-        self.node_hash = self.get_node_hash(commutative)
         self.commutative = commutative
 
-    def get_node_hash(self, commutative: bool = False) -> int:
-        if commutative:
-            h = hash(self.name) ^ hash(frozenset(a.source.node_hash for a in self.args))
-        else:
-            h = hash(self.name) ^ hash(tuple(a.source.node_hash for a in self.args))
-        return h if h != -1 else -2
-
-    def __eq__(self, other: object) -> bool:
-        if self is other:
-            return True
-        if not isinstance(other, Op):
-            return NotImplemented
-
-        # Traverse graph for both notes. Return false on first difference.
-        # A false inequality result in seldom cases is ok, whereas a false
-        # equality result leads to wrong computation results.
-        nodes: list[tuple[Node, Node]] = [(self, other)]
-        seen: set[tuple[int, int]] = set()
-        while(nodes):
-            s_node, o_node = nodes.pop()
-
-            if s_node.node_hash != o_node.node_hash:
-                return False
-            key = (id(s_node), id(o_node))
-            if key in seen:
-                continue
-            if isinstance(s_node, Op):
-                if (s_node.name.split('_')[0] != o_node.name.split('_')[0] or
-                    len(o_node.args) != len(s_node.args)):
-                    return False
-                if s_node.commutative:
-                    for s_net, o_net in zip(sorted(s_node.args, key=hash),
-                                            sorted(o_node.args, key=hash)):
-                        if s_net is not o_net:
-                            nodes.append((s_net.source, o_net.source))
-                else:
-                    for s_net, o_net in zip(s_node.args, o_node.args):
-                        if s_net is not o_net:
-                            nodes.append((s_net.source, o_net.source))
-            elif s_node != o_node:
-                return False
-            seen.add(key)
-        return True
-
-    def __hash__(self) -> int:
-        return self.node_hash
 
 class ArrayType(Generic[TNum]):
     """Interface for vector and tensor types."""
@@ -440,9 +437,15 @@ class ArrayType(Generic[TNum]):
 
 
 def value_from_number(val: Any) -> value[Any]:
-    # Create anonymous constant that can be removed during optimization
-    new_node = CPConstant(val)
-    new_net = Net(new_node.dtype, new_node)
+    # Create anonymous constant that can be removed during optimization,
+    # equal constants share the same interned Net. The sign is part of the
+    # key, since -0.0 and 0.0 compare equal but give different results
+    key: tuple[Any, ...] = (True, val, math.copysign(1.0, val)) if isinstance(val, float) else (False, val)
+    new_net = net_table.get(key)
+    if new_net is None:
+        new_node = CPConstant(val)
+        new_net = Net(new_node.dtype, new_node)
+        net_table[key] = new_net
     return value(new_net)
 
 
@@ -481,16 +484,44 @@ def add_op(op: str, args: list[value[Any] | int | float], commutative: bool = Fa
     if commutative:
         arg_values = sorted(arg_values, key=lambda a: a.dtype)  # TODO: update the stencil generator to generate only sorted order
 
-    typed_op = '_'.join([op] + [transl_type(a.dtype) for a in arg_values])
+    typed_op, result_type = get_typed_op(op, tuple(a.dtype for a in arg_values))
 
-    if typed_op not in generic_sdb.stencil_definitions:
-        raise NotImplementedError(f"Operation {op} not implemented for {' and '.join([a.dtype for a in arg_values])}")
+    # Hash-consing: return the existing Net if the same op was
+    # already applied to the same operands
+    arg_nets = [av.net for av in arg_values]
+    if commutative:
+        key = (typed_op, *sorted(arg_nets, key=id))
+    else:
+        key = (typed_op, *arg_nets)
 
-    result_type = generic_sdb.stencil_definitions[typed_op].split('_')[0]
+    result_net = net_table.get(key)
+    if result_net is None:
+        result_net = Net(result_type, Op(typed_op, arg_nets, commutative))
+        net_table[key] = result_net
 
-    result_net = Net(result_type, Op(typed_op, [av.net for av in arg_values], commutative))
+    return value(result_net, dtype or result_net.dtype)
 
-    if dtype:
-        result_type = dtype
 
-    return value(result_net, result_type)
+def get_typed_op(op: str, arg_types: tuple[str, ...]) -> tuple[str, str]:
+    """Returns the typed op name and the result type for an op applied to
+    arguments of the given types. The returned name strings are shared by
+    all Ops of the same type.
+
+    Arguments:
+        op: Untyped op name like 'add'
+        arg_types: Data types of the arguments
+
+    Returns:
+        Tuple of typed op name and result data type
+    """
+    entry = typed_op_table.get((op, arg_types))
+    if entry is None:
+        typed_op = '_'.join([op] + [transl_type(t) for t in arg_types])
+        # Only the signature table is required here, no machine code
+        stencil_definitions = stencil_db_from_package().stencil_definitions
+        if typed_op not in stencil_definitions:
+            raise NotImplementedError(f"Operation {op} not implemented for {' and '.join(arg_types)}")
+        result_type = stencil_definitions[typed_op].split('_')[0]
+        entry = (sys.intern(typed_op), result_type)
+        typed_op_table[(op, arg_types)] = entry
+    return entry
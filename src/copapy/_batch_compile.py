@@ -0,0 +1,94 @@
+import os
+from array import array
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Iterable
+from ._basic_types import Net, Node, Store, stencil_db_from_package
+from ._ir import dag_ir, lower_dag
+from ._compile_cache import compile_cache, get_compile_cache, CacheLayout
+from ._target import compile_program, get_flat_values
+
+# Serialized DAG, nodes with nets, arch, optimization, reuse_slots, cache path and size
+CompileJob = tuple[bytes, bytes, str, str, bool, str | None, int]
+
+
+def compile_job(job: CompileJob) -> tuple[bytes, CacheLayout]:
+    """Compiles a serialized DAG. Runs in the worker processes of compile_batch,
+    the stencil database of each arch is loaded once per process.
+
+    Arguments:
+        job: Tuple of serialized DAG, node indices with nets, arch, optimization,
+            reuse_slots option, compile cache path and maximum cache size
+
+    Returns:
+        Tuple of program data and variable layout as list of node index,
+        address and size
+    """
+    ir_data, net_nodes, arch, optimization, reuse_slots, cache_path, cache_size = job
+    ir = dag_ir.from_bytes(ir_data)
+
+    # Placeholder nets mark the nodes that are readable in the traced graph
+    for i in array('i', net_nodes):
+        ir.nets[i] = Net(ir.get_dtype(i), Node())
+
+    sdb = stencil_db_from_package(arch, optimization)
+    cache = compile_cache(cache_path, cache_size) if cache_path else None
+    return compile_program(ir, sdb, reuse_slots, cache=cache)
+
+
+def compile_batch(jobs: Iterable[tuple[Any, str, str]], processes: int | None = None,
+                  reuse_slots: bool = False, executor: Executor | None = None) -> list[tuple[bytes, dict[Net, tuple[int, int, str]]]]:
+    """Compiles many programs on a pool of processes. Each graph is lowered
+    once in this process and shipped to the workers in serialized form.
+
+    Arguments:
+        jobs: Tuples of values to compute (like for Target.compile), arch
+            and optimization level of the stencils
+        processes: Number of worker processes, by default the number of CPUs
+        reuse_slots: Reuse the memory of temporary variables after their last use
+        executor: Process pool to use instead of starting a new one, its workers
+            keep the loaded stencil databases between calls
+
+    Returns:
+        List with a tuple of program data for the runner and variable layout
+        dictionary for each job
+
+    The on-disk compile cache (see set_compile_cache) is used by the workers.
+    With one process or one job the programs are compiled in this process.
+    """
+    job_list = list(jobs)
+    cache = get_compile_cache()
+    cache_path, cache_size = (cache.path, cache.max_size) if cache else (None, 0)
+
+    # Jobs for the same graph and different archs share the lowered DAG
+    lowered: dict[int, tuple[dag_ir, bytes, bytes]] = {}
+    payloads: list[CompileJob] = []
+    irs: list[dag_ir] = []
+    for values, arch, optimization in job_list:
+        if id(values) not in lowered:
+            flat_values: list[Any] = []
+            get_flat_values(values, flat_values)
+            ir = lower_dag([Store(v) for v in flat_values])
+            net_nodes = array('i', (i for i, net in enumerate(ir.nets) if net))
+            lowered[id(values)] = ir, ir.to_bytes(), net_nodes.tobytes()
+        ir, ir_data, net_nodes_data = lowered[id(values)]
+        irs.append(ir)
+        payloads.append((ir_data, net_nodes_data, arch, optimization, reuse_slots, cache_path, cache_size))
+
+    if executor:
+        results = list(executor.map(compile_job, payloads))
+    elif len(payloads) < 2 or processes == 1:
+        results = [compile_job(p) for p in payloads]
+    else:
+        workers = min(processes or os.cpu_count() or 1, len(payloads))
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(compile_job, payloads))
+
+    programs: list[tuple[bytes, dict[Net, tuple[int, int, str]]]] = []
+    for ir, (data, layout) in zip(irs, results):
+        variables: dict[Net, tuple[int, int, str]] = {}
+        for i, addr, size in layout:
+            net = ir.nets[i]
+            assert net, "Compiled layout does not match the DAG"
+            variables[net] = (addr, size, net.dtype)
+        programs.append((data, variables))
+    return programs
@@ -6,6 +6,7 @@ ByteOrder = Literal['little', 'big']
 
 Command = Enum('Command', [('ALLOCATE_DATA', 1), ('COPY_DATA', 2),
                            ('ALLOCATE_CODE', 3), ('COPY_CODE', 4),
+                           ('PATCH_TABLE', 8),
                            ('PATCH_FUNC', 0x1000),
                            ('PATCH_FUNC_ARM32_THM', 0x1005),
                            ('PATCH_OBJECT', 0x2000),
@@ -20,6 +21,40 @@ Command = Enum('Command', [('ALLOCATE_DATA', 1), ('COPY_DATA', 2),
 COMMAND_SIZE = 4
 
 
+def encode_varint(value: int) -> bytes:
+    """Returns the unsigned LEB128 encoding of a value."""
+    assert value >= 0
+    ret = bytearray()
+    while value > 0x7F:
+        ret.append(value & 0x7F | 0x80)
+        value >>= 7
+    ret.append(value)
+    return bytes(ret)
+
+
+def encode_value(value: int | float, num_bytes: int, byteorder: ByteOrder) -> bytes:
+    """Returns the binary representation of a value on the target.
+
+    Arguments:
+        value: Integer or float value
+        num_bytes: Size of the value in bytes
+        byteorder: Byte order of the target
+
+    Returns:
+        Encoded value
+    """
+    if isinstance(value, int):
+        return value.to_bytes(length=num_bytes, byteorder=byteorder, signed=True)
+    # 32 bit or 64 bit float
+    en = {'little': '<', 'big': '>'}[byteorder]
+    if num_bytes == 4:
+        data = struct.pack(en + 'f', value)
+    else:
+        data = struct.pack(en + 'd', value)
+    assert len(data) == num_bytes, (len(data), num_bytes)
+    return data
+
+
 class data_writer():
     def __init__(self, byteorder: ByteOrder):
         self._data: list[tuple[str, bytes, int]] = []
@@ -46,14 +81,30 @@ class data_writer():
         if isinstance(value, int):
             self.write_int(value, num_bytes, True)
         else:
-            # 32 bit or 64 bit float
-            en = {'little': '<', 'big': '>'}[self.byteorder]
-            if num_bytes == 4:
-                data = struct.pack(en + 'f', value)
-            else:
-                data = struct.pack(en + 'd', value)
-            assert len(data) == num_bytes, (len(data), num_bytes)
-            self.write_bytes(data)
+            self.write_bytes(encode_value(value, num_bytes, self.byteorder))
+
+    def write_patch_table(self, patch_type: Command, mask: int, scale: int, entries: list[tuple[int, int]]) -> None:
+        """Writes a PATCH_TABLE command applying patches of one type, mask and scale.
+
+        Arguments:
+            patch_type: Patch command (PATCH_FUNC, PATCH_OBJECT, ...)
+            mask: Bit-mask for all patches
+            scale: Scale factor for all patches
+            entries: Tuples of patch address and value, sorted by address
+        """
+        self.write_com(Command.PATCH_TABLE)
+        self.write_int(patch_type.value)
+        self.write_int(mask)
+        self.write_int(scale, signed=True)
+        self.write_int(len(entries))
+        table = bytearray()
+        last_address = 0
+        for address, value in entries:
+            # Delta encoded addresses and zigzag encoded values
+            table += encode_varint(address - last_address)
+            table += encode_varint(((value << 1) ^ (value >> 31)) & 0xFFFFFFFF)
+            last_address = address
+        self.write_bytes(bytes(table))
 
     def print(self) -> None:
         for name, dat, flag in self._data:
@@ -95,3 +146,29 @@ class data_reader():
         ret = self._data[self._index:self._index + num_bytes]
         self._index += num_bytes
         return ret
+
+    def read_varint(self) -> int:
+        ret = shift = 0
+        while True:
+            byte = self.read_byte()
+            ret |= (byte & 0x7F) << shift
+            shift += 7
+            if byte < 0x80:
+                return ret
+
+    def read_patch_table(self) -> tuple[Command, int, int, list[tuple[int, int]]]:
+        """Reads the arguments of a PATCH_TABLE command.
+
+        Returns:
+            Tuple of patch command, mask, scale and a list of patch address and value tuples
+        """
+        patch_type = Command(self.read_int())
+        mask = self.read_int()
+        scale = self.read_int(signed=True)
+        entries: list[tuple[int, int]] = []
+        address = 0
+        for _ in range(self.read_int()):
+            address += self.read_varint()
+            v = self.read_varint()
+            entries.append((address, (v >> 1) ^ -(v & 1)))
+        return patch_type, mask, scale, entries
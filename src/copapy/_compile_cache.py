@@ -0,0 +1,186 @@
+import hashlib
+import os
+import tempfile
+from typing import Iterable
+from . import _binwrite as binw
+from ._ir import dag_ir
+from ._stencils import stencil_database
+from ._version import __version__
+
+COMPILE_CACHE_VERSION = 2
+CACHE_FILE_SUFFIX = '.cpc'
+
+# Cached variable layout: node index in the lowered DAG, address and size
+CacheLayout = list[tuple[int, int, int]]
+
+
+def get_dag_key(ir: dag_ir, sdb: stencil_database, reuse_slots: bool = False,
+                input_block: Iterable[int] = (), output_block: Iterable[int] = ()) -> str:
+    """Returns a canonical structural hash of a lowered DAG. Two DAGs have
+    the same key if they have the same ops, operands, constant values and
+    inputs and are compiled with the same stencil object file, compiler
+    version and options.
+
+    Arguments:
+        ir: DAG in numbered SSA form as returned by lower_dag
+        sdb: Stencil database used for compiling
+        reuse_slots: Compile option for reusing memory slots
+        input_block: Compile option for the declared inputs (by node index)
+        output_block: Compile option for the declared outputs (by node index)
+
+    Returns:
+        Hex digest of the key
+    """
+    h = hashlib.sha256()
+    h.update(f"{COMPILE_CACHE_VERSION} {__version__} {reuse_slots} {list(input_block)} {list(output_block)}\n".encode())
+    h.update(sdb.obj_hash)
+    h.update('\n'.join(ir.get_name(i) for i in range(len(ir))).encode())
+    h.update(ir.arg_offsets.tobytes())
+    h.update(ir.args.tobytes())
+    h.update(ir.dtypes.tobytes())
+    # repr distinguishes int and float constants and is exact for floats
+    h.update(repr(sorted((i, repr(v), i in ir.inputs) for i, v in ir.constants.items())).encode())
+    return h.hexdigest()
+
+
+class compile_cache():
+    """A content-addressed on-disk cache for compiled programs. Each entry
+    is stored in its own file named by the key. Entries are written
+    atomically, so multiple processes can share one cache directory. If the
+    total size exceeds max_size, least recently used entries are removed.
+
+    Attributes:
+        path (str): Cache directory
+        max_size (int): Maximum total size of all entries in bytes
+    """
+    def __init__(self, path: str, max_size: int = 256 * 1024 * 1024):
+        """Open or create a compile cache
+
+        Arguments:
+            path: Cache directory, created if it does not exist
+            max_size: Maximum total size of all entries in bytes
+        """
+        self.path = path
+        self.max_size = max_size
+        os.makedirs(path, exist_ok=True)
+
+    def _get_file_name(self, key: str) -> str:
+        return os.path.join(self.path, key + CACHE_FILE_SUFFIX)
+
+    def get(self, key: str) -> tuple[bytes, CacheLayout] | None:
+        """Returns a cached program
+
+        Arguments:
+            key: Key returned by get_dag_key
+
+        Returns:
+            Tuple of program data and variable layout or None if the key is not cached
+        """
+        file_name = self._get_file_name(key)
+        try:
+            with open(file_name, 'rb') as f:
+                entry = f.read()
+            os.utime(file_name)  # Mark as recently used
+        except OSError:
+            return None  # Not cached or removed by another process
+
+        if entry[:32] != hashlib.sha256(entry[32:]).digest():
+            return None  # Damaged entry
+        dr = binw.data_reader(entry[32:], 'little')
+        layout = [(dr.read_int(), dr.read_int(), dr.read_int()) for _ in range(dr.read_int())]
+        data = bytes(dr.read_bytes(dr.read_int()))
+        return data, layout
+
+    def put(self, key: str, data: bytes, layout: CacheLayout) -> None:
+        """Adds a compiled program to the cache
+
+        Arguments:
+            key: Key returned by get_dag_key
+            data: Program data for the runner
+            layout: Tuples of lowered DAG node index, address and size of the variables
+        """
+        dw = binw.data_writer('little')
+        dw.write_int(len(layout))
+        for i, addr, size in layout:
+            dw.write_int(i)
+            dw.write_int(addr)
+            dw.write_int(size)
+        dw.write_int(len(data))
+        dw.write_bytes(data)
+        entry = dw.get_data()
+
+        # Write to a temporary file and rename it, so that other
+        # processes never see partly written entries
+        fd, tmp_name = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(hashlib.sha256(entry).digest())
+                f.write(entry)
+            os.replace(tmp_name, self._get_file_name(key))
+        except OSError:
+            # Caching is best effort, e.g. the entry might be opened by another process
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        """Removes least recently used entries until the total size of
+        the cache is below max_size."""
+        entries: list[tuple[float, int, str]] = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(CACHE_FILE_SUFFIX):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, file_name in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(file_name)
+            except OSError:
+                pass  # Already removed by another process
+            total_size -= size
+
+    def clear(self) -> None:
+        """Removes all entries from the cache."""
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(CACHE_FILE_SUFFIX):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+
+_default_cache: compile_cache | None = None
+_default_cache_set = False
+
+
+def set_compile_cache(path: str | None, max_size: int = 256 * 1024 * 1024) -> compile_cache | None:
+    """Sets the on-disk compile cache used by Target.compile and jit.
+    By default the directory from the environment variable CP_CACHE_DIR
+    is used, and no cache if it is not set.
+
+    Arguments:
+        path: Cache directory or None to disable the cache
+        max_size: Maximum total size of all cache entries in bytes
+
+    Returns:
+        The new compile cache
+    """
+    global _default_cache, _default_cache_set
+    _default_cache = compile_cache(path, max_size) if path else None
+    _default_cache_set = True
+    return _default_cache
+
+
+def get_compile_cache() -> compile_cache | None:
+    """Returns the on-disk compile cache used by Target.compile and jit
+    or None if caching is disabled."""
+    if not _default_cache_set:
+        set_compile_cache(os.environ.get("CP_CACHE_DIR"))
+    return _default_cache
@@ -1,8 +1,14 @@
 from typing import Generator, Iterable, Any
+import heapq
 from . import _binwrite as binw
+from ._binwrite import encode_value
 from ._stencils import stencil_database, patch_entry
-from collections import defaultdict, deque
 from ._basic_types import Net, Node, Store, CPConstant, Op, transl_type
+from ._ir import dag_ir, lower_dag, stable_toposort_indices, DTYPE_NAMES
+from ._optimizer import ir_simplify, ir_fuse
+
+# Alignment in bytes of declared input and output blocks in data memory
+IO_BLOCK_ALIGNMENT = 16
 
 
 def stable_toposort(edges: Iterable[tuple[Node, Node]]) -> list[Node]:
@@ -15,45 +21,27 @@ def stable_toposort(edges: Iterable[tuple[Node, Node]]) -> list[Node]:
         List of nodes in topologically sorted order.
     """
 
-    # Track adjacency and indegrees
-    adj: defaultdict[Node, list[Node]] = defaultdict(list)
-    indeg: defaultdict[Node, int] = defaultdict(int)
-    order: dict[Node, int] = {}  # first-appearance order of each node
+    # Number nodes by first appearance and track adjacency and indegrees
+    order: dict[Node, int] = {}
+    nodes: list[Node] = []
+    adj: list[list[int]] = []
+    indeg: list[int] = []
 
-    # Build graph and order map
-    pos = 0
     for u, v in edges:
         if u not in order:
-            order[u] = pos
-            pos += 1
+            order[u] = len(nodes)
+            nodes.append(u)
+            adj.append([])
+            indeg.append(0)
         if v not in order:
-            order[v] = pos
-            pos += 1
-        adj[u].append(v)
-        indeg[v] += 1
-        indeg.setdefault(u, 0)
-
-    # Initialize queue with nodes of indegree 0, sorted by first appearance
-    queue = deque(sorted([n for n in indeg if indeg[n] == 0], key=lambda x: order[x]))
-    result: list[Node] = []
-
-    while queue:
-        node = queue.popleft()
-        result.append(node)
-
-        for nei in adj[node]:
-            indeg[nei] -= 1
-            if indeg[nei] == 0:
-                queue.append(nei)
+            order[v] = len(nodes)
+            nodes.append(v)
+            adj.append([])
+            indeg.append(0)
+        adj[order[u]].append(order[v])
+        indeg[order[v]] += 1
 
-        # Maintain stability: sort queue by appearance order
-        queue = deque(sorted(queue, key=lambda x: order[x]))
-
-    # Check if graph had a cycle (not all nodes output)
-    if len(result) != len(indeg):
-        raise ValueError("Graph contains a cycle — topological sort not possible")
-
-    return result
+    return [nodes[i] for i in stable_toposort_indices(adj, indeg)]
 
 
 def get_all_dag_edges_between(roots: Iterable[Node], leaves: Iterable[Node]) -> Generator[tuple[Node, Node], None, None]:
@@ -250,6 +238,370 @@ def get_data_layout(variable_list: Iterable[Net], sdb: stencil_database, offset:
     return object_list, offset
 
 
+def ir_schedule(ir: dag_ir) -> dag_ir:
+    """Reorder independent nodes of the numbered SSA form to maximize register
+    reuse between consecutive stencils. If a user of the last computed result is
+    ready it is scheduled next (greedy chaining), so the result is consumed from
+    the register instead of being stored and loaded back. Otherwise the ready
+    node with the lowest index is scheduled to keep the original order stable.
+
+    Arguments:
+        ir: DAG in numbered SSA form
+
+    Returns:
+        The renumbered DAG
+    """
+    n = len(ir)
+    users: list[list[int]] = [[] for _ in range(n)]
+    indeg = [0] * n
+    for i, _, args in ir.iter_nodes():
+        for a in set(args):
+            users[a].append(i)
+            indeg[i] += 1
+
+    heap = [i for i, d in enumerate(indeg) if d == 0]  # ascending, so already a valid heap
+    emitted = bytearray(n)
+    order: list[int] = []
+    last = -1
+
+    while len(order) < n:
+        i = -1
+        if last >= 0:
+            # Prefer users that take the result in the first operand register
+            best_rank = 2
+            for u in users[last]:
+                if not indeg[u] and not emitted[u]:
+                    rank = 0 if ir.args[ir.arg_offsets[u]] == last or ir.codes[u] in ir.commutative else 1
+                    if (rank, u) < (best_rank, i):
+                        best_rank, i = rank, u
+        while i < 0:
+            i = heapq.heappop(heap)
+            if emitted[i]:
+                i = -1
+
+        emitted[i] = 1
+        order.append(i)
+        for u in users[i]:
+            indeg[u] -= 1
+            if not indeg[u]:
+                heapq.heappush(heap, u)
+
+        if users[i] and i not in ir.constants:
+            last = i
+
+    return ir.reordered(order)
+
+
+def ir_add_load_ops(ir: dag_ir, reg_swaps: bool = True) -> Generator[tuple[int, int], None, None]:
+    """Add load/read ops before each node of the numbered SSA form where arguments
+    are not already positioned correctly in the registers
+
+    Arguments:
+        ir: DAG in numbered SSA form
+        reg_swaps: Swap operands of commutative ops or swap register contents
+            if this avoids loads
+
+    Yields:
+        Tuples of a node index and an op code. For load ops the index
+        is the index of the loaded node, otherwise it is the index of
+        the node itself. For register swap ops the index is -1.
+    """
+    registers = [-1, -1]
+    dtypes = ir.dtypes
+    user_counts = ir.get_user_counts()
+    load_codes: dict[tuple[int, int, int, int], int] = {}
+
+    def reg_type(r: int) -> int:
+        return dtypes[registers[r]] if registers[r] >= 0 else 0
+
+    for i, code, args in ir.iter_nodes():
+        if i in ir.constants:
+            continue
+
+        # The third operand of fused ops is read from memory
+        reg_args = args[:2]
+
+        if reg_swaps and len(reg_args) == 2 and (args[0] != registers[0] or args[1] != registers[1]):
+            in_place = (args[0] == registers[0]) + (args[1] == registers[1])
+            crossed = (args[1] == registers[0]) + (args[0] == registers[1])
+            if code in ir.commutative and crossed > in_place:
+                # Use swapped operand order
+                op, t0, t1, *t_mem = ir.op_names[code].rsplit('_', len(args))
+                code = ir.op_code('_'.join([op, t1, t0, *t_mem]))
+                reg_args = reg_args[::-1]
+            elif crossed == 2:
+                yield -1, ir.op_code(f"swap_{DTYPE_NAMES[reg_type(0)]}_{DTYPE_NAMES[reg_type(1)]}")
+                registers.reverse()
+
+        for r, a in enumerate(reg_args):
+            if a != registers[r]:
+                key = (dtypes[a], r, reg_type(0), reg_type(1))
+                if key not in load_codes:
+                    t0, t1 = DTYPE_NAMES[key[2]], DTYPE_NAMES[key[3]]
+                    load_codes[key] = ir.op_code(f"load_{DTYPE_NAMES[key[0]]}_reg{r}_{t0}_{t1}")
+                yield a, load_codes[key]
+                registers[r] = a
+
+        yield i, code
+
+        if user_counts[i]:
+            registers[0] = i
+            if len(reg_args) < 2:  # Reset virtual register for single argument functions
+                registers[1] = -1
+
+
+def ir_add_store_ops(ir: dag_ir, ops: Iterable[tuple[int, int]]) -> Generator[tuple[int, int], None, None]:
+    """Add store/write ops for each new defined node if a load of it follows later
+    or if it is the memory operand of a fused op
+
+    Arguments:
+        ir: DAG in numbered SSA form
+        ops: Tuples of node index and op code as yielded by ir_add_load_ops
+
+    Yields:
+        Tuples of a node index and an op code. The index of the associated node is
+        provided for load and store ops and the index of the memory operand for
+        fused ops, otherwise -1 is returned in the tuple.
+    """
+    ops = list(ops)
+    load_registers = {c: int(name.split('_')[2][-1]) for c, name in enumerate(ir.op_names) if name.startswith('load_')}
+    swap_codes = {c for c, name in enumerate(ir.op_names) if name.startswith('swap_')}
+    store_node_codes = {c for c, name in enumerate(ir.op_names) if name.startswith('store_')}
+    store_codes: dict[tuple[int, int], int] = {}
+
+    def get_store_code() -> int:
+        key = (ir.dtypes[registers[0]], ir.dtypes[registers[1]] if registers[1] >= 0 else 0)
+        if key not in store_codes:
+            t0, t1 = DTYPE_NAMES[key[0]], DTYPE_NAMES[key[1]]
+            store_codes[key] = ir.op_code(f"store_{t0}_reg0_{t0}_{t1}")
+        return store_codes[key]
+
+    # Initialize set of nodes with constants
+    stored_nodes = set(ir.constants)
+
+    read_back_nodes = {i for i, code in ops if code in load_registers}
+    read_back_nodes.update(ir.get_args(i)[2] for i, code in ops
+                           if code not in load_registers and code not in swap_codes
+                           and ir.arg_offsets[i + 1] - ir.arg_offsets[i] > 2)
+
+    registers = [-1, -1]
+
+    for i, code in ops:
+        if code in load_registers:
+            yield i, code
+            registers[load_registers[code]] = i
+            continue
+        elif code in swap_codes:
+            yield -1, code
+            registers.reverse()
+            continue
+        elif code in store_node_codes:
+            yield ir.get_args(i)[0], get_store_code()
+            continue
+        else:
+            args = ir.get_args(i)
+            yield args[2] if len(args) > 2 else -1, code
+            # Update virtual register state with result and 2. parameter
+            if code != ir.codes[i]:
+                args = args[1::-1]  # Operands were swapped by ir_add_load_ops
+            registers[0] = i
+            registers[1] = args[1] if len(args) > 1 else -1
+
+        if i in read_back_nodes and i not in stored_nodes:
+            yield i, get_store_code()
+            stored_nodes.add(i)
+
+
+def ir_get_variables(ir: dag_ir, ops: Iterable[tuple[int, int]]) -> list[int]:
+    """Get all nodes of the numbered SSA form that require heap memory
+
+    Arguments:
+        ir: DAG in numbered SSA form
+        ops: Tuples of node index and op code as yielded by ir_add_store_ops
+
+    Returns:
+        Sorted list of node indices
+    """
+    nodes = set(ir.constants)
+    nodes.update(i for i, _ in ops if i >= 0)
+    return sorted(nodes)
+
+
+def ir_get_data_layout(ir: dag_ir, variable_list: Iterable[int], sdb: stencil_database, offset: int = 0) -> tuple[list[tuple[int, int, int]], int]:
+    """Get memory layout for the provided variables of the numbered SSA form
+
+    Arguments:
+        ir: DAG in numbered SSA form
+        variable_list: Variables (by node index) to layout
+        sdb: Stencil database for size lookup
+        offset: Starting offset for layout
+
+    Returns:
+        Tuple of list of (node index, start_offset, length) and total length"""
+
+    object_list: list[tuple[int, int, int]] = []
+    sizes = [sdb.get_type_size(t) for t in DTYPE_NAMES]
+
+    for i in variable_list:
+        lengths = sizes[ir.dtypes[i]]
+        offset = (offset + lengths - 1) // lengths * lengths  # align variables to their own size
+        object_list.append((i, offset, lengths))
+        offset += lengths
+
+    return object_list, offset
+
+
+def ir_get_block_data_layout(ir: dag_ir, variable_list: Iterable[int], sdb: stencil_database, offset: int = 0,
+                             output_block: Iterable[int] = ()) -> tuple[list[tuple[int, int, int]], int]:
+    """Get memory layout for the provided variables of the numbered SSA form
+    where the variables of the output block are placed first in the given
+    order, starting at an IO_BLOCK_ALIGNMENT aligned offset
+
+    Arguments:
+        ir: DAG in numbered SSA form
+        variable_list: Variables (by node index) to layout
+        sdb: Stencil database for size lookup
+        offset: Starting offset for layout
+        output_block: Variables (by node index) of the output block
+
+    Returns:
+        Tuple of list of (node index, start_offset, length) and total length"""
+    block = list(output_block)
+    if not block:
+        return ir_get_data_layout(ir, variable_list, sdb, offset)
+
+    offset = (offset + IO_BLOCK_ALIGNMENT - 1) // IO_BLOCK_ALIGNMENT * IO_BLOCK_ALIGNMENT
+    block_layout, offset = ir_get_data_layout(ir, block, sdb, offset)
+    block_nodes = set(block)
+    object_list, offset = ir_get_data_layout(ir, (i for i in variable_list if i not in block_nodes), sdb, offset)
+    return block_layout + object_list, offset
+
+
+def ir_get_constant_pool(ir: dag_ir, sdb: stencil_database, offset: int = 0,
+                         input_block: Iterable[int] = ()) -> tuple[list[tuple[int, int, int]], bytes, int]:
+    """Get a contiguous memory layout and the initial data for all constant
+    nodes of the numbered SSA form. The anonymous constants come first, sorted
+    by size and binary representation, followed by the inputs in node order.
+    Anonymous constants with equal binary representation share memory. So
+    everything the host can write starts at the first input.
+
+    Arguments:
+        ir: DAG in numbered SSA form
+        sdb: Stencil database for size lookup and byte order
+        offset: Starting offset for layout
+        input_block: Inputs (by node index) placed after all other constants
+            in the given order, starting at an IO_BLOCK_ALIGNMENT aligned offset
+
+    Returns:
+        Tuple of list of (node index, start_offset, length), pool data
+        and end offset of the pool. The pool data starts at the first
+        start_offset.
+    """
+    sizes = [sdb.get_type_size(t) for t in DTYPE_NAMES]
+    object_list: list[tuple[int, int, int]] = []
+    pool = bytearray()
+    pool_lookup: dict[bytes, int] = {}
+    pool_start = -1
+    end = offset
+
+    def place(data: bytes, alignment: int) -> int:
+        nonlocal pool_start, end
+        end = (end + alignment - 1) // alignment * alignment
+        if pool_start < 0:
+            pool_start = end
+        pool.extend(bytes(end - pool_start - len(pool)))
+        start = end
+        pool.extend(data)
+        end += len(data)
+        return start
+
+    block = list(input_block)
+    block_nodes = set(block)
+    anonymous_entries = sorted((-sizes[ir.dtypes[i]], encode_value(v, sizes[ir.dtypes[i]], sdb.byteorder), i)
+                               for i, v in ir.constants.items() if i not in ir.inputs)
+    input_entries = sorted((-sizes[ir.dtypes[i]], i) for i in ir.inputs if i not in block_nodes)
+
+    # Largest size first, so no padding is needed within each group
+    for neg_size, data, i in anonymous_entries:
+        start = pool_lookup.get(data, -1)
+        if start < 0:
+            start = place(data, -neg_size)
+            pool_lookup[data] = start
+        object_list.append((i, start, -neg_size))
+
+    for neg_size, i in input_entries:
+        object_list.append((i, place(encode_value(ir.constants[i], -neg_size, sdb.byteorder), -neg_size), -neg_size))
+
+    for k, i in enumerate(block):
+        lengths = sizes[ir.dtypes[i]]
+        data = encode_value(ir.constants[i], lengths, sdb.byteorder)
+        object_list.append((i, place(data, IO_BLOCK_ALIGNMENT if k == 0 else lengths), lengths))
+
+    return object_list, bytes(pool), end
+
+
+def ir_get_pinned_nodes(ir: dag_ir) -> set[int]:
+    """Get all nodes of the numbered SSA form whose heap memory must stay valid
+    for the whole program: constants, inputs and results of store nodes
+
+    Arguments:
+        ir: DAG in numbered SSA form
+
+    Returns:
+        Set of node indices
+    """
+    store_node_codes = {c for c, name in enumerate(ir.op_names) if name.startswith('store_')}
+    pinned = set(ir.constants)
+    pinned.update(ir.get_args(i)[0] for i, code in enumerate(ir.codes) if code in store_node_codes)
+    return pinned
+
+
+def ir_get_shared_data_layout(ir: dag_ir, ops: list[tuple[int, int]], sdb: stencil_database, offset: int = 0,
+                              output_block: Iterable[int] = ()) -> tuple[list[tuple[int, int, int]], int]:
+    """Get memory layout for all non-constant variables of the numbered SSA
+    form where temporary variables share memory. Pinned variables (see
+    ir_get_pinned_nodes) get their own memory, memory of temporary variables
+    is reused by later temporaries after the last load (linear scan over the
+    op list). Constants are placed by ir_get_constant_pool.
+
+    Arguments:
+        ir: DAG in numbered SSA form
+        ops: Tuples of node index and op code as yielded by ir_add_store_ops
+        sdb: Stencil database for size lookup
+        offset: Starting offset for layout
+        output_block: Pinned variables (by node index) placed before all other
+            variables, see ir_get_block_data_layout
+
+    Returns:
+        Tuple of list of (node index, start_offset, length) and total length"""
+    pinned = ir_get_pinned_nodes(ir)
+    object_list, offset = ir_get_block_data_layout(ir, sorted(pinned - ir.constants.keys()), sdb, offset, output_block)
+
+    last_use = {i: p for p, (i, _) in enumerate(ops) if i >= 0 and i not in pinned}
+    sizes = [sdb.get_type_size(t) for t in DTYPE_NAMES]
+    free_slots: dict[int, list[int]] = {}
+    slots: dict[int, int] = {}
+
+    for p, (i, _) in enumerate(ops):
+        if i < 0 or i in pinned:
+            continue
+        lengths = sizes[ir.dtypes[i]]
+        if i not in slots:
+            # First access is the store of the temporary
+            free_list = free_slots.setdefault(lengths, [])
+            if free_list:
+                slots[i] = free_list.pop()
+            else:
+                offset = (offset + lengths - 1) // lengths * lengths  # align variables to their own size
+                slots[i] = offset
+                offset += lengths
+            object_list.append((i, slots[i], lengths))
+        if last_use[i] == p:
+            free_slots.setdefault(lengths, []).append(slots[i])
+
+    return object_list, offset
+
+
 #def get_target_sym_lookup(function_names: Iterable[str], sdb: stencil_database) -> dict[str, patch_entry]:
 #    return {patch.target_symbol_name: patch for name in set(function_names) for patch in sdb.get_patch_positions(name)}
 
@@ -310,6 +662,45 @@ def get_aux_func_layout(function_names: Iterable[str], sdb: stencil_database, of
     return section_list, function_lookup, offset
 
 
+def apply_code_patch(code: bytearray, patch: patch_entry, byteorder: binw.ByteOrder) -> bool:
+    """Applies a patch to the code if it only depends on offsets inside
+    the code block (jumps, calls and absolute values), like the runner does.
+
+    Arguments:
+        code: Code block starting at offset 0 of the executable memory
+        patch: Patch to apply
+        byteorder: Byte order of the target
+
+    Returns:
+        True if the patch was applied, False if it depends on the
+        address of the data memory and must be applied by the runner
+    """
+    addr = patch.address
+    if patch.patch_type in (binw.Command.PATCH_FUNC.value, binw.Command.PATCH_OBJECT_ABS.value):
+        scaled = int(patch.value / patch.scale)  # Truncating division like in C
+        original = int.from_bytes(code[addr:addr + 4], byteorder)
+        shift_factor = patch.mask & -patch.mask
+        new_value = (original & ~patch.mask) | ((scaled * shift_factor) & patch.mask)
+        code[addr:addr + 4] = (new_value & 0xFFFFFFFF).to_bytes(4, byteorder)
+        return True
+
+    if patch.patch_type == binw.Command.PATCH_FUNC_ARM32_THM.value:
+        # Thumb BL/B.W encoding, see patch_arm_thm_jump24 in runmem.c
+        first_half = int.from_bytes(code[addr:addr + 2], byteorder)
+        second_half = int.from_bytes(code[addr + 2:addr + 4], byteorder)
+        offset = patch.value >> 1
+        s = (offset >> 23) & 1
+        j1 = ~(((offset >> 22) & 1) ^ s) & 1
+        j2 = ~(((offset >> 21) & 1) ^ s) & 1
+        first_half = (first_half & 0xF800) | (s << 10) | ((offset >> 11) & 0x3FF)
+        second_half = (second_half & 0xD000) | (j1 << 13) | (j2 << 11) | (offset & 0x7FF)
+        code[addr:addr + 2] = first_half.to_bytes(2, byteorder)
+        code[addr + 2:addr + 4] = second_half.to_bytes(2, byteorder)
+        return True
+
+    return False
+
+
 def get_dag_stats(node_list: Iterable[Node | Net]) -> dict[str, int]:
     """Get operation statistics for the DAG identified by provided end nodes
 
@@ -319,75 +710,153 @@ def get_dag_stats(node_list: Iterable[Node | Net]) -> dict[str, int]:
     Returns:
         Dictionary of operation name to occurrence count
     """
-    edges = get_all_dag_edges(n.source if isinstance(n, Net) else n for n in node_list)
-    ops = {node for node, _ in edges}
+    ir = lower_dag(n.source if isinstance(n, Net) else n for n in node_list)
+    user_counts = ir.get_user_counts()
 
     op_stat: dict[str, int] = {}
-    for op in ops:
-        op_stat[op.name] = op_stat.get(op.name, 0) + 1
+    for i, code in enumerate(ir.codes):
+        if user_counts[i]:
+            name = ir.op_names[code]
+            op_stat[name] = op_stat.get(name, 0) + 1
 
     return op_stat
 
 
-def compile_to_dag(node_list: Iterable[Node], sdb: stencil_database) -> tuple[binw.data_writer, dict[Net, tuple[int, int, str]]]:
+def get_load_store_stats(node_list: Iterable[Node | Net], schedule: bool = True) -> dict[str, int]:
+    """Get the number of register load, store and swap ops required for
+    the DAG identified by provided end nodes
+
+    Arguments:
+        node_list: List of end nodes of the DAG
+        schedule: Use register-aware scheduling, operand swapping and
+            register swaps as done by compile_to_dag
+
+    Returns:
+        Dictionary with the counts for 'load', 'store' and 'swap' ops
+    """
+    ir = lower_dag(n.source if isinstance(n, Net) else n for n in node_list)
+    if schedule:
+        ir = ir_schedule(ir)
+    ops = ir_add_store_ops(ir, ir_add_load_ops(ir, schedule))
+
+    stats = {'load': 0, 'store': 0, 'swap': 0}
+    for i, code in ops:
+        kind = ir.op_names[code].split('_')[0]
+        if kind in stats and (i >= 0 or kind == 'swap'):
+            stats[kind] += 1
+
+    return stats
+
+
+def compile_to_dag(node_list: Iterable[Node], sdb: stencil_database, reuse_slots: bool = False) -> tuple[binw.data_writer, dict[Net, tuple[int, int, str]]]:
     """Compiles a DAG identified by provided end nodes to binary code
 
     Arguments:
         node_list: List of end nodes of the DAG to compile
         sdb: Stencil database
+        reuse_slots: Reuse the memory of temporary variables after their last use.
+            Only constants, inputs and stored results are returned in the variable
+            layout dictionary in this case.
 
     Returns:
         Tuple of data writer with binary code and variable layout dictionary
     """
+    return ir_compile(lower_dag(node_list), sdb, reuse_slots)
+
+
+def ir_compile(ir: dag_ir, sdb: stencil_database, reuse_slots: bool = False,
+               input_block: Iterable[int] = (), output_block: Iterable[int] = ()) -> tuple[binw.data_writer, dict[Net, tuple[int, int, str]]]:
+    """Compiles a DAG in numbered SSA form to binary code
+
+    Arguments:
+        ir: DAG as returned by lower_dag
+        sdb: Stencil database
+        reuse_slots: Reuse the memory of temporary variables after their last use.
+        input_block: Inputs (by node index) to place contiguously in the given order
+        output_block: Stored results (by node index) to place contiguously in the given order
+
+    Returns:
+        Tuple of data writer with binary code and variable layout dictionary
+
+    The input and output blocks start at IO_BLOCK_ALIGNMENT aligned addresses and
+    each variable is aligned to its own size, so the host can write or read a
+    whole block with one copy. Outputs must be distinct non-constant values.
+    """
     variables: dict[Net, tuple[int, int, str]] = {}
     data_list: list[bytes] = []
     patch_list: list[patch_entry] = []
 
-    ordered_ops = list(stable_toposort(get_all_dag_edges(node_list)))
-    const_net_list = get_const_nets(ordered_ops)
-    output_ops = list(add_load_ops(ordered_ops))
-    extended_output_ops = list(add_store_ops(output_ops, const_net_list))
+    # Node indices change by optimization, blocks are tracked by their nets
+    input_nets = [ir.nets[i] for i in input_block]
+    output_nets = [ir.nets[i] for i in output_block]
+
+    ir = ir_schedule(ir_fuse(ir_simplify(ir)))
+
+    node_lookup = {net: i for i, net in enumerate(ir.nets) if net}
+    node_lookup.update(ir.net_aliases)
+    input_nodes = [node_lookup[net] if net else -1 for net in input_nets]
+    output_nodes = [node_lookup[net] if net else -1 for net in output_nets]
+    if len(set(input_nodes)) < len(input_nodes) or not ir.inputs.issuperset(input_nodes):
+        raise ValueError("Declared inputs must be distinct input values")
+    if len(set(output_nodes)) < len(output_nodes) or any(i < 0 or i in ir.constants for i in output_nodes):
+        raise ValueError("Declared outputs must be distinct values that are computed by the program")
+    output_ops = list(ir_add_load_ops(ir))
+    extended_output_ops = list(ir_add_store_ops(ir, output_ops))
 
     dw = binw.data_writer(sdb.byteorder)
 
     # Deallocate old allocated memory (if existing)
     dw.write_com(binw.Command.FREE_MEMORY)
 
-    # Get all nets/variables associated with heap memory
-    variable_list = get_nets([const_net_list], extended_output_ops)
-
-    stencil_names = {node.name for _, node in extended_output_ops}
+    stencil_names = {ir.op_names[code] for _, code in extended_output_ops}
     aux_function_names = sdb.get_sub_functions(stencil_names)
-    used_const_sections = sdb.const_sections_from_functions(aux_function_names | stencil_names)
+    # Sorted for a layout that does not depend on set iteration order
+    used_const_sections = sorted(sdb.const_sections_from_functions(aux_function_names | stencil_names))
 
-    # Write data
+    # Data memory layout: constant sections, constant pool, variables
     section_mem_layout, sections_length = get_section_layout(used_const_sections, sdb)
-    variable_mem_layout, variables_data_lengths = get_data_layout(variable_list, sdb, sections_length)
+    const_mem_layout, const_pool, const_pool_end = ir_get_constant_pool(ir, sdb, sections_length, input_nodes)
+    if reuse_slots:
+        variable_mem_layout, variables_data_lengths = ir_get_shared_data_layout(
+            ir, extended_output_ops, sdb, const_pool_end, output_nodes)
+        readable_nodes = ir_get_pinned_nodes(ir)
+    else:
+        # Get all nodes/variables associated with heap memory
+        readable_nodes = set(ir_get_variables(ir, extended_output_ops))
+        variable_mem_layout, variables_data_lengths = ir_get_block_data_layout(
+            ir, sorted(readable_nodes - ir.constants.keys()), sdb, const_pool_end, output_nodes)
+    variable_mem_layout = const_mem_layout + variable_mem_layout
     dw.write_com(binw.Command.ALLOCATE_DATA)
     dw.write_int(variables_data_lengths)
 
-    # Heap constants
-    for section_id, start, lengths in section_mem_layout:
+    # Constant sections and constant pool are copied in one block
+    if const_pool_end:
+        const_data = bytearray(const_pool_end)
+        for section_id, start, _ in section_mem_layout:
+            section_data = sdb.get_section_data(section_id)
+            const_data[start:start + len(section_data)] = section_data
+        const_data[const_pool_end - len(const_pool):] = const_pool
         dw.write_com(binw.Command.COPY_DATA)
-        dw.write_int(start)
-        dw.write_int(lengths)
-        dw.write_bytes(sdb.get_section_data(section_id))
+        dw.write_int(0)
+        dw.write_int(const_pool_end)
+        dw.write_bytes(bytes(const_data))
 
     # Heap variables
-    for net, start, lengths in variable_mem_layout:
-        variables[net] = (start, lengths, net.dtype)
-        if isinstance(net.source, CPConstant):
-            dw.write_com(binw.Command.COPY_DATA)
-            dw.write_int(start)
-            dw.write_int(lengths)
-            dw.write_value(net.source.value, lengths)
-            #print(f'+ {net.dtype} {net.source.value}')
+    for i, start, lengths in variable_mem_layout:
+        net = ir.nets[i]
+        if net and i in readable_nodes:
+            variables[net] = (start, lengths, net.dtype)
+
+    # Nets of nodes merged by the optimizer
+    object_addr_lookup = {i: offs for i, offs, _ in variable_mem_layout}
+    for net, i in ir.net_aliases.items():
+        if i in readable_nodes:
+            variables[net] = (object_addr_lookup[i], sdb.get_type_size(transl_type(net.dtype)), net.dtype)
 
     # prep auxiliary_functions
-    code_section_layout, func_addr_lookup, aux_func_len = get_aux_func_layout(aux_function_names, sdb)
+    code_section_layout, func_addr_lookup, aux_func_len = get_aux_func_layout(sorted(aux_function_names), sdb)
 
     # Prepare program code and relocations
-    object_addr_lookup = {net: offs for net, offs, _ in variable_mem_layout}
     section_addr_lookup = {id: offs for id, offs, _ in section_mem_layout}
 
     # assemble stencils to main program and patch stencils
@@ -396,37 +865,38 @@ def compile_to_dag(node_list: Iterable[Node], sdb: stencil_database) -> tuple[bi
     #print(f"* entry_function_shell (0) " + ' '.join(f'{d:02X}' for d in data))
     offset = aux_func_len + len(data)
 
-    for associated_net, node in extended_output_ops:
-        assert node.name in sdb.stencil_definitions, f"- Warning: {node.name} stencil not found"
-        data = sdb.get_stencil_code(node.name)
+    for associated_node, code in extended_output_ops:
+        name = ir.op_names[code]
+        assert name in sdb.stencil_definitions, f"- Warning: {name} stencil not found"
+        data = sdb.get_stencil_code(name)
         data_list.append(data)
-        #print(f"* {node.name} ({offset}) " + ' '.join(f'{d:02X}' for d in data))
+        #print(f"* {name} ({offset}) " + ' '.join(f'{d:02X}' for d in data))
 
-        for reloc in sdb.get_relocations(node.name, stencil=True):
+        for reloc in sdb.get_relocations(name, stencil=True):
             if reloc.target_symbol_info in ('STT_OBJECT', 'STT_NOTYPE', 'STT_SECTION'):
-                #print('-- ' + reloc.target_symbol_name + ' // ' + node.name)
+                #print('-- ' + reloc.target_symbol_name + ' // ' + name)
                 if reloc.target_symbol_name.startswith('dummy_'):
                     # Patch for write and read addresses to/from heap variables
-                    assert associated_net, f"Relocation found but no net defined for operation {node.name}"
-                    #print(f"Patch for write and read addresses to/from heap variables: {node.name} {patch.target_symbol_info} {patch.target_symbol_name}")
-                    obj_addr = object_addr_lookup[associated_net]
+                    assert associated_node >= 0, f"Relocation found but no net defined for operation {name}"
+                    #print(f"Patch for write and read addresses to/from heap variables: {name} {patch.target_symbol_info} {patch.target_symbol_name}")
+                    obj_addr = object_addr_lookup[associated_node]
                     patch = sdb.get_patch(reloc, obj_addr, offset, binw.Command.PATCH_OBJECT.value)
                 elif reloc.target_symbol_name.startswith('result_'):
                     # Set return jump address to address of following stencil
                     patch = sdb.get_patch(reloc, offset + len(data), offset, binw.Command.PATCH_FUNC.value)
                 else:
                     # Patch constants addresses on heap
-                    assert reloc.target_section_index in section_addr_lookup, f"- Function or object in {node.name} missing: {reloc.pelfy_reloc.symbol.name}"
+                    assert reloc.target_section_index in section_addr_lookup, f"- Function or object in {name} missing: {reloc.target_symbol_name}"
                     obj_addr = reloc.target_symbol_offset + section_addr_lookup[reloc.target_section_index]
                     patch = sdb.get_patch(reloc, obj_addr, offset, binw.Command.PATCH_OBJECT.value)
-                    #print('* constants stancils', patch.type, patch.patch_address, binw.Command.PATCH_OBJECT, node.name)
+                    #print('* constants stancils', patch.type, patch.patch_address, binw.Command.PATCH_OBJECT, name)
 
             elif reloc.target_symbol_info == 'STT_FUNC':
                 func_addr = func_addr_lookup[reloc.target_symbol_name]
                 patch = sdb.get_patch(reloc, func_addr, offset, binw.Command.PATCH_FUNC.value)
-                #print(patch.type, patch.addr, binw.Command.PATCH_FUNC, node.name, '->', patch.target_symbol_name)
+                #print(patch.type, patch.addr, binw.Command.PATCH_FUNC, name, '->', patch.target_symbol_name)
             else:
-                raise ValueError(f"Unsupported: {node.name} {reloc.target_symbol_info} {reloc.target_symbol_name}")
+                raise ValueError(f"Unsupported: {name} {reloc.target_symbol_info} {reloc.target_symbol_name}")
 
             patch_list.append(patch)
 
@@ -440,12 +910,12 @@ def compile_to_dag(node_list: Iterable[Node], sdb: stencil_database) -> tuple[bi
     dw.write_com(binw.Command.ALLOCATE_CODE)
     dw.write_int(offset)
 
-    # write aux functions code
-    for i, start, lengths in code_section_layout:
-        dw.write_com(binw.Command.COPY_CODE)
-        dw.write_int(start)
-        dw.write_int(lengths)
-        dw.write_bytes(sdb.get_section_data(i))
+    # Assemble aux functions and entry function code
+    code_data = bytearray(offset)
+    for i, start, _ in code_section_layout:
+        section_data = sdb.get_section_data(i)
+        code_data[start:start + len(section_data)] = section_data
+    code_data[aux_func_len:offset] = b''.join(data_list)
 
     # Patch aux functions
     for name, start in func_addr_lookup.items():
@@ -453,12 +923,12 @@ def compile_to_dag(node_list: Iterable[Node], sdb: stencil_database) -> tuple[bi
         for reloc in sdb.get_relocations(name):
 
             if not reloc.target_section_index:
-                assert reloc.pelfy_reloc.type == 'R_ARM_V4BX', (reloc.pelfy_reloc.type, name, reloc.pelfy_reloc.symbol.name)
+                assert reloc.reloc_type == 'R_ARM_V4BX', (reloc.reloc_type, name, reloc.target_symbol_name)
 
             elif reloc.target_symbol_info in {'STT_OBJECT', 'STT_NOTYPE', 'STT_SECTION'}:
                 # Patch constants/variable addresses on heap
                 #print('--> DATA ', name, reloc.pelfy_reloc.symbol, reloc.pelfy_reloc.symbol.info, reloc.pelfy_reloc.symbol.section.name)
-                assert reloc.target_section_index in section_addr_lookup, f"- Function or object in {name} missing: {reloc.pelfy_reloc.symbol.name}"
+                assert reloc.target_section_index in section_addr_lookup, f"- Function or object in {name} missing: {reloc.target_symbol_name}"
                 obj_addr = reloc.target_symbol_offset + section_addr_lookup[reloc.target_section_index]
                 patch = sdb.get_patch(reloc, obj_addr, start, binw.Command.PATCH_OBJECT.value)
                 patch_list.append(patch)
@@ -473,19 +943,28 @@ def compile_to_dag(node_list: Iterable[Node], sdb: stencil_database) -> tuple[bi
             else:
                 raise ValueError(f"Unsupported: {name=} {reloc.target_symbol_info=} {reloc.target_symbol_name=} {reloc.target_section_index}")
 
-    # write entry function code
+    # Apply code relative patches, only data relative patches are left for the runner
+    patch_list = [patch for patch in patch_list if not apply_code_patch(code_data, patch, sdb.byteorder)]
+
     dw.write_com(binw.Command.COPY_CODE)
-    dw.write_int(aux_func_len)
-    dw.write_int(offset - aux_func_len)
-    dw.write_bytes(b''.join(data_list))
+    dw.write_int(0)
+    dw.write_int(offset)
+    dw.write_bytes(bytes(code_data))
 
-    # write patch operations
+    # write patch operations, patches of same type, mask and scale are packed in tables
+    patch_tables: dict[tuple[int, int, int], list[tuple[int, int]]] = {}
     for patch in patch_list:
-        dw.write_com(binw.Command(patch.patch_type))
-        dw.write_int(patch.address)
-        dw.write_int(patch.mask)
-        dw.write_int(patch.scale)
-        dw.write_int(patch.value, signed=True)
+        patch_tables.setdefault((patch.patch_type, patch.mask, patch.scale), []).append((patch.address, patch.value))
+    for (patch_type, mask, scale), entries in patch_tables.items():
+        if len(entries) > 1:
+            dw.write_patch_table(binw.Command(patch_type), mask, scale, sorted(entries))
+        else:
+            address, value = entries[0]
+            dw.write_com(binw.Command(patch_type))
+            dw.write_int(address)
+            dw.write_int(mask)
+            dw.write_int(scale)
+            dw.write_int(value, signed=True)
 
     dw.write_com(binw.Command.ENTRY_POINT)
     dw.write_int(aux_func_len + sdb.thumb_mode)
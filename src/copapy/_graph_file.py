@@ -0,0 +1,254 @@
+import os
+import struct
+import sys
+import tempfile
+from typing import Any, Iterable
+from . import _binwrite as binw
+from ._basic_types import value, Net, Node, Op, Store, CPConstant, value_from_number, net_table
+from ._vectors import vector
+from ._tensors import tensor
+from ._ir import dag_ir, lower_dag
+from ._target import get_flat_values
+
+GRAPH_MAGIC = b'CPGR'
+GRAPH_VERSION = 1
+
+# Data types of values in named inputs and outputs
+VALUE_DTYPES = ('int', 'float', 'bool')
+
+# Tags of the elements of named input and output structures
+TAG_VALUE = 0
+TAG_INT = 1
+TAG_FLOAT = 2
+TAG_VECTOR = 3
+TAG_TENSOR = 4
+TAG_LIST = 5
+
+
+def _write_structure(dw: binw.data_writer, variables: Any, net_index: dict[Net, int]) -> None:
+    if isinstance(variables, value):
+        dw.write_byte(TAG_VALUE)
+        dw.write_int(net_index[variables.net])
+        dw.write_byte(VALUE_DTYPES.index(variables.dtype))
+    elif isinstance(variables, int):
+        dw.write_byte(TAG_INT)
+        dw.write_bytes(struct.pack('<q', variables))
+    elif isinstance(variables, float):
+        dw.write_byte(TAG_FLOAT)
+        dw.write_bytes(struct.pack('<d', variables))
+    elif isinstance(variables, vector | tensor):
+        if isinstance(variables, vector):
+            dw.write_byte(TAG_VECTOR)
+        else:
+            dw.write_byte(TAG_TENSOR)
+            dw.write_int(len(variables.shape))
+            for n in variables.shape:
+                dw.write_int(n)
+        dw.write_int(len(variables.values))
+        for v in variables.values:
+            _write_structure(dw, v, net_index)
+    elif isinstance(variables, Iterable) and not isinstance(variables, str):
+        items = list(variables)  # pyright: ignore[reportUnknownArgumentType]
+        dw.write_byte(TAG_LIST)
+        dw.write_int(len(items))
+        for v in items:
+            _write_structure(dw, v, net_index)
+    else:
+        raise ValueError(f"Type {type(variables).__name__} can not be saved in a graph")
+
+
+def _read_structure(dr: binw.data_reader, get_value: Any) -> Any:
+    tag = dr.read_byte()
+    if tag == TAG_VALUE:
+        return get_value(dr.read_int(), VALUE_DTYPES[dr.read_byte()])
+    if tag == TAG_INT:
+        return struct.unpack('<q', dr.read_bytes(8))[0]
+    if tag == TAG_FLOAT:
+        return struct.unpack('<d', dr.read_bytes(8))[0]
+    if tag == TAG_VECTOR:
+        return vector(_read_structure(dr, get_value) for _ in range(dr.read_int()))
+    if tag == TAG_TENSOR:
+        shape = [dr.read_int() for _ in range(dr.read_int())]
+        values = [_read_structure(dr, get_value) for _ in range(dr.read_int())]
+        return tensor(values, shape) if shape else tensor(values[0])
+    if tag == TAG_LIST:
+        return [_read_structure(dr, get_value) for _ in range(dr.read_int())]
+    raise ValueError(f"Unknown element tag {tag} in graph data")
+
+
+def graph_to_bytes(inputs: dict[str, Any], outputs: dict[str, Any]) -> bytes:
+    """Serializes a traced graph with named inputs and outputs.
+
+    Arguments:
+        inputs: Input values, vectors, tensors or lists of them by name
+        outputs: Computed values, vectors, tensors or lists of them by name
+
+    Returns:
+        Serialized graph that can be loaded by graph_from_bytes or graph_ir_from_bytes
+
+    The graph contains all ops required to compute the outputs. Inputs must
+    be input values (not computed and not anonymous constants), they are
+    included even if the outputs do not depend on them.
+    """
+    input_values: list[value[Any]] = []
+    get_flat_values(list(inputs.values()), input_values)
+    for v in input_values:
+        if not isinstance(v.net.source, CPConstant) or v.net.source.anonymous:
+            raise ValueError(f"Input {v} is not an input value")
+    output_values: list[value[Any]] = []
+    get_flat_values(list(outputs.values()), output_values)
+
+    nodes: list[Node] = [Store(v) for v in output_values]
+    nodes += [v.net.source for v in input_values]
+    ir = lower_dag(nodes)
+    net_index = {net: i for i, net in enumerate(ir.nets) if net}
+
+    dw = binw.data_writer('little')
+    dw.write_bytes(GRAPH_MAGIC)
+    dw.write_int(GRAPH_VERSION)
+    ir_data = ir.to_bytes()
+    dw.write_int(len(ir_data))
+    dw.write_bytes(ir_data)
+    for named in (inputs, outputs):
+        dw.write_int(len(named))
+        for name, variables in named.items():
+            encoded_name = name.encode()
+            dw.write_int(len(encoded_name))
+            dw.write_bytes(encoded_name)
+            _write_structure(dw, variables, net_index)
+    return dw.get_data()
+
+
+def _read_graph(data: bytes | bytearray, get_value: Any) -> tuple[dag_ir, dict[str, Any], dict[str, Any]]:
+    dr = binw.data_reader(data, 'little')
+    if dr.read_bytes(4) != GRAPH_MAGIC or dr.read_int() != GRAPH_VERSION:
+        raise ValueError("Data is not a saved graph of a supported version")
+    ir = dag_ir.from_bytes(bytes(dr.read_bytes(dr.read_int())))
+    named: list[dict[str, Any]] = [{}, {}]
+    for variables in named:
+        for _ in range(dr.read_int()):
+            name = bytes(dr.read_bytes(dr.read_int())).decode()
+            variables[name] = _read_structure(dr, lambda i, dtype: get_value(ir, i, dtype))
+    return ir, named[0], named[1]
+
+
+def graph_ir_from_bytes(data: bytes | bytearray) -> tuple[dag_ir, dict[str, Any], dict[str, Any]]:
+    """Loads a graph saved by graph_to_bytes in numbered SSA form for the
+    compiler, without creating Net and Op objects for the ops.
+
+    Arguments:
+        data: Serialized graph
+
+    Returns:
+        Tuple of the DAG and the inputs and outputs by name. In the inputs and
+        outputs each value is replaced by its node index in the DAG. Each node
+        with a result has a placeholder Net.
+    """
+    ir, inputs, outputs = _read_graph(data, lambda ir, i, dtype: i)
+    for i in range(len(ir)):
+        if ir.dtypes[i] >= 0:
+            ir.nets[i] = Net(ir.get_dtype(i), Node())
+    return ir, inputs, outputs
+
+
+def get_graph_nets(ir: dag_ir) -> list[Net | None]:
+    """Creates the Net and Op objects of a DAG in numbered SSA form. Ops
+    and anonymous constants are interned, so equal ops traced later
+    share the Nets.
+
+    Arguments:
+        ir: DAG in numbered SSA form
+
+    Returns:
+        Net for each node or None for nodes without result
+    """
+    nets: list[Net | None] = []
+    op_names = [sys.intern(name) for name in ir.op_names]
+    dtype_names = [ir.get_dtype(i) if ir.dtypes[i] >= 0 else '' for i in range(len(ir))]
+    codes, args, offs = ir.codes, ir.args, ir.arg_offsets
+
+    # Ops depending on a loaded input can not be in the interning table yet
+    from_input = [False] * len(ir)
+    for i, code in enumerate(codes):
+        net: Net | None
+        if not dtype_names[i]:
+            net = None
+        elif i in ir.constants:
+            if i in ir.inputs:
+                node = CPConstant(ir.constants[i], False)
+                net = Net(node.dtype, node)
+                from_input[i] = True
+            else:
+                net = value_from_number(ir.constants[i]).net
+        else:
+            arg_indices = args[offs[i]:offs[i + 1]]
+            arg_nets = [nets[a] for a in arg_indices]
+            assert all(arg_nets), "Operand without result in graph data"
+            commutative = code in ir.commutative
+            key = (op_names[code], *(sorted(arg_nets, key=id) if commutative else arg_nets))
+            for a in arg_indices:
+                if from_input[a]:
+                    from_input[i] = True
+                    break
+            net = None if from_input[i] else net_table.get(key)
+            if net is None:
+                net = Net(dtype_names[i], Op(op_names[code], arg_nets, commutative))  # type: ignore[arg-type]
+                net_table[key] = net
+        nets.append(net)
+    return nets
+
+
+def graph_from_bytes(data: bytes | bytearray) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Loads a graph saved by graph_to_bytes as copapy values.
+
+    Arguments:
+        data: Serialized graph
+
+    Returns:
+        Tuple of inputs and outputs by name, with values, vectors, tensors
+        and lists like they were saved
+    """
+    nets: list[Net | None] = []
+
+    def get_value(ir: dag_ir, i: int, dtype: str) -> value[Any]:
+        if not nets:
+            nets.extend(get_graph_nets(ir))
+        net = nets[i]
+        assert net, "Named value without result in graph data"
+        return value(net, dtype)
+
+    _, inputs, outputs = _read_graph(data, get_value)
+    return inputs, outputs
+
+
+def save_graph(path: str, inputs: dict[str, Any], outputs: dict[str, Any]) -> None:
+    """Saves a traced graph with named inputs and outputs to a file, so it can
+    be loaded by load_graph without tracing it again.
+
+    Arguments:
+        path: File name
+        inputs: Input values, vectors, tensors or lists of them by name
+        outputs: Computed values, vectors, tensors or lists of them by name
+    """
+    data = graph_to_bytes(inputs, outputs)
+    fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.remove(tmp_name)
+        raise
+
+
+def load_graph(path: str) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Loads a graph saved by save_graph. No user code is run.
+
+    Arguments:
+        path: File name
+
+    Returns:
+        Tuple of inputs and outputs by name
+    """
+    with open(path, 'rb') as f:
+        return graph_from_bytes(f.read())
@@ -0,0 +1,320 @@
+from typing import Iterable, Iterator
+from array import array
+import heapq
+import sys
+from . import _binwrite as binw
+from ._basic_types import Net, Node, CPConstant, Op, transl_type
+
+DTYPE_NAMES = ('int', 'float')
+DTYPE_CODES = {name: i for i, name in enumerate(DTYPE_NAMES)}
+
+DAG_IR_MAGIC = b'CPIR'
+DAG_IR_VERSION = 1
+
+
+class dag_ir():
+    """Numbered SSA form of a traced DAG. Nodes are numbered in topological
+    order, every node is referenced by its index and all operands of a node
+    have lower indices than the node itself.
+
+    Attributes:
+        op_names (list[str]): Op name for each op code
+        codes (array): Op code for each node
+        arg_offsets (array): Operands of node i are args[arg_offsets[i]:arg_offsets[i + 1]]
+        args (array): Flat array of operand node indices
+        dtypes (array): Result data type code for each node (-1 if the node has no result)
+        constants (dict[int, int | float]): Values of constant nodes
+        inputs (set[int]): Constant nodes that are variables and can be written by the host
+        nets (list[Net | None]): Net of the traced graph for each node
+        commutative (set[int]): Op codes of ops with swappable operands
+        net_aliases (dict[Net, int]): Nets of the traced graph that were merged into
+            other nodes by optimization passes
+    """
+    def __init__(self) -> None:
+        self.op_names: list[str] = []
+        self._op_lookup: dict[str, int] = {}
+        self.codes = array('i')
+        self.arg_offsets = array('i', [0])
+        self.args = array('i')
+        self.dtypes = array('b')
+        self.constants: dict[int, int | float] = {}
+        self.inputs: set[int] = set()
+        self.nets: list[Net | None] = []
+        self.commutative: set[int] = set()
+        self.net_aliases: dict[Net, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def op_code(self, name: str) -> int:
+        """Returns the op code for an op name, a new code is assigned if
+        the name is not yet known."""
+        code = self._op_lookup.get(name)
+        if code is None:
+            code = len(self.op_names)
+            self._op_lookup[name] = code
+            self.op_names.append(name)
+        return code
+
+    def add_node(self, name: str, args: Iterable[int], dtype: str | None, commutative: bool = False) -> int:
+        """Appends a node and returns its index.
+
+        Arguments:
+            name: Op name of the node
+            args: Indices of the operand nodes
+            dtype: Result data type or None if the node has no result
+            commutative: Operands of the op can be swapped
+
+        Returns:
+            Index of the new node
+        """
+        code = self.op_code(name)
+        if commutative:
+            self.commutative.add(code)
+        self.codes.append(code)
+        self.args.extend(args)
+        self.arg_offsets.append(len(self.args))
+        self.dtypes.append(DTYPE_CODES[transl_type(dtype)] if dtype else -1)
+        self.nets.append(None)
+        return len(self.codes) - 1
+
+    def get_args(self, index: int) -> array:  # type: ignore[type-arg]
+        """Returns the operand indices of a node."""
+        return self.args[self.arg_offsets[index]:self.arg_offsets[index + 1]]
+
+    def get_name(self, index: int) -> str:
+        """Returns the op name of a node."""
+        return self.op_names[self.codes[index]]
+
+    def get_dtype(self, index: int) -> str:
+        """Returns the result data type of a node."""
+        return DTYPE_NAMES[self.dtypes[index]]
+
+    def get_user_counts(self) -> array:  # type: ignore[type-arg]
+        """Returns for each node the number of operands referencing it."""
+        counts = array('i', [0]) * len(self.codes)
+        for a in self.args:
+            counts[a] += 1
+        return counts
+
+    def reordered(self, order: list[int]) -> 'dag_ir':
+        """Returns a copy with nodes renumbered in the given order.
+
+        Arguments:
+            order: Old node indices in the new order, operands must
+                come before their users. Nodes not listed are dropped.
+
+        Returns:
+            The renumbered DAG
+        """
+        ir = dag_ir()
+        ir.op_names = self.op_names.copy()
+        ir._op_lookup = self._op_lookup.copy()
+        ir.commutative = self.commutative.copy()
+        new_index = array('i', [-1]) * len(self.codes)
+        for old_i in order:
+            i = len(ir.codes)
+            new_index[old_i] = i
+            ir.codes.append(self.codes[old_i])
+            ir.args.extend(new_index[a] for a in self.get_args(old_i))
+            ir.arg_offsets.append(len(ir.args))
+            ir.dtypes.append(self.dtypes[old_i])
+            ir.nets.append(self.nets[old_i])
+        assert all(a >= 0 for a in ir.args), "Operands must come before their users"
+        ir.constants = {new_index[i]: v for i, v in self.constants.items() if new_index[i] >= 0}
+        ir.inputs = {new_index[i] for i in self.inputs if new_index[i] >= 0}
+        ir.net_aliases = {net: new_index[i] for net, i in self.net_aliases.items() if new_index[i] >= 0}
+        return ir
+
+    def to_bytes(self) -> bytes:
+        """Serialize the DAG to a compact binary form. The nets of the
+        traced graph are not included.
+
+        Returns:
+            Serialized DAG that can be loaded by dag_ir.from_bytes
+        """
+        dw = binw.data_writer('little')
+        dw.write_bytes(DAG_IR_MAGIC)
+        dw.write_int(DAG_IR_VERSION)
+        dw.write_int(len(self.op_names))
+        for name in self.op_names:
+            encoded_name = name.encode()
+            dw.write_int(len(encoded_name))
+            dw.write_bytes(encoded_name)
+        const_indices = sorted(self.constants)
+        int_indices = [i for i in const_indices if not isinstance(self.constants[i], float)]
+        float_indices = [i for i in const_indices if isinstance(self.constants[i], float)]
+
+        def write_array(arr: array) -> None:  # type: ignore[type-arg]
+            if sys.byteorder != 'little':
+                arr = array(arr.typecode, arr.tobytes())
+                arr.byteswap()
+            dw.write_int(len(arr))
+            dw.write_bytes(arr.tobytes())
+
+        write_array(self.codes)
+        write_array(self.arg_offsets)
+        write_array(self.args)
+        write_array(self.dtypes)
+        write_array(array('i', sorted(self.commutative)))
+        write_array(array('i', sorted(self.inputs)))
+        write_array(array('i', int_indices))
+        write_array(array('q', (int(self.constants[i]) for i in int_indices)))
+        write_array(array('i', float_indices))
+        write_array(array('d', (self.constants[i] for i in float_indices)))
+        return dw.get_data()
+
+    @staticmethod
+    def from_bytes(data: bytes) -> 'dag_ir':
+        """Load a DAG serialized by dag_ir.to_bytes. The nets of
+        all nodes are None.
+
+        Arguments:
+            data: Serialized DAG
+
+        Returns:
+            The DAG in numbered SSA form
+        """
+        dr = binw.data_reader(data, 'little')
+        if dr.read_bytes(4) != DAG_IR_MAGIC or dr.read_int() != DAG_IR_VERSION:
+            raise ValueError("Data is not a serialized DAG of a supported version")
+        ir = dag_ir()
+        for _ in range(dr.read_int()):
+            ir.op_code(bytes(dr.read_bytes(dr.read_int())).decode())
+
+        def read_array(typecode: str) -> array:  # type: ignore[type-arg]
+            arr = array(typecode)
+            length = dr.read_int()
+            arr.frombytes(dr.read_bytes(length * arr.itemsize))
+            if sys.byteorder != 'little':
+                arr.byteswap()
+            return arr
+
+        ir.codes = read_array('i')
+        ir.arg_offsets = read_array('i')
+        ir.args = read_array('i')
+        ir.dtypes = read_array('b')
+        ir.commutative = set(read_array('i'))
+        ir.inputs = set(read_array('i'))
+        ir.constants = dict(zip(read_array('i'), read_array('q')))
+        ir.constants.update(zip(read_array('i'), read_array('d')))
+        ir.nets = [None] * len(ir.codes)
+        return ir
+
+    def iter_nodes(self) -> Iterator[tuple[int, int, array]]:  # type: ignore[type-arg]
+        """Yields tuples of node index, op code and operand indices."""
+        args = self.args
+        offs = self.arg_offsets
+        for i, code in enumerate(self.codes):
+            yield i, code, args[offs[i]:offs[i + 1]]
+
+
+def stable_toposort_indices(adj: list[list[int]], indeg: list[int]) -> list[int]:
+    """Perform a stable topological sort on a DAG given by node indices.
+
+    Nodes are expected to be numbered by their first appearance. Of all nodes
+    that are ready to be emitted, the one with the lowest index is emitted
+    first. A heap is used for selection, so sorting scales with O(n log n).
+
+    Arguments:
+        adj: Successor indices for each node index
+        indeg: Number of predecessors for each node index
+
+    Returns:
+        List of node indices in topologically sorted order.
+    """
+    indeg = indeg.copy()
+    heap = [i for i, d in enumerate(indeg) if d == 0]  # ascending, so already a valid heap
+    result: list[int] = []
+
+    while heap:
+        i = heapq.heappop(heap)
+        result.append(i)
+
+        for nei in adj[i]:
+            indeg[nei] -= 1
+            if indeg[nei] == 0:
+                heapq.heappush(heap, nei)
+
+    # Check if graph had a cycle (not all nodes output)
+    if len(result) != len(indeg):
+        raise ValueError("Graph contains a cycle — topological sort not possible")
+
+    return result
+
+
+def lower_dag(node_list: Iterable[Node]) -> dag_ir:
+    """Lowers the traced DAG identified by the provided end nodes to the
+    numbered SSA form. Equivalent nodes are merged and the nodes are
+    numbered in the same stable topological order as produced by
+    stable_toposort(get_all_dag_edges(node_list)).
+
+    Arguments:
+        node_list: End nodes of the DAG, constant nodes are
+            included even if they have no users
+
+    Returns:
+        The DAG in numbered SSA form
+    """
+    # Number nodes by first appearance in the edge stream
+    index: dict[Node, int] = {}
+    nodes: list[Node] = []
+    result_nets: list[Net | None] = []
+    operands: list[list[int]] = []
+    adj: list[list[int]] = []
+    indeg: list[int] = []
+    expanded: list[bool] = []
+
+    def get_index(node: Node) -> int:
+        i = index.get(node)
+        if i is None:
+            i = len(nodes)
+            index[node] = i
+            nodes.append(node)
+            result_nets.append(None)
+            operands.append([])
+            adj.append([])
+            indeg.append(0)
+            expanded.append(False)
+        return i
+
+    node_stack = list(node_list)
+    while node_stack:
+        node = node_stack.pop()
+        v = index.get(node, -1)
+        if v >= 0 and expanded[v]:
+            continue
+        for net in node.args:
+            u = get_index(net.source)
+            if result_nets[u] is None:
+                result_nets[u] = net  # First net seen for a node is used as the canonical one
+            if v < 0:
+                v = get_index(node)
+            if u not in operands[v]:
+                adj[u].append(v)
+                indeg[v] += 1
+                node_stack.append(nodes[u])
+            operands[v].append(u)
+        if v < 0 and isinstance(node, CPConstant):
+            # Constant end node without users, e.g. a declared input
+            v = get_index(node)
+            result_nets[v] = Net(node.dtype, node)
+        if v >= 0:
+            expanded[v] = True
+
+    # Build arrays in topological order
+    ir = dag_ir()
+    new_index = [0] * len(nodes)
+    for old_i in stable_toposort_indices(adj, indeg):
+        node = nodes[old_i]
+        result_net = result_nets[old_i]
+        i = ir.add_node(node.name, (new_index[u] for u in operands[old_i]), result_net.dtype if result_net else None,
+                        isinstance(node, Op) and node.commutative)
+        new_index[old_i] = i
+        ir.nets[i] = result_net
+        if isinstance(node, CPConstant):
+            ir.constants[i] = node.value
+            if not node.anonymous:
+                ir.inputs.add(i)
+
+    return ir
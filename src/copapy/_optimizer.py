@@ -0,0 +1,396 @@
+from typing import Any, Callable, Iterable
+from array import array
+import math
+from ._ir import dag_ir, lower_dag, DTYPE_NAMES
+from ._basic_types import Net, Node
+
+
+def _wrap_int(val: int) -> int:
+    """Wraps an integer to the 32 bit two's complement range of the target."""
+    return (val + 0x80000000) % 0x100000000 - 0x80000000
+
+
+def _shift(val: int, shift: int, left: bool) -> int:
+    if not 0 <= shift < 32:
+        raise ValueError("Shift count out of range")  # Undefined behavior in C
+    return val << shift if left else val >> shift
+
+
+def _floordiv(a: int | float, b: int | float) -> int | float:
+    if isinstance(a, int) and isinstance(b, int):
+        return a // b
+    return math.floor(a / b)
+
+
+def _c_mod(a: int | float, b: int | float) -> int | float:
+    # Sign of the result follows the dividend like in C
+    return int(math.fmod(a, b)) if isinstance(a, int) and isinstance(b, int) else math.fmod(a, b)
+
+
+# Host implementations of stencils for folding constant nodes, by untyped op name
+fold_functions: dict[str, Callable[..., int | float]] = {
+    'add': lambda a, b: a + b,
+    'sub': lambda a, b: a - b,
+    'mul': lambda a, b: a * b,
+    'div': lambda a, b: float(a) / float(b),
+    'floordiv': _floordiv,
+    'mod': _c_mod,
+    'gt': lambda a, b: int(a > b),
+    'ge': lambda a, b: int(a >= b),
+    'eq': lambda a, b: int(a == b),
+    'ne': lambda a, b: int(a != b),
+    'bwand': lambda a, b: a & b,
+    'bwor': lambda a, b: a | b,
+    'bwxor': lambda a, b: a ^ b,
+    'lshift': lambda a, b: _shift(a, b, True),
+    'rshift': lambda a, b: _shift(a, b, False),
+    'neg': lambda a: -a,
+    'abs': abs,
+    'sign': lambda a: int((a > 0) - (a < 0)),
+    'sqrt': math.sqrt,
+    'exp': math.exp,
+    'log': math.log,
+    'sin': math.sin,
+    'cos': math.cos,
+    'tan': math.tan,
+    'asin': math.asin,
+    'acos': math.acos,
+    'atan': math.atan,
+    'atan2': math.atan2,
+    'pow': math.pow,
+    'min': min,
+    'max': max,
+}
+
+
+def get_division_magic(divisor: int) -> tuple[int, int]:
+    """Returns the magic number and shift for dividing 32 bit integers by a
+    constant with the floordiv_magic/tdiv_magic stencils.
+
+    Arguments:
+        divisor: Divisor, must be at least 2
+
+    Returns:
+        Tuple of magic number ceil(2**(31 + shift) / divisor) and shift ceil(log2(divisor))
+    """
+    assert divisor >= 2
+    shift = (divisor - 1).bit_length()
+    return -(-(1 << (31 + shift)) // divisor), shift
+
+
+def get_base_name(ir: dag_ir, index: int) -> str:
+    """Returns the op name of a node without the operand types."""
+    arg_count = ir.arg_offsets[index + 1] - ir.arg_offsets[index]
+    name = ir.get_name(index)
+    return name.rsplit('_', arg_count)[0] if arg_count else name
+
+
+def ir_simplify(ir: dag_ir, strength_reduction: bool = True) -> dag_ir:
+    """Fold constant subgraphs and apply algebraic simplifications to the
+    numbered SSA form:
+
+    - Ops with only anonymous constant operands are evaluated
+    - x - c is rewritten to x + (-c)
+    - Constants are regrouped in add and mul chains: (x + c1) + c2 -> x + (c1 + c2)
+    - x + 0, x * 1, x * 0, neg(neg(x)) and x - x are eliminated
+    - Equal ops on equal operands are merged
+    - Nodes that are no longer used are removed
+
+    With strength reduction, ops with a constant second operand are replaced
+    by cheaper ones:
+
+    - x / c -> x * (1 / c)
+    - Integer x // c and x % c -> multiply-shift (magic number) division
+    - Integer x * 2**n -> x << n, x // 2**n -> x >> n
+    - x ** 0.5 -> sqrt(x), x ** n -> square-and-multiply chain of
+      mul ops for float x and integer n (reciprocal for negative n)
+
+    Input constants (variables) are never folded. Nets of removed nodes are
+    kept in net_aliases of the returned DAG.
+
+    Arguments:
+        ir: DAG in numbered SSA form
+        strength_reduction: Replace expensive ops with constant operands
+
+    Returns:
+        The simplified DAG
+    """
+    new = dag_ir()
+    repl = array('i', [-1]) * len(ir)
+    const_lookup: dict[tuple[Any, ...], int] = {}
+    node_lookup: dict[tuple[Any, ...], int] = {}
+    store_codes = {c for c, name in enumerate(ir.op_names) if name.startswith('store_')}
+    float_code = DTYPE_NAMES.index('float')
+    int_code = DTYPE_NAMES.index('int')
+
+    def is_const(j: int) -> bool:
+        return j in new.constants and j not in new.inputs
+
+    def add_const(val: int | float, dtype: int) -> int:
+        if dtype == float_code:
+            val = float(val)
+            key: tuple[Any, ...] = (dtype, val, math.copysign(1.0, val))
+        else:
+            val = _wrap_int(int(val))
+            key = (dtype, val)
+        j = const_lookup.get(key)
+        if j is None:
+            j = new.add_node(f"const_{DTYPE_NAMES[dtype]}", [], DTYPE_NAMES[dtype])
+            new.constants[j] = val
+            const_lookup[key] = j
+        return j
+
+    def add_op(op: str, args: list[int], dtype: int, commutative: bool) -> int:
+        name = '_'.join([op] + [DTYPE_NAMES[new.dtypes[a]] for a in args])
+        key = (name, *(sorted(args) if commutative else args))
+        j = node_lookup.get(key)
+        if j is None:
+            j = new.add_node(name, args, DTYPE_NAMES[dtype], commutative)
+            node_lookup[key] = j
+        return j
+
+    def simplify_op(op: str, args: list[int], dtype: int, commutative: bool) -> int:
+        # Fold ops with constant operands
+        if args and op in fold_functions and all(is_const(a) for a in args):
+            try:
+                val = fold_functions[op](*(new.constants[a] for a in args))
+            except (ArithmeticError, ValueError):
+                pass
+            else:
+                if dtype != float_code or math.isfinite(val):
+                    return add_const(val, dtype)
+
+        if op == 'neg' and get_base_name(new, args[0]) == 'neg':
+            return int(new.get_args(args[0])[0])
+
+        if op == 'sub' and args[0] == args[1]:
+            return add_const(0, dtype)
+
+        if op == 'sub' and is_const(args[1]):
+            op, commutative = 'add', True
+            args = [args[0], add_const(-new.constants[args[1]], new.dtypes[args[1]])]
+
+        if strength_reduction and op == 'div' and is_const(args[1]) and new.constants[args[1]]:
+            reciprocal = 1.0 / new.constants[args[1]]
+            if math.isfinite(reciprocal) and reciprocal:
+                op, commutative = 'mul', True
+                args = [args[0], add_const(reciprocal, float_code)]
+
+        if op in ('add', 'mul'):
+            if is_const(args[0]):
+                args = args[::-1]
+            x, c = args
+            if is_const(c):
+                # Regroup constants of chained ops
+                if get_base_name(new, x) == op and is_const(new.get_args(x)[1]):
+                    x, c2 = new.get_args(x)
+                    c_type = float_code if float_code in (new.dtypes[c], new.dtypes[c2]) else new.dtypes[c]
+                    c = add_const(fold_functions[op](new.constants[c2], new.constants[c]), c_type)
+                    args = [x, c]
+
+                # Identities
+                neutral = 0 if op == 'add' else 1
+                if new.constants[c] == neutral and new.dtypes[x] == dtype:
+                    return x
+                if op == 'mul' and new.constants[c] == 0:
+                    return add_const(0, dtype)
+
+                if strength_reduction and op == 'mul' and dtype == int_code == new.dtypes[x] == new.dtypes[c]:
+                    factor = int(new.constants[c])
+                    if factor > 0 and not factor & (factor - 1):
+                        return add_op('lshift', [x, add_const(factor.bit_length() - 1, int_code)], dtype, False)
+
+        if strength_reduction and len(args) == 2 and is_const(args[1]):
+            x, c = args
+
+            if op in ('floordiv', 'mod') and dtype == int_code == new.dtypes[x] == new.dtypes[c]:
+                divisor = int(new.constants[c])
+                if op == 'mod' and divisor != -0x80000000:
+                    divisor = abs(divisor)  # Sign of the result follows the dividend
+                if divisor == 1:
+                    return x if op == 'floordiv' else add_const(0, dtype)
+                if divisor > 1:
+                    magic, shift = get_division_magic(divisor)
+                    if op == 'floordiv':
+                        if not divisor & (divisor - 1):
+                            return add_op('rshift', [x, add_const(shift, int_code)], dtype, False)
+                        return add_op(f"floordiv_magic{shift}", [x, add_const(magic, int_code)], dtype, False)
+                    quotient = add_op(f"tdiv_magic{shift}", [x, add_const(magic, int_code)], dtype, False)
+                    product = add_op('mul', [quotient, add_const(-divisor, int_code)], dtype, True)
+                    return add_op('add', [x, product], dtype, True)
+
+            if op == 'pow':
+                exponent = new.constants[c]
+                if exponent == 0.5:
+                    return add_op('sqrt', [x], dtype, False)
+                if new.dtypes[x] == float_code and float(exponent).is_integer() and 0 < abs(exponent) <= 64:
+                    # Square-and-multiply
+                    n = abs(int(exponent))
+                    base = x
+                    result = -1
+                    while n:
+                        if n & 1:
+                            result = base if result < 0 else add_op('mul', [result, base], float_code, True)
+                        n >>= 1
+                        if n:
+                            base = add_op('mul', [base, base], float_code, True)
+                    if exponent < 0:
+                        return add_op('div', [add_const(1.0, float_code), result], float_code, False)
+                    return result
+
+        return add_op(op, args, dtype, commutative)
+
+    for i, code, args in ir.iter_nodes():
+        if i in ir.inputs:
+            j = new.add_node(ir.get_name(i), [], ir.get_dtype(i))
+            new.constants[j] = ir.constants[i]
+            new.inputs.add(j)
+        elif i in ir.constants:
+            j = add_const(ir.constants[i], ir.dtypes[i])
+        elif code in store_codes:
+            j = new.add_node(ir.get_name(i), [repl[a] for a in args], None)
+        else:
+            j = simplify_op(get_base_name(ir, i), [repl[a] for a in args], ir.dtypes[i], code in ir.commutative)
+        repl[i] = j
+
+        net = ir.nets[i]
+        if net is not None:
+            if new.nets[j] is None:
+                new.nets[j] = net
+            elif new.nets[j] is not net:
+                new.net_aliases[net] = j
+
+    new.net_aliases.update((net, repl[i]) for net, i in ir.net_aliases.items())
+
+    # Remove nodes without users, except inputs and end nodes of the original DAG
+    live = bytearray(len(new))
+    for i in new.inputs:
+        live[i] = 1
+    for i, count in enumerate(ir.get_user_counts()):
+        if not count:
+            live[repl[i]] = 1
+    for j in range(len(new) - 1, -1, -1):
+        if live[j]:
+            for a in new.get_args(j):
+                live[a] = 1
+
+    if all(live):
+        return new
+    return new.reordered([j for j in range(len(new)) if live[j]])
+
+
+def ir_fuse(ir: dag_ir) -> dag_ir:
+    """Replace patterns of the numbered SSA form by fused stencils:
+
+    - x * x -> square(x)
+    - x * x + y * y -> sum_sq(x, y)
+    - c + a * b -> add_mul(c, a, b), or mul_add(a, b, c)
+    - c - a * b -> sub_mul(c, a, b)
+    - a * b - c -> mul_sub(a, b, c)
+
+    A mul node is only absorbed if the fused node is its only user. The third
+    operand of fused ops is read from memory, so constants or inputs are
+    preferred for this operand.
+
+    Arguments:
+        ir: DAG in numbered SSA form
+
+    Returns:
+        The DAG with fused nodes
+    """
+    user_counts = ir.get_user_counts()
+    alias_nodes = set(ir.net_aliases.values())
+    absorbed = bytearray(len(ir))
+    fused: dict[int, tuple[str, list[int], bool]] = {}
+
+    def is_square(j: int) -> bool:
+        return get_base_name(ir, j) == 'mul' and ir.get_args(j)[0] == ir.get_args(j)[1]
+
+    def is_fusable(j: int) -> bool:
+        return get_base_name(ir, j) == 'mul' and user_counts[j] == 1 and j not in alias_nodes
+
+    def get_mul_args(j: int) -> list[int]:
+        # Constants are preferred as second factor, which is read from memory
+        a, b = ir.get_args(j)
+        return [b, a] if a in ir.constants and b not in ir.constants else [a, b]
+
+    for i, _, args in ir.iter_nodes():
+        op = get_base_name(ir, i)
+        if op == 'mul' and args[0] == args[1]:
+            fused[i] = ('square', [args[0]], False)
+        elif op in ('add', 'sub') and args[0] != args[1]:
+            x, y = args
+            if op == 'add' and is_square(x) and is_square(y) and is_fusable(x) and is_fusable(y):
+                fused[i] = ('sum_sq', [ir.get_args(x)[0], ir.get_args(y)[0]], True)
+                absorbed[x] = absorbed[y] = 1
+            elif op == 'sub' and is_fusable(y):
+                fused[i] = ('sub_mul', [x] + get_mul_args(y), False)
+                absorbed[y] = 1
+            elif op == 'sub' and is_fusable(x):
+                fused[i] = ('mul_sub', get_mul_args(x) + [y], True)
+                absorbed[x] = 1
+            elif op == 'add':
+                for mul, c in ((y, x), (x, y)):
+                    if is_fusable(mul):
+                        a, b = get_mul_args(mul)
+                        if c in ir.constants and b not in ir.constants:
+                            fused[i] = ('mul_add', [a, b, c], True)
+                        else:
+                            fused[i] = ('add_mul', [c, a, b], False)
+                        absorbed[mul] = 1
+                        break
+
+    if not fused:
+        return ir
+
+    new = dag_ir()
+    repl = array('i', [-1]) * len(ir)
+    for i, code, args in ir.iter_nodes():
+        if absorbed[i]:
+            continue
+        if i in fused:
+            op, new_args, commutative = fused[i]
+            new_args = [repl[a] for a in new_args]
+            name = '_'.join([op] + [DTYPE_NAMES[new.dtypes[a]] for a in new_args])
+            j = new.add_node(name, new_args, DTYPE_NAMES[ir.dtypes[i]], commutative)
+        else:
+            j = new.add_node(ir.get_name(i), [repl[a] for a in args],
+                             DTYPE_NAMES[ir.dtypes[i]] if ir.dtypes[i] >= 0 else None,
+                             code in ir.commutative)
+        if i in ir.constants:
+            new.constants[j] = ir.constants[i]
+            if i in ir.inputs:
+                new.inputs.add(j)
+        new.nets[j] = ir.nets[i]
+        repl[i] = j
+
+    new.net_aliases = {net: repl[i] for net, i in ir.net_aliases.items()}
+    return new
+
+
+def get_simplify_stats(node_list: Iterable[Node | Net]) -> dict[str, int]:
+    """Get the number of ops eliminated by ir_simplify for the DAG
+    identified by provided end nodes
+
+    Arguments:
+        node_list: List of end nodes of the DAG
+
+    Returns:
+        Dictionary of op name to number of eliminated ops. The number is
+        negative if ops were added by rewriting.
+    """
+    def count_ops(ir: dag_ir) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for i in range(len(ir)):
+            if i not in ir.constants:
+                name = ir.get_name(i)
+                counts[name] = counts.get(name, 0) + 1
+        return counts
+
+    ir = lower_dag(n.source if isinstance(n, Net) else n for n in node_list)
+    before = count_ops(ir)
+    after = count_ops(ir_simplify(ir))
+
+    return {name: before.get(name, 0) - after.get(name, 0)
+            for name in before.keys() | after.keys()
+            if before.get(name, 0) != after.get(name, 0)}
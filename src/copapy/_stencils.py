@@ -2,7 +2,9 @@ from dataclasses import dataclass
 from typing import Generator, Literal, Iterable, TYPE_CHECKING
 import struct
 import platform
+import hashlib
 import os
+from . import _binwrite as binw
 
 if TYPE_CHECKING:
     import pelfy
@@ -10,7 +12,10 @@ else:
     try:
         from ._vendor import pelfy
     except ImportError:
-        import pelfy
+        try:
+            import pelfy
+        except ImportError:
+            pelfy = None  # Only required for loading ELF object files
 
 
 ByteOrder = Literal['little', 'big']
@@ -20,6 +25,17 @@ ByteOrder = Literal['little', 'big']
 class relocation_entry:
     """
     A dataclass for representing a relocation entry
+
+    Attributes:
+        target_symbol_name (str): Name of the symbol the relocation points to
+        target_symbol_info (str): Type of the target symbol (STT_FUNC, STT_OBJECT, ...)
+        target_symbol_offset (int): Value of the target symbol
+        target_section_index (int): Section index of the target symbol
+        function_offset (int): Offset of the patched function in its section
+        start (int): Start of the stencil code in the function
+        reloc_type (str): ELF relocation type
+        reloc_offset (int): Offset of the patch location in the section
+        reloc_addend (int): Addend of the relocation
     """
     target_symbol_name: str
     target_symbol_info: str
@@ -27,7 +43,9 @@ class relocation_entry:
     target_section_index: int
     function_offset: int
     start: int
-    pelfy_reloc: pelfy.elf_relocation
+    reloc_type: str
+    reloc_offset: int
+    reloc_addend: int
 
 
 @dataclass
@@ -81,7 +99,7 @@ def detect_process_arch() -> str:
     return arch_family
 
 
-def get_return_function_type(symbol: pelfy.elf_symbol) -> str:
+def get_return_function_type(symbol: 'pelfy.elf_symbol') -> str:
     if symbol.relocations:
         for reloc in reversed(symbol.relocations):
             func_name = reloc.symbol.name
@@ -90,7 +108,7 @@ def get_return_function_type(symbol: pelfy.elf_symbol) -> str:
     return 'void'
 
 
-def get_stencil_position(func: pelfy.elf_symbol) -> tuple[int, int]:
+def get_stencil_position(func: 'pelfy.elf_symbol') -> tuple[int, int]:
     start_index = 0  # There must be no prolog
 
     # Find last relocation in function
@@ -112,7 +130,7 @@ def get_stencil_position(func: pelfy.elf_symbol) -> tuple[int, int]:
     return start_index, end_index
 
 
-def get_last_call_in_function(func: pelfy.elf_symbol) -> int:
+def get_last_call_in_function(func: 'pelfy.elf_symbol') -> int:
     # Find last relocation in function
     assert func.relocations, f'No call function in stencil function {func.name}.'
     reloc = func.relocations[-1]
@@ -127,7 +145,7 @@ def get_last_call_in_function(func: pelfy.elf_symbol) -> int:
         return reloc.fields['r_offset'] - func.offset_in_section + address_field_length - instruction_lengths
 
 
-def get_op_after_last_call_in_function(func: pelfy.elf_symbol) -> int:
+def get_op_after_last_call_in_function(func: 'pelfy.elf_symbol') -> int:
     # Find last relocation in function
     assert func.relocations, f'No call function in stencil function {func.name}.'
     reloc = func.relocations[-1]
@@ -157,10 +175,12 @@ class stencil_database():
         Arguments:
             obj_file: path to the ELF object file or bytes of the ELF object file
         """
+        assert pelfy, "pelfy is required for loading ELF object files"
         if isinstance(obj_file, str):
-            self.elf = pelfy.open_elf_file(obj_file)
-        else:
-            self.elf = pelfy.elf_file(obj_file)
+            with open(obj_file, 'rb') as f:
+                obj_file = f.read()
+        self.obj_hash = hashlib.sha256(obj_file).digest()
+        self.elf = pelfy.elf_file(obj_file)
 
         self.stencil_definitions = {s.name: get_return_function_type(s)
                                     for s in self.elf.symbols
@@ -227,7 +247,9 @@ class stencil_database():
                                        reloc.symbol.fields['st_shndx'],
                                        symbol.offset_in_section,
                                        start_index,
-                                       reloc)
+                                       reloc.type,
+                                       reloc.fields['r_offset'],
+                                       reloc.fields['r_addend'])
                 cache.append(reloc_entry)
                 yield reloc_entry
 
@@ -244,135 +266,134 @@ class stencil_database():
         Yields:
             patch_entry: every relocation for the symbol
         """
-        pr = relocation.pelfy_reloc
+        reloc_type = relocation.reloc_type
+        addend = relocation.reloc_addend
 
         # calculate absolut address to the first byte to patch
         # relative to the start of the (stripped stencil) function:
-        patch_offset = pr.fields['r_offset'] - relocation.function_offset - relocation.start + function_offset
+        patch_offset = relocation.reloc_offset - relocation.function_offset - relocation.start + function_offset
         #print(f"xx {pr.fields['r_offset'] - relocation.function_offset} {relocation.target_symbol_name=} {pr.fields['r_offset']=} {relocation.function_offset=} {relocation.start=} {function_offset=}")
         scale = 1
         mask = 0xFFFFFFFF  # 32 bit
 
-        #print("------- reloc ", pr.type, pr.target_section.name, pr.symbol.name)
+        #print("------- reloc ", reloc_type, pr.target_section.name, pr.symbol.name)
 
-        if pr.type.endswith('64_PC32') or pr.type.endswith('64_PLT32'):
+        if reloc_type.endswith('64_PC32') or reloc_type.endswith('64_PLT32'):
             # S + A - P
-            addend = add_sign_int32(pr.fields['r_addend'])
-            patch_value = symbol_address + addend - patch_offset
-            #print(f" *> {pr.type} {patch_value=} {symbol_address=} {pr.fields['r_addend']=} {pr.bits=}, {function_offset=} {patch_offset=}")
+            patch_value = symbol_address + add_sign_int32(addend) - patch_offset
+            #print(f" *> {reloc_type} {patch_value=} {symbol_address=} {addend=} {pr.bits=}, {function_offset=} {patch_offset=}")
 
-        elif pr.type == 'R_386_PC32':
+        elif reloc_type == 'R_386_PC32':
             # S + A - P
-            addend = add_sign_int32(pr.fields['r_addend'])
-            patch_value = symbol_address + addend - patch_offset
-            #print(f" *> {pr.type}     {pr.symbol.name} {patch_value=} {symbol_address=} {pr.fields['r_addend']=} {bin(pr.fields['r_addend'])} {pr.bits=}, {function_offset=} {patch_offset=}")
+            patch_value = symbol_address + add_sign_int32(addend) - patch_offset
+            #print(f" *> {reloc_type}     {pr.symbol.name} {patch_value=} {symbol_address=} {addend=} {bin(addend)} {pr.bits=}, {function_offset=} {patch_offset=}")
 
-        elif pr.type == 'R_386_32':
+        elif reloc_type == 'R_386_32':
             # R_386_32
             # S + A
-            patch_value = symbol_address + pr.fields['r_addend']
+            patch_value = symbol_address + addend
             symbol_type = symbol_type + 0x03  # Relative to data section
-            #print(f" *> {pr.type} {patch_value=} {symbol_address=} {pr.fields['r_addend']=} {pr.bits=}, {function_offset=} {patch_offset=}")
+            #print(f" *> {reloc_type} {patch_value=} {symbol_address=} {addend=} {pr.bits=}, {function_offset=} {patch_offset=}")
 
-        elif pr.type.endswith('_ARM_JUMP24') or pr.type.endswith('_ARM_CALL'):
+        elif reloc_type.endswith('_ARM_JUMP24') or reloc_type.endswith('_ARM_CALL'):
             # R_ARM_JUMP24 & R_ARM_CALL
             # ((S + A) - P) >> 2
             mask = 0xffffff  # 24 bit
-            patch_value = symbol_address + pr.fields['r_addend'] - patch_offset
+            patch_value = symbol_address + addend - patch_offset
             scale = 4
 
-        elif pr.type.endswith('_CALL26') or pr.type.endswith('_JUMP26'):
+        elif reloc_type.endswith('_CALL26') or reloc_type.endswith('_JUMP26'):
             # R_AARCH64_CALL26
             # ((S + A) - P) >> 2
-            assert pr.file.byteorder == 'little', "Big endian not supported for ARM64"
+            assert self.byteorder == 'little', "Big endian not supported for ARM64"
             mask = 0x3ffffff  # 26 bit (1<<26)-1
-            patch_value = symbol_address + pr.fields['r_addend'] - patch_offset
+            patch_value = symbol_address + addend - patch_offset
             scale = 4
 
-        elif pr.type.endswith('_ADR_PREL_PG_HI21'):
+        elif reloc_type.endswith('_ADR_PREL_PG_HI21'):
             # R_AARCH64_ADR_PREL_PG_HI21
-            assert pr.file.byteorder == 'little', "Big endian not supported for ARM64"
+            assert self.byteorder == 'little', "Big endian not supported for ARM64"
             mask = 0  # Handled by runner
-            patch_value = symbol_address + pr.fields['r_addend']
+            patch_value = symbol_address + addend
             scale = 4096
             symbol_type = symbol_type + 0x01  # HI21
-            #print(f" *> {patch_value=} {symbol_address=} {pr.fields['r_addend']=}, {function_offset=}")
+            #print(f" *> {patch_value=} {symbol_address=} {addend=}, {function_offset=}")
 
-        elif pr.type.endswith('_LDST32_ABS_LO12_NC'):
+        elif reloc_type.endswith('_LDST32_ABS_LO12_NC'):
             # R_AARCH64_LDST32_ABS_LO12_NC
             # (S + A) & 0xFFF
             mask = 0b00_1111_1111_1100_0000_0000
-            patch_value = symbol_address + pr.fields['r_addend']
+            patch_value = symbol_address + addend
             symbol_type = symbol_type + 0x02  # Absolut value
             scale = 4
-            #print(f" *> {patch_value=} {symbol_address=} {pr.fields['r_addend']=}, {function_offset=}")
+            #print(f" *> {patch_value=} {symbol_address=} {addend=}, {function_offset=}")
 
-        elif pr.type.endswith('_ADD_ABS_LO12_NC'):
+        elif reloc_type.endswith('_ADD_ABS_LO12_NC'):
             # R_AARCH64_ADD_ABS_LO12_NC
             # (S + A) & 0xFFF
             mask = 0b11_1111_1111_1100_0000_0000
-            patch_value = symbol_address + pr.fields['r_addend']
+            patch_value = symbol_address + addend
             symbol_type = symbol_type + 0x02  # Absolut value
             scale = 1
-            #print(f" *> {patch_value=} {symbol_address=} {pr.fields['r_addend']=}, {function_offset=}")
+            #print(f" *> {patch_value=} {symbol_address=} {addend=}, {function_offset=}")
 
-        elif pr.type.endswith('_LDST64_ABS_LO12_NC'):
+        elif reloc_type.endswith('_LDST64_ABS_LO12_NC'):
             # R_AARCH64_LDST64_ABS_LO12_NC
             # (S + A) & 0xFFF
             mask = 0b00_0111_1111_1100_0000_0000
-            patch_value = symbol_address + pr.fields['r_addend']
+            patch_value = symbol_address + addend
             symbol_type = symbol_type + 0x02  # Absolut value
             scale = 8
-            #print(f" *> {patch_value=} {symbol_address=} {pr.fields['r_addend']=}, {function_offset=}")
+            #print(f" *> {patch_value=} {symbol_address=} {addend=}, {function_offset=}")
 
-        elif pr.type == 'R_ARM_MOVW_ABS_NC':
+        elif reloc_type == 'R_ARM_MOVW_ABS_NC':
             # (S + A) & 0xFFFF
             mask = 0xFFFF
-            patch_value = symbol_address + pr.fields['r_addend']
+            patch_value = symbol_address + addend
             symbol_type = symbol_type + 0x04  # Absolut value
-            #print(f" *> {pr.type} {patch_value=} {symbol_address=}, {function_offset=}")
+            #print(f" *> {reloc_type} {patch_value=} {symbol_address=}, {function_offset=}")
 
-        elif pr.type =='R_ARM_MOVT_ABS':
+        elif reloc_type =='R_ARM_MOVT_ABS':
             # (S + A) & 0xFFFF0000
             mask = 0xFFFF0000
-            patch_value = symbol_address + pr.fields['r_addend']
+            patch_value = symbol_address + addend
             symbol_type = symbol_type + 0x04  # Absolut value
             scale = 0x10000
-            #print(f" *> {pr.type} {patch_value=} {symbol_address=}, {function_offset=}, {pr.fields['r_addend']=}")
+            #print(f" *> {reloc_type} {patch_value=} {symbol_address=}, {function_offset=}, {addend=}")
 
-        elif pr.type.endswith('_ABS32'):
+        elif reloc_type.endswith('_ABS32'):
             # R_ARM_ABS32
             # S + A (replaces full 32 bit)
             assert not patch_offset % 4, 'R_ARM_ABS32 patched data like literals needs to be 4 Byte aligned'
             # This might be caused by the call in entry_function_shell if not aligned
 
-            patch_value = symbol_address + pr.fields['r_addend']
+            patch_value = symbol_address + addend
             symbol_type = symbol_type + 0x03  # Relative to data section
 
-        elif pr.type.endswith('_THM_JUMP24') or pr.type.endswith('_THM_CALL'):
+        elif reloc_type.endswith('_THM_JUMP24') or reloc_type.endswith('_THM_CALL'):
             # R_ARM_THM_JUMP24
             # S + A - P
-            patch_value = symbol_address - patch_offset  + pr.fields['r_addend']
+            patch_value = symbol_address - patch_offset  + addend
             symbol_type = symbol_type + 0x05  # PATCH_FUNC_ARM32_THM
-            #print(f" *> {pr.type} {patch_value=} {symbol_address=} {pr.fields['r_addend']=} {pr.bits=}, {function_offset=} {patch_offset=}")
+            #print(f" *> {reloc_type} {patch_value=} {symbol_address=} {addend=} {pr.bits=}, {function_offset=} {patch_offset=}")
 
-        elif pr.type == 'R_ARM_THM_MOVW_ABS_NC':
+        elif reloc_type == 'R_ARM_THM_MOVW_ABS_NC':
             # (S + A) & 0xFFFF
             mask = 0xFFFF
-            patch_value = symbol_address + pr.fields['r_addend']
+            patch_value = symbol_address + addend
             symbol_type = symbol_type + 0x06  # PATCH_OBJECT_ARM32_ABS_THM
-            #print(f" *> {pr.type} {patch_value=} {symbol_address=}, {function_offset=}, {pr.fields['r_addend']=}")
+            #print(f" *> {reloc_type} {patch_value=} {symbol_address=}, {function_offset=}, {addend=}")
 
-        elif pr.type == 'R_ARM_THM_MOVT_ABS':
+        elif reloc_type == 'R_ARM_THM_MOVT_ABS':
             # (S + A) & 0xFFFF0000
             mask = 0xFFFF0000
-            patch_value = symbol_address + pr.fields['r_addend']
+            patch_value = symbol_address + addend
             symbol_type = symbol_type + 0x06  # PATCH_OBJECT_ARM32_ABS_THM
             scale = 0x10000
-            #print(f" *> {pr.type} {patch_value=} {symbol_address=}, {function_offset=}, {pr.fields['r_addend']=}")
+            #print(f" *> {reloc_type} {patch_value=} {symbol_address=}, {function_offset=}, {addend=}")
 
         else:
-            raise NotImplementedError(f"Relocation type {pr.type} in {relocation.pelfy_reloc.target_section.name} pointing to {relocation.pelfy_reloc.symbol.name} not implemented")
+            raise NotImplementedError(f"Relocation type {reloc_type} in relocation pointing to {relocation.target_symbol_name} not implemented")
 
         return patch_entry(mask, patch_offset, patch_value, scale, symbol_type)
 
@@ -469,3 +490,283 @@ class stencil_database():
             return func.data[index:]
         else:
             return func.data
+
+    def to_index(self) -> bytes:
+        """Serialize everything required for compiling into a binary stencil index
+
+        Returns:
+            Stencil index data that can be loaded by stencil_index
+        """
+        strings: dict[str, int] = {}
+
+        def sid(name: str) -> int:
+            return strings.setdefault(name, len(strings))
+
+        dw = binw.data_writer('little')
+        sections: set[int] = set()
+        for name in self.stencil_definitions:
+            func = self.elf.symbols[name]
+            sections.add(self.get_symbol_section_index(name))
+            const_sections = self.const_sections_from_functions([name])
+            sections |= set(const_sections)
+
+            dw.write_int(sid(name))
+            dw.write_int(self.get_symbol_section_index(name))
+            dw.write_int(self.get_symbol_offset(name))
+            dw.write_int(self.get_symbol_size(name))
+            data = func.data
+            dw.write_int(len(data))
+            dw.write_bytes(data)
+
+            # Stencil code and the parts before and after the last call,
+            # -1 if not available for this function
+            try:
+                code = self.get_stencil_code(name)
+            except AssertionError:
+                code = b''
+                dw.write_int(-1, signed=True)
+            else:
+                dw.write_int(len(code), signed=True)
+            extra = b'' if data.startswith(code) else code
+            dw.write_int(len(extra))
+            dw.write_bytes(extra)
+            for part in ('start', 'end'):
+                try:
+                    part_data = self.get_function_code(name, part)
+                except AssertionError:
+                    dw.write_int(-1, signed=True)
+                else:
+                    dw.write_int(len(part_data) if part == 'start' else len(data) - len(part_data), signed=True)
+
+            dw.write_int(len(func.relocations))
+            for reloc in func.relocations:
+                dw.write_int(sid(reloc.symbol.name))
+                dw.write_int(sid(reloc.symbol.info))
+                dw.write_int(reloc.symbol.fields['st_value'], 8)
+                dw.write_int(reloc.symbol.fields['st_shndx'])
+                dw.write_int(reloc.fields['r_offset'], 8)
+                dw.write_int(reloc.fields['r_addend'], 8, signed=True)
+                dw.write_int(sid(reloc.type))
+
+            dw.write_int(len(const_sections))
+            for index in const_sections:
+                dw.write_int(index)
+            sub_functions = sorted(self.get_sub_functions([name]))
+            dw.write_int(len(sub_functions))
+            for sub_name in sub_functions:
+                dw.write_int(sid(sub_name))
+        function_data = dw.get_data()
+        signatures = [(sid(name), sid(return_type)) for name, return_type in self.stencil_definitions.items()]
+
+        dw = binw.data_writer('little')
+        dw.write_bytes(STENCIL_INDEX_MAGIC)
+        dw.write_int(STENCIL_INDEX_VERSION)
+        dw.write_bytes(self.obj_hash)
+        dw.write_byte(self.byteorder == 'big')
+        dw.write_byte(self.thumb_mode)
+
+        dw.write_int(len(strings))
+        for name in strings:
+            encoded = name.encode()
+            dw.write_int(len(encoded), 2)
+            dw.write_bytes(encoded)
+
+        # Signature table, readable without loading the machine code
+        dw.write_int(len(signatures))
+        for name_id, type_id in signatures:
+            dw.write_int(name_id)
+            dw.write_int(type_id)
+
+        dw.write_int(len(sections))
+        for index in sorted(sections):
+            section_data = self.get_section_data(index)
+            dw.write_int(index)
+            dw.write_int(self.get_section_size(index))
+            dw.write_int(self.get_section_alignment(index))
+            dw.write_int(len(section_data))
+            dw.write_bytes(section_data)
+
+        dw.write_bytes(function_data)
+        return dw.get_data()
+
+
+STENCIL_INDEX_MAGIC = b'CPSI'
+STENCIL_INDEX_VERSION = 1
+
+
+@dataclass
+class function_entry:
+    """
+    A dataclass for representing a function in a stencil index
+
+    Attributes:
+        section_index (int): Index of the code section
+        offset (int): Offset of the function in the section
+        size (int): Size of the function
+        data (bytes): Machine code of the function
+        stencil_code (bytes | None): Striped function code, None if the function is not a stencil
+        start_size (int): Size of the code before the last call, -1 if not available
+        end_start (int): Start of the code after the last call, -1 if not available
+        relocations (list[relocation_entry]): All relocations of the function
+        const_sections (list[int]): Indexes of constant sections used by the function
+        sub_functions (set[str]): All functions called directly or indirectly
+    """
+    section_index: int
+    offset: int
+    size: int
+    data: bytes
+    stencil_code: bytes | None
+    start_size: int
+    end_start: int
+    relocations: list[relocation_entry]
+    const_sections: list[int]
+    sub_functions: set[str]
+
+
+class stencil_index(stencil_database):
+    """A stencil database loaded from a precompiled binary stencil index.
+    It provides the same queries as stencil_database without parsing
+    the ELF object file. Only the signature table is read on creation,
+    code, relocations and sections are loaded on first use.
+
+    Attributes:
+        stencil_definitions (dict[str, str]): dictionary of function names and their return types
+        byteorder (ByteOrder): byte order of the target
+        thumb_mode (bool): entry_function_shell in ARM thumb mode
+        obj_hash (bytes): SHA-256 hash of the ELF object file the index was created from
+    """
+
+    def __init__(self, index_data: bytes, obj_file: bytes | None = None):
+        """Load the stencil database from a stencil index
+
+        Arguments:
+            index_data: data of the stencil index
+            obj_file: optional bytes of the ELF object file to check
+                that the index is up to date
+        """
+        dr = binw.data_reader(index_data, 'little')
+        if dr.read_bytes(4) != STENCIL_INDEX_MAGIC or dr.read_int() != STENCIL_INDEX_VERSION:
+            raise ValueError("Data is not a compatible stencil index")
+        self.obj_hash = bytes(dr.read_bytes(32))
+        if obj_file is not None and hashlib.sha256(obj_file).digest() != self.obj_hash:
+            raise ValueError("Stencil index does not match the object file")
+        self.byteorder = 'big' if dr.read_byte() else 'little'
+        self.thumb_mode = bool(dr.read_byte())
+
+        strings = [bytes(dr.read_bytes(dr.read_int(2))).decode() for _ in range(dr.read_int())]
+        self.stencil_definitions = {strings[dr.read_int()]: strings[dr.read_int()] for _ in range(dr.read_int())}
+
+        # Code, relocations and sections are loaded on first use
+        self._strings = strings
+        self._reader: binw.data_reader | None = dr
+        self._sections: dict[int, tuple[int, int, bytes]] = {}
+        self._functions: dict[str, function_entry] = {}
+        self._relocation_cache = {}
+
+    def _load(self) -> None:
+        dr = self._reader
+        if dr is None:
+            return
+        strings = self._strings
+
+        for _ in range(dr.read_int()):
+            index = dr.read_int()
+            size = dr.read_int()
+            alignment = dr.read_int()
+            self._sections[index] = (size, alignment, bytes(dr.read_bytes(dr.read_int())))
+
+        for _ in range(len(self.stencil_definitions)):
+            name = strings[dr.read_int()]
+            section_index = dr.read_int()
+            offset = dr.read_int()
+            size = dr.read_int()
+            data = bytes(dr.read_bytes(dr.read_int()))
+            code_size = dr.read_int(signed=True)
+            extra = bytes(dr.read_bytes(dr.read_int()))
+            stencil_code = None if code_size < 0 else extra or data[:code_size]
+            start_size = dr.read_int(signed=True)
+            end_start = dr.read_int(signed=True)
+            relocations: list[relocation_entry] = []
+            for _ in range(dr.read_int()):
+                symbol_name = strings[dr.read_int()]
+                symbol_info = strings[dr.read_int()]
+                symbol_offset = dr.read_int(8)
+                symbol_section_index = dr.read_int()
+                reloc_offset = dr.read_int(8)
+                reloc_addend = dr.read_int(8, signed=True)
+                relocations.append(relocation_entry(symbol_name, symbol_info, symbol_offset,
+                                                    symbol_section_index, offset, 0,
+                                                    strings[dr.read_int()], reloc_offset, reloc_addend))
+            const_sections = [dr.read_int() for _ in range(dr.read_int())]
+            sub_functions = {strings[dr.read_int()] for _ in range(dr.read_int())}
+            self._functions[name] = function_entry(section_index, offset, size, data, stencil_code,
+                                                   start_size, end_start, relocations,
+                                                   const_sections, sub_functions)
+        self._reader = None
+
+    def _get_function(self, name: str) -> function_entry:
+        self._load()
+        return self._functions[name]
+
+    def _get_section(self, index: int) -> tuple[int, int, bytes]:
+        self._load()
+        return self._sections[index]
+
+    def const_sections_from_functions(self, symbol_names: Iterable[str]) -> list[int]:
+        ret: set[int] = set()
+        for name in symbol_names:
+            ret.update(self._get_function(name).const_sections)
+        return list(ret)
+
+    def get_relocations(self, symbol_name: str, stencil: bool = False) -> Generator[relocation_entry, None, None]:
+        cache_key = (symbol_name, stencil)
+        if cache_key not in self._relocation_cache:
+            func = self._get_function(symbol_name)
+            if stencil:
+                assert func.stencil_code is not None, f'No call function in stencil function {symbol_name}.'
+                end_index = len(func.stencil_code)
+            else:
+                end_index = func.size
+            self._relocation_cache[cache_key] = [r for r in func.relocations
+                                                 if r.reloc_offset - func.offset < end_index]
+        yield from self._relocation_cache[cache_key]
+
+    def get_stencil_code(self, name: str) -> bytes:
+        code = self._get_function(name).stencil_code
+        assert code is not None, f'No call function in stencil function {name}.'
+        return code
+
+    def get_sub_functions(self, names: Iterable[str]) -> set[str]:
+        name_set: set[str] = set()
+        for name in names:
+            name_set |= self._get_function(name).sub_functions
+        return name_set
+
+    def get_symbol_size(self, name: str) -> int:
+        return self._get_function(name).size
+
+    def get_symbol_offset(self, name: str) -> int:
+        return self._get_function(name).offset
+
+    def get_symbol_section_index(self, name: str) -> int:
+        return self._get_function(name).section_index
+
+    def get_section_size(self, index: int) -> int:
+        return self._get_section(index)[0]
+
+    def get_section_alignment(self, index: int) -> int:
+        return self._get_section(index)[1]
+
+    def get_section_data(self, index: int) -> bytes:
+        return self._get_section(index)[2]
+
+    def get_function_code(self, name: str, part: Literal['full', 'start', 'end'] = 'full') -> bytes:
+        func = self._get_function(name)
+        if part == 'start':
+            assert func.start_size >= 0, f'No call function in stencil function {name}.'
+            return func.data[:func.start_size]
+        elif part == 'end':
+            assert func.end_start >= 0, f'No call function in stencil function {name}.'
+            return func.data[func.end_start:]
+        else:
+            return func.data
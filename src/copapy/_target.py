@@ -1,16 +1,31 @@
-from typing import Iterable, overload, TypeVar, Any, Callable, TypeAlias
+from typing import Iterable, Iterator, overload, TypeVar, Any, Callable, TypeAlias, Sequence
+from collections import OrderedDict
 from . import _binwrite as binw
-from coparun_module import coparun, read_data_mem, create_target, clear_target
+from coparun_module import coparun, create_target, clear_target, get_data_memory, run, run_io, run_batch
 import struct
-from ._basic_types import value, Net, Node, Store, NumLike, ArrayType, stencil_db_from_package
-from ._compiler import compile_to_dag
+from operator import itemgetter
+import sys
+from ._basic_types import value, Net, Node, Store, CPConstant, NumLike, ArrayType, stencil_db_from_package, transl_type
+from ._compiler import ir_compile
+from ._ir import lower_dag, dag_ir
+from ._stencils import stencil_database
+from ._compile_cache import compile_cache, get_compile_cache, get_dag_key, CacheLayout
 
 T = TypeVar("T", int, float)
 Values: TypeAlias = 'Iterable[NumLike] | NumLike'
 ArgType: TypeAlias = int | float | Iterable[int | float]
 TRet = TypeVar("TRet", Iterable[int | float], int, float)
 
-_jit_cache: dict[Any, tuple['Target', tuple[value[Any] | Iterable[value[Any]], ...], NumLike | Iterable[NumLike]]] = {}
+# Compiled programs of jit functions by function and argument signature
+_jit_cache: 'OrderedDict[tuple[Any, ...], tuple[Target, write_plan, Callable[[], Any]]]' = OrderedDict()
+JIT_CACHE_SIZE = 64
+
+# Struct format characters by data type and size in bytes
+STRUCT_FORMATS = {('float', 4): 'f', ('float', 8): 'd',
+                  ('int', 1): 'b', ('int', 2): 'h', ('int', 4): 'i', ('int', 8): 'q'}
+
+# Maximal gap between values in bytes that is read instead of starting a new read
+MAX_READ_GAP = 64
 
 
 def add_read_value_remote(dw: binw.data_writer, variables: dict[Net, tuple[int, int, str]], net: Net) -> None:
@@ -29,8 +44,110 @@ def add_read_value_remote(dw: binw.data_writer, variables: dict[Net, tuple[int,
     dw.write_int(lengths)
 
 
+def compile_program(ir: dag_ir, sdb: stencil_database, reuse_slots: bool = False,
+                    input_block: Iterable[int] = (), output_block: Iterable[int] = (),
+                    cache: compile_cache | None = None) -> tuple[bytes, CacheLayout]:
+    """Compiles a lowered DAG to a program for the runner or loads it from
+    a compile cache.
+
+    Arguments:
+        ir: DAG as returned by lower_dag
+        sdb: Stencil database
+        reuse_slots: Reuse the memory of temporary variables after their last use
+        input_block: Inputs (by node index) to place contiguously in the given order
+        output_block: Stored results (by node index) to place contiguously in the given order
+        cache: Compile cache to use or None
+
+    Returns:
+        Tuple of program data and variable layout as list of node index,
+        address and size
+    """
+    key = get_dag_key(ir, sdb, reuse_slots, input_block, output_block) if cache else ''
+    entry = cache.get(key) if cache else None
+    if entry:
+        return entry
+
+    dw, variables = ir_compile(ir, sdb, reuse_slots, input_block, output_block)
+    dw.write_com(binw.Command.END_COM)
+    data = dw.get_data()
+    net_index = {net: i for i, net in enumerate(ir.nets) if net}
+    layout = [(net_index[net], addr, size) for net, (addr, size, _) in variables.items()]
+    if cache:
+        cache.put(key, data, layout)
+    return data, layout
+
+
+def get_constant_data_end(data: bytes, byteorder: binw.ByteOrder) -> int:
+    """Returns the end address of the constant data that a program copies
+    to the start of the data memory, or 0 if it copies none."""
+    dr = binw.data_reader(data, byteorder)
+    com = dr.read_com()
+    while com in (binw.Command.FREE_MEMORY, binw.Command.ALLOCATE_DATA):
+        if com == binw.Command.ALLOCATE_DATA:
+            dr.read_int()
+        com = dr.read_com()
+    if com == binw.Command.COPY_DATA and dr.read_int() == 0:
+        return dr.read_int()
+    return 0
+
+
+def get_arg_signature(args: tuple[Any, ...]) -> tuple[Any, ...]:
+    """Returns the shape and data type signature of jit function arguments."""
+    return tuple(tuple(type(ai) for ai in a) if isinstance(a, tuple) else type(a) for a in args)
+
+
+def get_flat_values(variables: Any, flat: list[value[Any]]) -> None:
+    """Appends all copapy values of a nested structure of values, vectors,
+    tensors and iterables to flat in the order they are read and written.
+    Strings and dicts are not iterated and raise a TypeError."""
+    if isinstance(variables, value):
+        flat.append(variables)
+    elif isinstance(variables, ArrayType):
+        flat.extend(v for v in variables.values if isinstance(v, value))
+    elif isinstance(variables, str | dict):
+        raise TypeError(f"Expected values, vectors, tensors or iterables of them, got {type(variables).__name__}")
+    elif isinstance(variables, Iterable):
+        for v in variables:
+            get_flat_values(v, flat)
+
+
+def get_block_range(variables: dict[Net, tuple[int, int, str]], block: list[value[Any]]) -> tuple[int, int]:
+    """Returns start and end address of a declared input or output block."""
+    layout = [variables[v.net] for v in block]
+    if not layout:
+        return 0, 0
+    return layout[0][0], max(addr + size for addr, size, _ in layout)
+
+
+def get_flat_data(data: Any, flat: list[Any]) -> None:
+    """Appends all numbers of a nested structure of numbers, vectors,
+    tensors and iterables to flat in the order of get_flat_values."""
+    if isinstance(data, (int, float)):
+        flat.append(data)
+    elif isinstance(data, ArrayType):
+        flat.extend(data.values)
+    else:
+        for d in data:
+            get_flat_data(d, flat)
+
+
+def rebuild_values(variables: Any, results: Iterator[Any]) -> Any:
+    """Returns the structure of variables with each copapy value replaced
+    by the next result. Vectors and tensors are mapped like in
+    Target.read_value, other iterables are returned as lists."""
+    if isinstance(variables, value):
+        return next(results)
+    if isinstance(variables, ArrayType):
+        return variables.map(lambda v: next(results) if isinstance(v, value) else v)
+    if isinstance(variables, Iterable):
+        return [rebuild_values(v, results) for v in variables]
+    return variables
+
+
 def jit(func: Callable[..., TRet]) -> Callable[..., TRet]:
-    """Just-in-time compile a function for the copapy target.
+    """Just-in-time compile a function for the copapy target. The function is
+    traced and compiled for each new argument signature (number, length and
+    types of arguments). The last JIT_CACHE_SIZE compiled programs are kept.
 
     Arguments:
         func: Function to compile
@@ -39,19 +156,26 @@ def jit(func: Callable[..., TRet]) -> Callable[..., TRet]:
         A callable that runs the compiled function.
     """
     def call_helper(*args: ArgType) -> TRet:
-        if func in _jit_cache:
-            tg, inputs, out = _jit_cache[func]
-            for input, arg in zip(inputs, args):
-                tg.write_value(input, arg)
-        else:
+        arg_values = tuple(tuple(a) if isinstance(a, Iterable) else a for a in args)
+        key = (func, get_arg_signature(arg_values))
+        entry = _jit_cache.get(key)
+        if entry is None:
             tg = Target()
             inputs = tuple(
-                tuple(value(ai) for ai in a) if isinstance(a, Iterable) else value(a) for a in args)
+                tuple(value(ai) for ai in a) if isinstance(a, tuple) else value(a) for a in arg_values)
             out = func(*inputs)
-            tg.compile(out)
-            _jit_cache[func] = (tg, inputs, out)
-        tg.run()
-        return tg.read_value(out)  # type: ignore
+            tg.compile(out, reuse_slots=True)
+            flat_inputs = [vi for v in inputs for vi in (v if isinstance(v, tuple) else (v,))]
+            entry = (tg, write_plan(tg, flat_inputs, run=True), read_plan(tg, out).read)
+            _jit_cache[key] = entry
+            if len(_jit_cache) > JIT_CACHE_SIZE:
+                _jit_cache.popitem(last=False)
+        else:
+            _jit_cache.move_to_end(key)
+
+        _, input_plan, read_output = entry
+        input_plan.write([ai for a in arg_values for ai in (a if isinstance(a, tuple) else (a,))])
+        return read_output()  # type: ignore
 
     return call_helper
 
@@ -69,40 +193,145 @@ class Target():
         self.sdb = stencil_db_from_package(arch, optimization)
         self._values: dict[Net, tuple[int, int, str]] = {}
         self._context = create_target()
+        self._data_memory: memoryview | None = None
+        self._input_block = (0, 0)
+        self._output_block = (0, 0)
+        self._state_start = 0
 
     def __del__(self) -> None:
+        self._release_data_memory()
         clear_target(self._context)
 
-    def compile(self, *values: NumLike | value[T] | ArrayType[T] | Iterable[T | value[T]]) -> None:
+    def _release_data_memory(self) -> None:
+        if self._data_memory is not None:
+            self._data_memory.release()
+            self._data_memory = None
+
+    def compile(self, *values: NumLike | value[T] | ArrayType[T] | Iterable[T | value[T]], reuse_slots: bool = False,
+                inputs: value[Any] | ArrayType[Any] | Iterable[Any] = (),
+                outputs: value[Any] | ArrayType[Any] | Iterable[Any] = ()) -> None:
         """Compiles the code to compute the given values.
 
         Arguments:
             values: Values to compute
+            reuse_slots: Reuse memory of intermediate values after their last use. This
+                reduces the data memory size, but only inputs and the given values can
+                be read or written after compilation.
+            inputs: Input values to place in the input block
+            outputs: Computed values to place in the output block, they are compiled
+                like the given values
+
+        The input and output blocks are contiguous in data memory: each block
+        starts at an address aligned to IO_BLOCK_ALIGNMENT (16 bytes) and holds its
+        variables in the declared order, each aligned to its own size. So all
+        inputs or outputs can be copied at once, see get_input_block and
+        get_output_block. Outputs must be distinct values that are not constant
+        after optimization, otherwise a ValueError is raised.
+
+        If an on-disk compile cache is set (see set_compile_cache), a program
+        compiled before for a structurally equal DAG is loaded from it.
         """
-        nodes: list[Node] = []
-        for input in values:
-            if isinstance(input, ArrayType):
-                for v in input.values:
-                    if isinstance(v, value):
-                        nodes.append(Store(v))
-            elif isinstance(input, Iterable):
-                for v in input:
-                    if isinstance(v, value):
-                        nodes.append(Store(v))
-            elif isinstance(input, value):
-                nodes.append(Store(input))
-
-        dw, self._values = compile_to_dag(nodes, self.sdb)
-        dw.write_com(binw.Command.END_COM)
-        assert coparun(self._context, dw.get_data()) > 0
-
-    def run(self) -> None:
+        # Raises a BufferError if views of the old data memory are still in use,
+        # the target keeps its current program in this case
+        self._release_data_memory()
+
+        flat_values: list[value[Any]] = []
+        get_flat_values(values, flat_values)
+        input_values: list[value[Any]] = []
+        get_flat_values(inputs, input_values)
+        output_values: list[value[Any]] = []
+        get_flat_values(outputs, output_values)
+        for v in input_values:
+            if not isinstance(v.net.source, CPConstant) or v.net.source.anonymous:
+                raise ValueError(f"Declared input {v} is not an input value")
+
+        # Inputs are included in the program even if they are not used
+        nodes: list[Node] = [Store(v) for v in flat_values + output_values]
+        nodes += [v.net.source for v in input_values]
+
+        ir = lower_dag(nodes)
+        net_index = {net: i for i, net in enumerate(ir.nets) if net}
+        input_block = [net_index[v.net] for v in input_values]
+        output_block = [net_index[v.net] for v in output_values]
+        data, layout = compile_program(ir, self.sdb, reuse_slots, input_block, output_block, get_compile_cache())
+        variables: dict[Net, tuple[int, int, str]] = {}
+        for i, addr, size in layout:
+            net = ir.nets[i]
+            assert net, "Compiled layout does not match the DAG"
+            variables[net] = (addr, size, net.dtype)
+
+        assert coparun(self._context, data) > 0
+        self._values = variables
+        self._input_block = get_block_range(variables, input_values)
+        self._output_block = get_block_range(variables, output_values)
+
+        # Inputs are placed after the anonymous constants, so everything
+        # the program or the host can change starts at the first input
+        input_addrs = [addr for net, (addr, _, _) in variables.items()
+                       if isinstance(net.source, CPConstant) and not net.source.anonymous]
+        self._state_start = min(input_addrs + [get_constant_data_end(data, self.sdb.byteorder)])
+
+    def run(self, inputs: bytes | bytearray | memoryview | None = None,
+            outputs: bytearray | memoryview | None = None) -> None:
         """Runs the compiled code on the target device.
+
+        Arguments:
+            inputs: Data to copy to the input block before running
+            outputs: Writable buffer to fill with the output block after running
+
+        The input and output blocks are declared at compile time. The copies
+        and the run are done by one runner call without holding the GIL.
         """
-        dw = binw.data_writer(self.sdb.byteorder)
-        dw.write_com(binw.Command.RUN_PROG)
-        dw.write_com(binw.Command.END_COM)
-        assert coparun(self._context, dw.get_data()) > 0
+        if inputs is None and outputs is None:
+            run(self._context)
+            return
+        in_start, in_end = self._input_block
+        out_start, out_end = self._output_block
+        if inputs is not None and memoryview(inputs).nbytes != in_end - in_start:
+            raise ValueError(f"Inputs must have the size of the input block ({in_end - in_start} bytes)")
+        if outputs is not None and memoryview(outputs).nbytes != out_end - out_start:
+            raise ValueError(f"Outputs must have the size of the output block ({out_end - out_start} bytes)")
+        run_io(self._context, in_start, inputs, out_start, outputs)
+
+    def run_batch(self, inputs: bytes | bytearray | memoryview | None,
+                  outputs: bytearray | memoryview | None = None, n: int | None = None) -> bytearray | memoryview:
+        """Runs the compiled code n times by one runner call without holding the GIL.
+        Before each run row i of inputs is copied to the input block and after
+        each run the output block is copied to row i of outputs. A row has the
+        size of the respective block declared at compile time.
+
+        Arguments:
+            inputs: Input rows or None to run without changing inputs
+            outputs: Writable buffer for the output rows, allocated if None
+            n: Number of runs, by default the number of input rows
+
+        Returns:
+            Buffer with the output rows
+        """
+        in_start, in_end = self._input_block
+        out_start, out_end = self._output_block
+        in_size = in_end - in_start
+        out_size = out_end - out_start
+        if n is None:
+            assert inputs is not None and in_size > 0, "Number of runs must be provided if there are no inputs"
+            n, rest = divmod(memoryview(inputs).nbytes, in_size)
+            if rest:
+                raise ValueError(f"Inputs must consist of rows with the size of the input block ({in_size} bytes)")
+        if outputs is None:
+            outputs = bytearray(n * out_size)
+        run_batch(self._context, in_start, in_size, inputs, out_start, out_size, outputs, n)
+        return outputs
+
+    def create_instances(self, n: int) -> 'target_instances':
+        """Creates n instances of the compiled program, see target_instances.
+
+        Arguments:
+            n: Number of instances
+
+        Returns:
+            Instances initialized with the current state of the target
+        """
+        return target_instances(self, n)
 
     @overload
     def read_value(self, variables: value[T]) -> T: ...
@@ -120,12 +349,12 @@ class Target():
 
         Returns:
             Numeric value or values
-        """
-        if isinstance(variables, ArrayType):
-            return variables.map(lambda v: self.read_value(v))
 
-        if isinstance(variables, Iterable):
-            return [self.read_value(ni) if isinstance(ni, value) else ni for ni in variables]
+        Multiple variables are read in one pass. For reading the same
+        variables repeatedly, get_read_plan avoids analyzing them each time.
+        """
+        if isinstance(variables, ArrayType | Iterable):
+            return read_plan(self, variables).read()
 
         if isinstance(variables, float | int):
             return variables
@@ -135,8 +364,8 @@ class Target():
         addr, lengths, _ = self._values[variables.net]
         var_type = variables.dtype
         assert lengths > 0
-        data = read_data_mem(self._context, addr, lengths)
-        assert data is not None and len(data) == lengths, f"Failed to read value {variables}"
+        data = self.get_data_memory()[addr:addr + lengths]
+        assert len(data) == lengths, f"Failed to read value {variables}"
         en = {'little': '<', 'big': '>'}[self.sdb.byteorder]
         if var_type == 'float':
             if lengths == 4:
@@ -167,8 +396,12 @@ class Target():
         """
         if isinstance(variables, Iterable):
             assert isinstance(data, Iterable), "If net is iterable, value must be iterable too"
-            for ni, vi in zip(variables, data):
-                self.write_value(ni, vi)
+            pairs = list(zip(variables, data))
+            if all(isinstance(ni, value) and isinstance(vi, int | float) for ni, vi in pairs):
+                write_plan(self, [ni for ni, _ in pairs]).write([vi for _, vi in pairs])
+            else:
+                for ni, vi in pairs:
+                    self.write_value(ni, vi)
             return
 
         assert not isinstance(data, Iterable), "If net is not iterable, value must not be iterable"
@@ -193,8 +426,388 @@ class Target():
         dw.write_com(binw.Command.END_COM)
         assert coparun(self._context, dw.get_data()) > 0
 
+    def get_read_plan(self, variables: NumLike | ArrayType[Any] | Iterable[Any]) -> 'read_plan':
+        """Returns a reusable plan for reading variables. The addresses and
+        struct formats are determined once, so each read is a few struct
+        unpack calls. The plan is valid until the target is recompiled.
+
+        Arguments:
+            variables: Variable, vector, tensor or nested iterable of them
+
+        Returns:
+            Plan whose read method returns the values like read_value
+        """
+        return read_plan(self, variables)
+
+    def get_write_plan(self, variables: value[Any] | ArrayType[Any] | Iterable[Any], run: bool = False) -> 'write_plan':
+        """Returns a reusable plan for writing variables. The values are
+        packed by precompiled structs and written with one runner call.
+        The plan is valid until the target is recompiled.
+
+        Arguments:
+            variables: Variable, vector, tensor or nested iterable of them
+            run: Run the program after each write
+
+        Returns:
+            Plan whose write method takes values in the structure of the variables
+        """
+        return write_plan(self, variables, run)
+
+    def get_data_memory(self) -> memoryview:
+        """Returns a writable view of the data memory of the target without copying.
+        The view is valid until the target is recompiled. Views derived from it must be
+        released before recompiling, otherwise compile raises a BufferError.
+
+        Returns:
+            Byte view of the data memory
+        """
+        if self._data_memory is None:
+            self._data_memory = memoryview(get_data_memory(self._context))
+        return self._data_memory
+
+    def get_input_block(self) -> memoryview:
+        """Returns a writable byte view of the input block declared at compile
+        time without copying. All inputs are written by one assignment like
+        tg.get_input_block()[:] = data.
+
+        Returns:
+            Byte view of the input block
+        """
+        start, end = self._input_block
+        return self.get_data_memory()[start:end]
+
+    def get_output_block(self) -> memoryview:
+        """Returns a byte view of the output block declared at compile time
+        without copying. All outputs are read by one copy like
+        bytes(tg.get_output_block()).
+
+        Returns:
+            Byte view of the output block
+        """
+        start, end = self._output_block
+        return self.get_data_memory()[start:end]
+
+    def get_view(self, variables: ArrayType[Any] | Iterable[value[Any]]) -> memoryview:
+        """Returns a typed view of variables without copying, for example of
+        an input vector. The variables must have the same type and must be
+        stored contiguously in memory. The view can be indexed like an array
+        and wrapped by numpy.asarray without copying. Writing to the view
+        changes the variables on the target.
+
+        Arguments:
+            variables: Variables to view
+
+        Returns:
+            Typed memoryview of the variables
+        """
+        assert self.sdb.byteorder == sys.byteorder, "Views require a target with native byte order"
+        items = list(variables.values) if isinstance(variables, ArrayType) else list(variables)
+        layout = [self.get_variable_layout(v) for v in items]
+        assert layout, "No variables provided"
+        start, lengths, dtype = layout[0]
+        if any(entry != (start + i * lengths, lengths, dtype) for i, entry in enumerate(layout)):
+            raise ValueError("Variables are not stored contiguously with the same type")
+        fmt = STRUCT_FORMATS[(transl_type(dtype), lengths)]
+        return self.get_data_memory()[start:start + lengths * len(layout)].cast(fmt)  # type: ignore
+
+    def get_variable_layout(self, variable: value[Any]) -> tuple[int, int, str]:
+        """Returns address, size in bytes and data type of a compiled variable."""
+        assert isinstance(variable, value), "Argument must be a copapy value"
+        assert variable.net in self._values, f"Value {variable} not found. It might not have been compiled for the target."
+        return self._values[variable.net]
+
     def read_value_remote(self, variable: value[Any]) -> None:
         """Reads the raw data of a value by the runner."""
         dw = binw.data_writer(self.sdb.byteorder)
         add_read_value_remote(dw, self._values, variable.net)
         assert coparun(self._context, dw.get_data()) > 0
+
+
+def group_layout(layout: list[tuple[int, int, str, int]], max_gap: int) -> list[list[tuple[int, int, str, int]]]:
+    """Groups variables sorted by address into ranges
+
+    Arguments:
+        layout: Tuples of address, size, data type and index sorted by address
+        max_gap: Maximal number of bytes between two variables in one group
+
+    Returns:
+        List of groups of layout tuples
+    """
+    groups: list[list[tuple[int, int, str, int]]] = []
+    end = 0
+    for item in layout:
+        addr, lengths, _, _ = item
+        if groups and end <= addr <= end + max_gap:
+            groups[-1].append(item)
+        else:
+            groups.append([item])
+        end = addr + lengths
+    return groups
+
+
+def get_struct_format(group: list[tuple[int, int, str, int]], start: int) -> str:
+    """Returns the struct format for a group of variables starting
+    at the start address, gaps are padded."""
+    fmt = ''
+    for addr, lengths, dtype, _ in group:
+        fmt += 'x' * (addr - start) + STRUCT_FORMATS[(transl_type(dtype), lengths)]
+        start = addr + lengths
+    return fmt
+
+
+def get_item_getter(indices: list[int]) -> Callable[[Sequence[Any]], tuple[Any, ...]]:
+    """Returns a function selecting the items at indices from a sequence as tuple."""
+    if len(indices) == 1:
+        index = indices[0]
+        return lambda data: (data[index],)
+    return itemgetter(*indices)
+
+
+def pack_values(st: struct.Struct, values: tuple[Any, ...], is_int: list[bool]) -> bytes:
+    """Packs values by a struct, values are converted to the
+    variable types like in Target.write_value if required."""
+    try:
+        return st.pack(*values)
+    except struct.error:
+        return st.pack(*(int(v) if ii else float(v) for v, ii in zip(values, is_int)))
+
+
+class write_plan():
+    """Precompiled command stream for writing a fixed list of variables to the
+    target with one runner call. Variables at contiguous addresses are written
+    by one COPY_DATA command. The plan is valid until the target is recompiled.
+    """
+    def __init__(self, tg: Target, variables: value[Any] | ArrayType[Any] | Iterable[Any], run: bool = False):
+        """Create a write plan
+
+        Arguments:
+            tg: Target with compiled variables
+            variables: Variable, vector, tensor or nested iterable of them
+            run: Run the program after writing
+        """
+        self._target = tg
+        # Data for a flat sequence of values needs no flattening on each write
+        self._flat = isinstance(variables, Sequence) and all(isinstance(v, value) for v in variables)
+        if self._flat:
+            assert isinstance(variables, Sequence)
+            flat_values: Sequence[value[Any]] = variables
+        else:
+            assert not isinstance(variables, ArrayType) or all(isinstance(v, value) for v in variables.values), \
+                "Constant elements can not be written"
+            flat_values = []
+            get_flat_values(variables, flat_values)
+        variables = flat_values
+        self._size = len(variables)
+        en = {'little': '<', 'big': '>'}[tg.sdb.byteorder]
+        layout = sorted((tg.get_variable_layout(v) + (i,) for i, v in enumerate(variables)))
+
+        # Blocks of COPY_DATA header, start address, struct for the values,
+        # getter for the values from the data and flags for int variables
+        self._blocks: list[tuple[bytes, int, struct.Struct, Callable[[Sequence[Any]], tuple[Any, ...]], list[bool]]] = []
+        for group in group_layout(layout, 0):
+            start = group[0][0]
+            dw = binw.data_writer(tg.sdb.byteorder)
+            dw.write_com(binw.Command.COPY_DATA)
+            dw.write_int(start)
+            dw.write_int(group[-1][0] + group[-1][1] - start)
+            self._blocks.append((dw.get_data(), start,
+                                 struct.Struct(en + get_struct_format(group, start)),
+                                 get_item_getter([i for _, _, _, i in group]),
+                                 [dtype != 'float' for _, _, dtype, _ in group]))
+
+        dw = binw.data_writer(tg.sdb.byteorder)
+        if run:
+            dw.write_com(binw.Command.RUN_PROG)
+        dw.write_com(binw.Command.END_COM)
+        self._tail = dw.get_data()
+
+    def _get_flat_data(self, data: Any) -> Sequence[Any]:
+        # Data for nested variables might be provided flat already
+        flat_data: Sequence[Any] = data
+        if not self._flat and not (isinstance(data, (list, tuple)) and len(data) == self._size):
+            flat_data = []
+            get_flat_data(data, flat_data)
+        assert len(flat_data) == self._size, f"Expected {self._size} values, got {len(flat_data)}"
+        return flat_data
+
+    def get_data(self, data: Any) -> bytes:
+        """Returns the runner command stream for writing the provided values
+
+        Arguments:
+            data: Values in the structure of the variables of the plan
+        """
+        data = self._get_flat_data(data)
+        chunks: list[bytes] = []
+        for header, _, st, get_values, is_int in self._blocks:
+            chunks.append(header + pack_values(st, get_values(data), is_int))
+        chunks.append(self._tail)
+        return b''.join(chunks)
+
+    def write_into(self, data: Any, data_memory: bytearray | memoryview, offset: int = 0) -> None:
+        """Writes values to a buffer with the layout of the data memory
+
+        Arguments:
+            data: Values in the structure of the variables of the plan
+            data_memory: Buffer to write to
+            offset: Position of data memory address 0 in the buffer
+        """
+        data = self._get_flat_data(data)
+        for _, start, st, get_values, is_int in self._blocks:
+            data_memory[start + offset:start + offset + st.size] = pack_values(st, get_values(data), is_int)
+
+    def write(self, data: Any) -> None:
+        """Writes values to the target with one runner call
+
+        Arguments:
+            data: Values in the structure of the variables of the plan
+        """
+        assert coparun(self._target._context, self.get_data(data)) > 0
+
+
+class read_plan():
+    """Precompiled plan for reading a fixed list of variables from the target.
+    Variables at close addresses are read by one read call and unpacked by one
+    struct. The plan is valid until the target is recompiled.
+    """
+    def __init__(self, tg: Target, variables: NumLike | ArrayType[Any] | Iterable[Any]):
+        """Create a read plan
+
+        Arguments:
+            tg: Target with compiled variables
+            variables: Variable, vector, tensor or nested iterable of them
+        """
+        self._target = tg
+        if isinstance(variables, Iterable) and not isinstance(variables, ArrayType | Sequence):
+            variables = list(variables)  # Iterated again on each read
+        self._variables = variables
+        # Results of a single value or a flat sequence of values need no rebuilding
+        self._single = isinstance(variables, value)
+        self._flat = isinstance(variables, Sequence) and all(isinstance(v, value) for v in variables)
+        flat_values: list[value[Any]] = []
+        get_flat_values(variables, flat_values)
+        self._size = len(flat_values)
+        en = {'little': '<', 'big': '>'}[tg.sdb.byteorder]
+        layout = sorted((tg.get_variable_layout(v) + (i,) for i, v in enumerate(flat_values)))
+        # The layout holds the type of the net, comparison results are int there
+        self._bool_indices = [i for i, v in enumerate(flat_values) if v.dtype == 'bool']
+
+        # Ranges of start address, length, struct for unpacking and data indices
+        self._ranges: list[tuple[int, int, struct.Struct, list[int]]] = []
+        for group in group_layout(layout, MAX_READ_GAP):
+            start = group[0][0]
+            self._ranges.append((start, group[-1][0] + group[-1][1] - start,
+                                 struct.Struct(en + get_struct_format(group, start)),
+                                 [i for _, _, _, i in group]))
+
+    def read(self, data_memory: bytes | bytearray | memoryview | None = None, offset: int = 0) -> Any:
+        """Reads the values of all variables of the plan
+
+        Arguments:
+            data_memory: Buffer to read from instead of the data memory of the target
+            offset: Position of data memory address 0 in the buffer
+
+        Returns:
+            Numeric values in the structure of the variables like Target.read_value
+        """
+        if self._single:
+            return self.read_flat(data_memory, offset)[0]
+        if self._flat:
+            return self.read_flat(data_memory, offset)
+        return rebuild_values(self._variables, iter(self.read_flat(data_memory, offset)))
+
+    def read_flat(self, data_memory: bytes | bytearray | memoryview | None = None, offset: int = 0) -> list[Any]:
+        """Reads the values of all variables of the plan
+
+        Arguments:
+            data_memory: Buffer to read from instead of the data memory of the target
+            offset: Position of data memory address 0 in the buffer
+
+        Returns:
+            List of numeric values in the order of get_flat_values
+        """
+        ret: list[Any] = [0] * self._size
+        if data_memory is None:
+            data_memory = self._target.get_data_memory()
+        for start, _, st, indices in self._ranges:
+            for i, v in zip(indices, st.unpack_from(data_memory, start + offset)):
+                ret[i] = v
+        for i in self._bool_indices:
+            ret[i] = bool(ret[i])
+        return ret
+
+
+class target_instances():
+    """Multiple instances of the program of a target. The instances share the
+    code, the constant sections and the anonymous constants, each instance
+    has its own copy of the inputs and variables part of the data memory
+    (the state). Stencils address the data memory relative to the code, so
+    an instance is run by swapping its state into the data memory of the
+    target. All instances are stepped by one runner call. The instances are
+    valid until the target is recompiled.
+
+    Attributes:
+        n (int): Number of instances
+        state_size (int): Size of the state of one instance in bytes
+    """
+    def __init__(self, tg: Target, n: int):
+        """Create instances initialized with the current state of the target
+
+        Arguments:
+            tg: Target with compiled program
+            n: Number of instances
+        """
+        self._target = tg
+        data_memory = tg.get_data_memory()
+        self._state_start = min(tg._state_start, len(data_memory))
+        self.n = n
+        self.state_size = len(data_memory) - self._state_start
+        self._states = bytearray(data_memory[self._state_start:]) * n
+
+    def step_all(self) -> None:
+        """Runs the program once for each instance without holding the GIL.
+        Afterwards the target holds the state of the last instance."""
+        run_batch(self._target._context, self._state_start, self.state_size, self._states,
+                  self._state_start, self.state_size, self._states, self.n)
+
+    def get_state(self, index: int) -> memoryview:
+        """Returns a writable view of the state of an instance without copying.
+        The layout of the state is the data memory layout of the target from
+        the first input on."""
+        start = index * self.state_size
+        return memoryview(self._states)[start:start + self.state_size]
+
+    def read_value(self, index: int, variables: NumLike | ArrayType[Any] | Iterable[Any]) -> Any:
+        """Reads values of an instance like Target.read_value
+
+        Arguments:
+            index: Index of the instance
+            variables: Variable or multiple variables to read
+
+        Returns:
+            Numeric value or values
+        """
+        assert 0 <= index < self.n, f"Instance index {index} out of range"
+        plan = read_plan(self._target, variables)
+        state_offset = index * self.state_size
+        if min((start for start, _, _, _ in plan._ranges), default=self._state_start) >= self._state_start:
+            return plan.read(self._states, state_offset - self._state_start)
+
+        # Values folded into anonymous constants are shared by all instances
+        data_memory = self._target.get_data_memory()[:self._state_start].tobytes()
+        return plan.read(data_memory + self._states[state_offset:state_offset + self.state_size])
+
+    def write_value(self, index: int, variables: value[Any] | ArrayType[Any] | Iterable[Any], data: Any) -> None:
+        """Writes values to an instance like Target.write_value
+
+        Arguments:
+            index: Index of the instance
+            variables: Variable or multiple variables to overwrite
+            data: Values in the structure of the variables
+        """
+        assert 0 <= index < self.n, f"Instance index {index} out of range"
+        flat_values: list[value[Any]] = []
+        get_flat_values(variables, flat_values)
+        for v in flat_values:
+            if self._target.get_variable_layout(v)[0] < self._state_start:
+                raise ValueError(f"Value {v} is a constant shared by all instances and can not be written")
+        write_plan(self._target, variables).write_into(data, self._states, index * self.state_size - self._state_start)
@@ -0,0 +1,98 @@
+import os
+import threading
+from typing import Iterable, Any
+from coparun_module import run_many
+from ._target import Target, target_instances
+
+
+class TargetPool():
+    """Steps many compiled targets or target instances concurrently on a fixed
+    set of worker threads. Each target is pinned to one worker thread, so
+    it is always run by the same thread. The programs run without holding
+    the GIL. While a step is running the targets must not be used by other
+    threads. Instances run in the data memory of their target, so a target
+    and its instances can not be part of the same pool.
+
+    Attributes:
+        targets (list[Target | target_instances]): Targets of the pool
+        threads (int): Number of worker threads
+    """
+    def __init__(self, targets: Iterable[Target | target_instances], threads: int | None = None):
+        """Create a pool and start its worker threads. The threads are stopped
+        by close or at the end of a with statement.
+
+        Arguments:
+            targets: Compiled targets or instances to step
+            threads: Number of worker threads, by default the number of CPUs
+        """
+        self.targets = list(targets)
+        memory_owners = [tg._target if isinstance(tg, target_instances) else tg for tg in self.targets]
+        if len({id(tg) for tg in memory_owners}) < len(memory_owners):
+            raise ValueError("Targets of a pool must not share data memory")
+        self.threads = max(1, min(threads or os.cpu_count() or 1, len(self.targets)))
+
+        # Targets are distributed round-robin, instances are stepped by their own runner call
+        self._groups: list[tuple[list[int], list[target_instances]]] = []
+        for k in range(self.threads):
+            group = self.targets[k::self.threads]
+            self._groups.append(([tg._context for tg in group if isinstance(tg, Target)],
+                                 [tg for tg in group if isinstance(tg, target_instances)]))
+
+        self._closed = False
+        self._errors: list[BaseException] = []
+        self._workers: list[threading.Thread] = []
+        if self.threads > 1:
+            self._start_barrier = threading.Barrier(self.threads + 1)
+            self._done_barrier = threading.Barrier(self.threads + 1)
+            for k in range(self.threads):
+                worker = threading.Thread(target=self._work, args=(k,), daemon=True,
+                                          name=f"TargetPool-{k}")
+                worker.start()
+                self._workers.append(worker)
+
+    def __enter__(self) -> 'TargetPool':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _step_group(self, index: int) -> None:
+        contexts, instances = self._groups[index]
+        if contexts:
+            run_many(contexts)
+        for inst in instances:
+            inst.step_all()
+
+    def _work(self, index: int) -> None:
+        while True:
+            self._start_barrier.wait()
+            if self._closed:
+                return
+            try:
+                self._step_group(index)
+            except BaseException as e:
+                self._errors.append(e)
+            self._done_barrier.wait()
+
+    def step_all(self) -> None:
+        """Runs each target once and returns when all runs are finished."""
+        assert not self._closed, "Pool is closed"
+        if not self._workers:
+            for k in range(len(self._groups)):
+                self._step_group(k)
+            return
+        self._start_barrier.wait()
+        self._done_barrier.wait()
+        if self._errors:
+            errors, self._errors = self._errors, []
+            raise errors[0]
+
+    def close(self) -> None:
+        """Stops the worker threads."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._workers:
+            self._start_barrier.wait()
+            for worker in self._workers:
+                worker.join()
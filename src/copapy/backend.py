@@ -5,9 +5,14 @@ and give access to compiler internals and debugging tools.
 
 from ._target import add_read_value_remote
 from ._basic_types import Net, Op, Node, CPConstant, Store, stencil_db_from_package
-from ._compiler import compile_to_dag, \
+from ._compiler import compile_to_dag, ir_compile, \
     stable_toposort, get_const_nets, get_all_dag_edges, add_load_ops, get_all_dag_edges_between, \
-    add_store_ops, get_dag_stats
+    add_store_ops, get_dag_stats, get_load_store_stats, ir_add_load_ops, ir_add_store_ops, ir_schedule
+from ._ir import dag_ir, lower_dag
+from ._optimizer import ir_simplify, ir_fuse, get_simplify_stats
+from ._compile_cache import compile_cache, set_compile_cache, get_compile_cache, get_dag_key
+from ._batch_compile import compile_batch
+from ._graph_file import graph_to_bytes, graph_from_bytes, graph_ir_from_bytes, get_graph_nets
 
 __all__ = [
     "add_read_value_remote",
@@ -17,6 +22,7 @@ __all__ = [
     "CPConstant",
     "Store",
     "compile_to_dag",
+    "ir_compile",
     "stable_toposort",
     "get_const_nets",
     "get_all_dag_edges",
@@ -24,5 +30,23 @@ __all__ = [
     "add_load_ops",
     "add_store_ops",
     "stencil_db_from_package",
-    "get_dag_stats"
+    "get_dag_stats",
+    "get_load_store_stats",
+    "ir_schedule",
+    "ir_simplify",
+    "ir_fuse",
+    "get_simplify_stats",
+    "dag_ir",
+    "lower_dag",
+    "ir_add_load_ops",
+    "ir_add_store_ops",
+    "compile_cache",
+    "set_compile_cache",
+    "get_compile_cache",
+    "get_dag_key",
+    "compile_batch",
+    "graph_to_bytes",
+    "graph_from_bytes",
+    "graph_ir_from_bytes",
+    "get_graph_nets"
 ]
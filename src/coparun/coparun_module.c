@@ -9,6 +9,22 @@
 #include <Python.h>
 #include "runmem.h"
 #include <stdlib.h>
+#include <string.h>
+
+/* Target handle: runner state and bookkeeping for buffer exports
+   of the data memory. The handle can be used as runmem_t pointer. */
+typedef struct {
+    runmem_t context;
+    Py_ssize_t exports;  // Number of active buffer exports of the data memory
+    Py_ssize_t refs;     // Target handle and DataMemory objects using it
+} target_t;
+
+static void release_target(target_t *target) {
+    if (--target->refs == 0) {
+        free_memory(&target->context);
+        free(target);
+    }
+}
 
 static PyObject* coparun(PyObject* self, PyObject* args) {
     PyObject *handle_obj;
@@ -28,6 +44,18 @@ static PyObject* coparun(PyObject* self, PyObject* args) {
     }
     runmem_t *context = (runmem_t*)ptr;
 
+    /* Programs start with FREE_MEMORY, the data memory must not
+       be freed while it is accessible by a buffer */
+    uint32_t first_command = 0;
+    if (buf_len >= 4) {
+        memcpy(&first_command, buf, 4);
+    }
+    if (first_command == FREE_MEMORY && ((target_t*)context)->exports > 0) {
+        PyErr_SetString(PyExc_BufferError,
+                        "Data memory of the target is used by a memoryview, release it before recompiling");
+        return NULL;
+    }
+
     /* If parse_commands may run for a long time, release the GIL. */
     Py_BEGIN_ALLOW_THREADS
     result = parse_commands(context, (uint8_t*)buf);
@@ -36,6 +64,168 @@ static PyObject* coparun(PyObject* self, PyObject* args) {
     return PyLong_FromLong(result);
 }
 
+static runmem_t* get_program_context(PyObject *handle_obj) {
+    void *ptr = PyLong_AsVoidPtr(handle_obj);
+    if (!ptr) {
+        PyErr_SetString(PyExc_ValueError, "Invalid context handle");
+        return NULL;
+    }
+    runmem_t *context = (runmem_t*)ptr;
+    if (!context->entr_point) {
+        PyErr_SetString(PyExc_RuntimeError, "No program loaded");
+        return NULL;
+    }
+    return context;
+}
+
+static PyObject* run(PyObject* self, PyObject* args) {
+    PyObject *handle_obj;
+
+    // Expect: handle
+    if (!PyArg_ParseTuple(args, "O", &handle_obj)) {
+        return NULL;
+    }
+    runmem_t *context = get_program_context(handle_obj);
+    if (!context) {
+        return NULL;
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    context->entr_point();
+    Py_END_ALLOW_THREADS
+
+    Py_RETURN_NONE;
+}
+
+static PyObject* run_many(PyObject* self, PyObject* args) {
+    PyObject *handles_obj;
+
+    // Expect: sequence of handles
+    if (!PyArg_ParseTuple(args, "O", &handles_obj)) {
+        return NULL;
+    }
+    PyObject *handles = PySequence_Fast(handles_obj, "Expected a sequence of context handles");
+    if (!handles) {
+        return NULL;
+    }
+    Py_ssize_t n = PySequence_Fast_GET_SIZE(handles);
+    entry_point_t *entry_points = (entry_point_t*)malloc((n + 1) * sizeof(entry_point_t));
+    if (!entry_points) {
+        Py_DECREF(handles);
+        return PyErr_NoMemory();
+    }
+    for (Py_ssize_t i = 0; i < n; i++) {
+        runmem_t *context = get_program_context(PySequence_Fast_GET_ITEM(handles, i));
+        if (!context) {
+            free(entry_points);
+            Py_DECREF(handles);
+            return NULL;
+        }
+        entry_points[i] = context->entr_point;
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    for (Py_ssize_t i = 0; i < n; i++) {
+        entry_points[i]();
+    }
+    Py_END_ALLOW_THREADS
+
+    free(entry_points);
+    Py_DECREF(handles);
+    Py_RETURN_NONE;
+}
+
+static PyObject* run_io(PyObject* self, PyObject* args) {
+    PyObject *handle_obj, *input_obj, *output_obj;
+    Py_ssize_t input_addr, output_addr;
+    Py_buffer input = {0}, output = {0};
+
+    // Expect: handle, input address, input buffer or None, output address, output buffer or None
+    if (!PyArg_ParseTuple(args, "OnOnO", &handle_obj, &input_addr, &input_obj, &output_addr, &output_obj)) {
+        return NULL;
+    }
+    runmem_t *context = get_program_context(handle_obj);
+    if (!context) {
+        return NULL;
+    }
+
+    if (input_obj != Py_None && PyObject_GetBuffer(input_obj, &input, PyBUF_SIMPLE) < 0) {
+        return NULL;
+    }
+    if (output_obj != Py_None && PyObject_GetBuffer(output_obj, &output, PyBUF_WRITABLE) < 0) {
+        PyBuffer_Release(&input);
+        return NULL;
+    }
+    if (input_addr < 0 || input_addr + input.len > (Py_ssize_t)context->data_memory_len ||
+        output_addr < 0 || output_addr + output.len > (Py_ssize_t)context->data_memory_len) {
+        PyBuffer_Release(&input);
+        PyBuffer_Release(&output);
+        PyErr_SetString(PyExc_ValueError, "Access out of bounds of the data memory");
+        return NULL;
+    }
+
+    /* Buffers might be views of the data memory itself */
+    Py_BEGIN_ALLOW_THREADS
+    if (input.len) {
+        memmove(context->data_memory + input_addr, input.buf, input.len);
+    }
+    context->entr_point();
+    if (output.len) {
+        memmove(output.buf, context->data_memory + output_addr, output.len);
+    }
+    Py_END_ALLOW_THREADS
+
+    PyBuffer_Release(&input);
+    PyBuffer_Release(&output);
+    Py_RETURN_NONE;
+}
+
+static PyObject* run_batch_py(PyObject* self, PyObject* args) {
+    PyObject *handle_obj, *input_obj, *output_obj;
+    Py_ssize_t input_addr, input_size, output_addr, output_size, n;
+    Py_buffer input = {0}, output = {0};
+
+    // Expect: handle, input address, input row size, input buffer or None,
+    // output address, output row size, output buffer or None, number of runs
+    if (!PyArg_ParseTuple(args, "OnnOnnOn", &handle_obj, &input_addr, &input_size, &input_obj,
+                          &output_addr, &output_size, &output_obj, &n)) {
+        return NULL;
+    }
+    runmem_t *context = get_program_context(handle_obj);
+    if (!context) {
+        return NULL;
+    }
+    if (input_obj == Py_None) {
+        input_size = 0;
+    } else if (PyObject_GetBuffer(input_obj, &input, PyBUF_SIMPLE) < 0) {
+        return NULL;
+    }
+    if (output_obj == Py_None) {
+        output_size = 0;
+    } else if (PyObject_GetBuffer(output_obj, &output, PyBUF_WRITABLE) < 0) {
+        PyBuffer_Release(&input);
+        return NULL;
+    }
+    if (input_addr < 0 || input_size < 0 || input_addr + input_size > (Py_ssize_t)context->data_memory_len ||
+        output_addr < 0 || output_size < 0 || output_addr + output_size > (Py_ssize_t)context->data_memory_len) {
+        PyErr_SetString(PyExc_ValueError, "Access out of bounds of the data memory");
+    } else if (n < 0 || n > UINT32_MAX || input_size * n > input.len || output_size * n > output.len) {
+        PyErr_SetString(PyExc_ValueError, "Buffers are too small for the number of runs");
+    } else {
+        Py_BEGIN_ALLOW_THREADS
+        run_batch(context, (uint32_t)input_addr, (uint32_t)input_size, (const uint8_t*)input.buf,
+                  (uint32_t)output_addr, (uint32_t)output_size, (uint8_t*)output.buf, (uint32_t)n);
+        Py_END_ALLOW_THREADS
+    }
+
+    PyBuffer_Release(&input);
+    PyBuffer_Release(&output);
+    if (PyErr_Occurred()) {
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
 static PyObject* read_data_mem(PyObject* self, PyObject* args) {
     PyObject *handle_obj;
     unsigned long rel_addr;
@@ -74,12 +264,13 @@ static PyObject* read_data_mem(PyObject* self, PyObject* args) {
 }
 
 static PyObject* create_target(PyObject* self, PyObject* args) {
-    runmem_t *context = (runmem_t*)calloc(1, sizeof(runmem_t));
-    if (!context) {
+    target_t *target = (target_t*)calloc(1, sizeof(target_t));
+    if (!target) {
         return PyErr_NoMemory();
     }
+    target->refs = 1;
     // Return the pointer as a Python integer (handle)
-    return PyLong_FromVoidPtr((void*)context);
+    return PyLong_FromVoidPtr((void*)target);
 }
 
 static PyObject* clear_target(PyObject* self, PyObject* args) {
@@ -92,17 +283,88 @@ static PyObject* clear_target(PyObject* self, PyObject* args) {
         PyErr_SetString(PyExc_ValueError, "Invalid handle");
         return NULL;
     }
-    runmem_t *context = (runmem_t*)ptr;
-    free_memory(context);
-    free(context);
+    // Memory is freed when the last DataMemory object is gone
+    release_target((target_t*)ptr);
     Py_RETURN_NONE;
 }
 
+/* DataMemory: exports the data memory of a target by the buffer
+   protocol without copying. Views see the memory allocated at the
+   time they are created. */
+typedef struct {
+    PyObject_HEAD
+    target_t *target;
+} DataMemoryObject;
+
+static int data_memory_getbuffer(PyObject *obj, Py_buffer *view, int flags) {
+    DataMemoryObject *self = (DataMemoryObject*)obj;
+    runmem_t *context = &self->target->context;
+
+    if (!context->data_memory) {
+        PyErr_SetString(PyExc_BufferError, "No data memory allocated");
+        view->obj = NULL;
+        return -1;
+    }
+    if (PyBuffer_FillInfo(view, obj, context->data_memory, context->data_memory_len, 0, flags) < 0) {
+        return -1;
+    }
+    self->target->exports++;
+    return 0;
+}
+
+static void data_memory_releasebuffer(PyObject *obj, Py_buffer *view) {
+    ((DataMemoryObject*)obj)->target->exports--;
+}
+
+static void data_memory_dealloc(PyObject *obj) {
+    release_target(((DataMemoryObject*)obj)->target);
+    Py_TYPE(obj)->tp_free(obj);
+}
+
+static PyBufferProcs data_memory_as_buffer = {
+    data_memory_getbuffer,
+    data_memory_releasebuffer
+};
+
+static PyTypeObject DataMemoryType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "coparun_module.DataMemory",
+    .tp_basicsize = sizeof(DataMemoryObject),
+    .tp_dealloc = data_memory_dealloc,
+    .tp_as_buffer = &data_memory_as_buffer,
+    .tp_flags = Py_TPFLAGS_DEFAULT,
+    .tp_doc = "Buffer exporting the data memory of a target",
+};
+
+static PyObject* get_data_memory(PyObject* self, PyObject* args) {
+    PyObject *handle_obj;
+    if (!PyArg_ParseTuple(args, "O", &handle_obj)) {
+        return NULL;
+    }
+    void *ptr = PyLong_AsVoidPtr(handle_obj);
+    if (!ptr) {
+        PyErr_SetString(PyExc_ValueError, "Invalid context handle");
+        return NULL;
+    }
+    DataMemoryObject *obj = PyObject_New(DataMemoryObject, &DataMemoryType);
+    if (!obj) {
+        return NULL;
+    }
+    obj->target = (target_t*)ptr;
+    obj->target->refs++;
+    return (PyObject*)obj;
+}
+
 static PyMethodDef MyMethods[] = {
     {"coparun", coparun, METH_VARARGS, "Pass raw command data to coparun"},
+    {"run", run, METH_VARARGS, "Run the loaded program"},
+    {"run_many", run_many, METH_VARARGS, "Run the loaded programs of multiple targets"},
+    {"run_io", run_io, METH_VARARGS, "Copy the input buffer to data memory, run the loaded program and copy data memory to the output buffer"},
+    {"run_batch", run_batch_py, METH_VARARGS, "Run the loaded program for each row of an input and an output buffer"},
     {"read_data_mem", read_data_mem, METH_VARARGS, "Read memory and return as bytes"},
-    {"create_target", create_target, METH_NOARGS, "Create and return a handle to a zero-initialized runmem_t struct"},
+    {"create_target", create_target, METH_NOARGS, "Create and return a handle to a zero-initialized target"},
     {"clear_target", clear_target, METH_VARARGS, "Free all memory associated with the given target handle"},
+    {"get_data_memory", get_data_memory, METH_VARARGS, "Return a buffer object exporting the data memory of the target"},
     {NULL, NULL, 0, NULL}
 };
 
@@ -115,5 +377,8 @@ static struct PyModuleDef coparun_module = {
 };
 
 PyMODINIT_FUNC PyInit_coparun_module(void) {
+    if (PyType_Ready(&DataMemoryType) < 0) {
+        return NULL;
+    }
     return PyModule_Create(&coparun_module);
 }
\ No newline at end of file
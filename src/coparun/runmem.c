@@ -144,6 +144,81 @@ int floor_div(int a, int b) {
     return a / b - ((a % b != 0) && ((a < 0) != (b < 0)));
 }
 
+uint32_t read_varint(uint8_t **bytes) {
+    // Unsigned LEB128
+    uint32_t result = 0;
+    int shift = 0;
+    uint8_t byte;
+    do {
+        byte = *(*bytes)++;
+        result |= (uint32_t)(byte & 0x7F) << shift;
+        shift += 7;
+    } while (byte & 0x80);
+    return result;
+}
+
+int32_t read_zigzag_varint(uint8_t **bytes) {
+    uint32_t v = read_varint(bytes);
+    return (int32_t)(v >> 1) ^ -(int32_t)(v & 1);
+}
+
+int apply_patch(runmem_t *context, uint32_t patch_type, uint32_t offs, uint32_t patch_mask, int32_t patch_scale, int32_t value) {
+    switch(patch_type) {
+        case PATCH_FUNC:
+            LOG("PATCH_FUNC patch_offs=%i patch_mask=%#08x scale=%i value=%i\n",
+                offs, patch_mask, patch_scale, value);
+            patch(context->executable_memory + offs, patch_mask, value / patch_scale);
+            break;
+
+        case PATCH_OBJECT:
+            LOG("PATCH_OBJECT patch_offs=%i patch_mask=%#08x scale=%i value=%i\n",
+                offs, patch_mask, patch_scale, value);
+            patch(context->executable_memory + offs, patch_mask, value / patch_scale + context->data_offs / patch_scale);
+            break;
+
+        case PATCH_OBJECT_ABS:
+            LOG("PATCH_OBJECT_ABS patch_offs=%i patch_mask=%#08x scale=%i value=%i\n",
+                offs, patch_mask, patch_scale, value);
+            patch(context->executable_memory + offs, patch_mask, value / patch_scale);
+            break;
+
+        case PATCH_OBJECT_REL:
+            LOG("PATCH_OBJECT_REL patch_offs=%i patch_addr=%p scale=%i value=%i\n",
+                offs, (void*)(context->data_memory + value), patch_scale, value);
+            *(void **)(context->executable_memory + offs) = context->data_memory + value;
+            break;
+
+        case PATCH_OBJECT_HI21:
+            LOG("PATCH_OBJECT_HI21 patch_offs=%i scale=%i value=%i res_value=%i\n",
+                offs, patch_scale, value, floor_div(context->data_offs + value, patch_scale) - (int32_t)offs / patch_scale);
+            patch_hi21(context->executable_memory + offs, floor_div(context->data_offs + value, patch_scale) - (int32_t)offs / patch_scale);
+            break;
+
+        case PATCH_OBJECT_ARM32_ABS:
+            LOG("PATCH_OBJECT_ARM32_ABS patch_offs=%i patch_mask=%#08x scale=%i value=%i imm16=%#04x\n",
+                offs, patch_mask, patch_scale, value, (uint32_t)((uintptr_t)(context->data_memory + value) & patch_mask) / (uint32_t)patch_scale);
+            patch_arm32_abs(context->executable_memory + offs, (uint32_t)((uintptr_t)(context->data_memory + value) & patch_mask) / (uint32_t)patch_scale);
+            break;
+
+        case PATCH_FUNC_ARM32_THM:
+            LOG("PATCH_FUNC_ARM32_THM patch_offs=%i patch_mask=%#08x scale=%i value=%i\n",
+                offs, patch_mask, patch_scale, value);
+            patch_arm_thm_jump24(context->executable_memory + offs, value);
+            break;
+
+        case PATCH_OBJECT_ARM32_ABS_THM:
+            LOG("PATCH_OBJECT_ARM32_ABS_THM patch_offs=%i patch_mask=%#08x scale=%i value=%i imm16=%#04x\n",
+                offs, patch_mask, patch_scale, value, (uint32_t)((uintptr_t)(context->data_memory + value) & patch_mask) / (uint32_t)patch_scale);
+            patch_arm_thm_abs(context->executable_memory + offs, (uint32_t)((uintptr_t)(context->data_memory + value) & patch_mask) / (uint32_t)patch_scale);
+            break;
+
+        default:
+            LOG("Unknown patch type\n");
+            return 0;
+    }
+    return 1;
+}
+
 int parse_commands(runmem_t *context, uint8_t *bytes) {
     int32_t value;
     uint32_t command;
@@ -189,83 +264,36 @@ int parse_commands(runmem_t *context, uint8_t *bytes) {
                 break;
 
             case PATCH_FUNC:
-                offs = *(uint32_t*)bytes; bytes += 4;
-                patch_mask = *(uint32_t*)bytes; bytes += 4;
-                patch_scale = *(int32_t*)bytes; bytes += 4;
-                value = *(int32_t*)bytes; bytes += 4;
-                LOG("PATCH_FUNC patch_offs=%i patch_mask=%#08x scale=%i value=%i\n",
-                    offs, patch_mask, patch_scale, value);
-                patch(context->executable_memory + offs, patch_mask, value / patch_scale);
-                break;
-
             case PATCH_OBJECT:
-                offs = *(uint32_t*)bytes; bytes += 4;
-                patch_mask = *(uint32_t*)bytes; bytes += 4;
-                patch_scale = *(int32_t*)bytes; bytes += 4;
-                value = *(int32_t*)bytes; bytes += 4;
-                LOG("PATCH_OBJECT patch_offs=%i patch_mask=%#08x scale=%i value=%i\n",
-                    offs, patch_mask, patch_scale, value);
-                patch(context->executable_memory + offs, patch_mask, value / patch_scale + context->data_offs / patch_scale);
-                break;
-
             case PATCH_OBJECT_ABS:
-                offs = *(uint32_t*)bytes; bytes += 4;
-                patch_mask = *(uint32_t*)bytes; bytes += 4;
-                patch_scale = *(int32_t*)bytes; bytes += 4;
-                value = *(int32_t*)bytes; bytes += 4;
-                LOG("PATCH_OBJECT_ABS patch_offs=%i patch_mask=%#08x scale=%i value=%i\n",
-                    offs, patch_mask, patch_scale, value);
-                patch(context->executable_memory + offs, patch_mask, value / patch_scale);
-                break;
-
             case PATCH_OBJECT_REL:
-                offs = *(uint32_t*)bytes; bytes += 4;
-                bytes += 4;
-                patch_scale = *(int32_t*)bytes; bytes += 4;
-                value = *(int32_t*)bytes; bytes += 4;
-                LOG("PATCH_OBJECT_REL patch_offs=%i patch_addr=%p scale=%i value=%i\n",
-                    offs, (void*)(context->data_memory + value), patch_scale, value);
-                *(void **)(context->executable_memory + offs) = context->data_memory + value;
-                break;
-
             case PATCH_OBJECT_HI21:
-                offs = *(uint32_t*)bytes; bytes += 4;
-                bytes += 4;
-                patch_scale = *(int32_t*)bytes; bytes += 4;
-                value = *(int32_t*)bytes; bytes += 4;
-                LOG("PATCH_OBJECT_HI21 patch_offs=%i scale=%i value=%i res_value=%i\n",
-                    offs, patch_scale, value, floor_div(context->data_offs + value, patch_scale) - (int32_t)offs / patch_scale);
-                patch_hi21(context->executable_memory + offs, floor_div(context->data_offs + value, patch_scale) - (int32_t)offs / patch_scale);
-                break;
-
             case PATCH_OBJECT_ARM32_ABS:
-                offs = *(uint32_t*)bytes; bytes += 4;
-                patch_mask = *(uint32_t*)bytes; bytes += 4;
-                patch_scale = *(int32_t*)bytes; bytes += 4;
-                value = *(int32_t*)bytes; bytes += 4;
-                LOG("PATCH_OBJECT_ARM32_ABS patch_offs=%i patch_mask=%#08x scale=%i value=%i imm16=%#04x\n",
-                    offs, patch_mask, patch_scale, value, (uint32_t)((uintptr_t)(context->data_memory + value) & patch_mask) / (uint32_t)patch_scale);
-                patch_arm32_abs(context->executable_memory + offs, (uint32_t)((uintptr_t)(context->data_memory + value) & patch_mask) / (uint32_t)patch_scale);
-                break;
-
             case PATCH_FUNC_ARM32_THM:
+            case PATCH_OBJECT_ARM32_ABS_THM:
                 offs = *(uint32_t*)bytes; bytes += 4;
                 patch_mask = *(uint32_t*)bytes; bytes += 4;
                 patch_scale = *(int32_t*)bytes; bytes += 4;
                 value = *(int32_t*)bytes; bytes += 4;
-                LOG("PATCH_FUNC_ARM32_THM patch_offs=%i patch_mask=%#08x scale=%i value=%i\n",
-                    offs, patch_mask, patch_scale, value);
-                patch_arm_thm_jump24(context->executable_memory + offs, value);
+                apply_patch(context, command, offs, patch_mask, patch_scale, value);
                 break;
 
-            case PATCH_OBJECT_ARM32_ABS_THM:
-                offs = *(uint32_t*)bytes; bytes += 4;
+            case PATCH_TABLE:
+                command = *(uint32_t*)bytes; bytes += 4;
                 patch_mask = *(uint32_t*)bytes; bytes += 4;
                 patch_scale = *(int32_t*)bytes; bytes += 4;
-                value = *(int32_t*)bytes; bytes += 4;
-                LOG("PATCH_OBJECT_ARM32_ABS_THM patch_offs=%i patch_mask=%#08x scale=%i value=%i imm16=%#04x\n",
-                    offs, patch_mask, patch_scale, value, (uint32_t)((uintptr_t)(context->data_memory + value) & patch_mask) / (uint32_t)patch_scale);
-                patch_arm_thm_abs(context->executable_memory + offs, (uint32_t)((uintptr_t)(context->data_memory + value) & patch_mask) / (uint32_t)patch_scale);
+                size = *(uint32_t*)bytes; bytes += 4;
+                LOG("PATCH_TABLE type=%#04x patch_mask=%#08x scale=%i count=%i\n",
+                    command, patch_mask, patch_scale, size);
+                offs = 0;
+                for (uint32_t i = 0; i < size; i++) {
+                    offs += read_varint(&bytes);
+                    value = read_zigzag_varint(&bytes);
+                    if (!apply_patch(context, command, offs, patch_mask, patch_scale, value)) {
+                        end_flag = -1;
+                        break;
+                    }
+                }
                 break;
 
             case ENTRY_POINT:
@@ -317,3 +345,18 @@ int parse_commands(runmem_t *context, uint8_t *bytes) {
     }
     return end_flag;
 }
+
+void run_batch(runmem_t *context, uint32_t input_addr, uint32_t input_size, const uint8_t *inputs,
+               uint32_t output_addr, uint32_t output_size, uint8_t *outputs, uint32_t n) {
+    /* Buffers might be views of the data memory itself and are NULL if
+       their size is 0 */
+    for (uint32_t i = 0; i < n; i++) {
+        if (input_size) {
+            memmove(context->data_memory + input_addr, inputs + (size_t)i * input_size, input_size);
+        }
+        context->entr_point();
+        if (output_size) {
+            memmove(outputs + (size_t)i * output_size, context->data_memory + output_addr, output_size);
+        }
+    }
+}
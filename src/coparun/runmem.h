@@ -26,6 +26,7 @@
 #define COPY_DATA         2
 #define ALLOCATE_CODE     3
 #define COPY_CODE         4
+#define PATCH_TABLE       8
 #define PATCH_FUNC        0x1000
 #define PATCH_FUNC_ARM32_THM   0x1005
 #define PATCH_OBJECT      0x2000
@@ -61,4 +62,11 @@ int parse_commands(runmem_t *context, uint8_t *bytes);
 /* Free program and data memory */
 void free_memory(runmem_t *context);
 
+/* Run the program n times: before each run, row i of inputs (input_size
+   bytes) is copied to input_addr in data memory, after each run output_size
+   bytes at output_addr are copied to row i of outputs. The buffers may
+   overlap the data memory and may be NULL if their size is 0 */
+void run_batch(runmem_t *context, uint32_t input_addr, uint32_t input_size, const uint8_t *inputs,
+               uint32_t output_addr, uint32_t output_size, uint8_t *outputs, uint32_t n);
+
 #endif /* RUNMEM_H */
\ No newline at end of file
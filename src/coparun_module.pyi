@@ -1,4 +1,19 @@
+from typing import Sequence
+
 def coparun(context: int, data: bytes) -> int: ...
+def run(context: int) -> None: ...
+def run_many(contexts: Sequence[int]) -> None: ...
+def run_io(context: int, input_addr: int, input: bytes | bytearray | memoryview | None,
+           output_addr: int, output: bytearray | memoryview | None) -> None: ...
+def run_batch(context: int, input_addr: int, input_size: int, inputs: bytes | bytearray | memoryview | None,
+              output_addr: int, output_size: int, outputs: bytearray | memoryview | None, n: int) -> None: ...
 def read_data_mem(context: int, rel_addr: int, length: int) -> bytes: ...
 def create_target() -> int: ...
 def clear_target(context: int) -> None: ...
+
+
+class DataMemory:
+    def __buffer__(self, flags: int, /) -> memoryview: ...
+    def __release_buffer__(self, buffer: memoryview, /) -> None: ...
+
+def get_data_memory(context: int) -> DataMemory: ...
@@ -8,6 +8,10 @@ op_signs = {'add': '+', 'sub': '-', 'mul': '*', 'div': '/', 'pow': '**',
             'lshift': '<<', 'rshift': '>>',
             'bwand': '&', 'bwor': '|', 'bwxor': '^'}
 
+# Fused ops with two register operands and a third operand (m) from memory
+fused_ops = {'mul_add': 'arg1 * arg2 + m', 'mul_sub': 'arg1 * arg2 - m',
+             'add_mul': 'arg1 + arg2 * m', 'sub_mul': 'arg1 - arg2 * m'}
+
 entry_func_prefix = ''
 
 stack_size = 128
@@ -172,6 +176,62 @@ def get_floordiv(op: str, type1: str, type2: str) -> str:
         """
 
 
+@norm_indent
+def get_floordiv_magic(shift: int) -> str:
+    # Floor division by a positive constant d: arg2 is the magic number
+    # ceil(2**(31 + shift) / d) with shift = ceil(log2(d))
+    return f"""
+    STENCIL void floordiv_magic{shift}_int_int(int a, int m) {{
+        uint32_t sign = (uint32_t)(a >> 31);
+        uint32_t t = (uint32_t)a ^ sign;
+        uint32_t q = (uint32_t)(((uint64_t)t * (uint32_t)m) >> {31 + shift});
+        result_int_int((int)(q ^ sign), m);
+    }}
+    """
+
+
+@norm_indent
+def get_tdiv_magic(shift: int) -> str:
+    # Truncating division (like C) by a positive constant, see get_floordiv_magic
+    return f"""
+    STENCIL void tdiv_magic{shift}_int_int(int a, int m) {{
+        uint32_t sign = (uint32_t)(a >> 31);
+        uint32_t t = ((uint32_t)a ^ sign) - sign;
+        uint32_t q = (uint32_t)(((uint64_t)t * (uint32_t)m) >> {31 + shift});
+        result_int_int((int)((q ^ sign) - sign), m);
+    }}
+    """
+
+
+@norm_indent
+def get_fused_op(op: str, type1: str, type2: str, type3: str, type_out: str) -> str:
+    # Float expressions are contracted to FMA instructions where the target has them
+    expr = fused_ops[op].replace('m', f"dummy_{type3}")
+    return f"""
+    STENCIL void {op}_{type1}_{type2}_{type3}({type1} arg1, {type2} arg2) {{
+        result_{type_out}_{type2}({expr}, arg2);
+    }}
+    """
+
+
+@norm_indent
+def get_square(type1: str) -> str:
+    return f"""
+    STENCIL void square_{type1}({type1} arg1) {{
+        result_{type1}(arg1 * arg1);
+    }}
+    """
+
+
+@norm_indent
+def get_sum_sq(type1: str, type2: str, type_out: str) -> str:
+    return f"""
+    STENCIL void sum_sq_{type1}_{type2}({type1} arg1, {type2} arg2) {{
+        result_{type_out}_{type2}(arg1 * arg1 + arg2 * arg2, arg2);
+    }}
+    """
+
+
 @norm_indent
 def get_min(type1: str, type2: str) -> str:
     if type1 == 'int' and type2 == 'int':
@@ -248,6 +308,15 @@ def get_store_code(type1: str, type2: str) -> str:
     """
 
 
+@norm_indent
+def get_swap_code(type1: str, type2: str) -> str:
+    return f"""
+    STENCIL void swap_{type1}_{type2}({type1} arg1, {type2} arg2) {{
+        result_{type2}_{type1}(arg2, arg1);
+    }}
+    """
+
+
 def permutate(*lists: list[str]) -> Generator[list[str], None, None]:
     if len(lists) == 0:
         yield []
@@ -329,12 +398,28 @@ if __name__ == "__main__":
 
     code += get_op_code('mod', 'int', 'int', 'int')
 
+    for shift in range(1, 32):
+        code += get_floordiv_magic(shift)
+        code += get_tdiv_magic(shift)
+
+    for t in types:
+        code += get_square(t)
+
+    for t1, t2 in permutate(types, types):
+        t_out = t1 if t1 == t2 else 'float'
+        code += get_sum_sq(t1, t2, t_out)
+
+    for op, t1, t2, t3 in permutate(list(fused_ops), types, types, types):
+        t_out = 'float' if 'float' in (t1, t2, t3) else 'int'
+        code += get_fused_op(op, t1, t2, t3, t_out)
+
     for t1, t2, t_out in permutate(types, types, types):
         code += get_load_reg0_code(t1, t2, t_out)
         code += get_load_reg1_code(t1, t2, t_out)
 
     for t1, t2 in permutate(types, types):
         code += get_store_code(t1, t2)
+        code += get_swap_code(t1, t2)
 
     print(f"Write file {args.path}...")
     with open(args.path, 'w') as f:
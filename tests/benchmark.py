@@ -150,6 +150,27 @@ def cp_vs_python_sparse(path: str = 'benchmark_results_001_sparse.json'):
         json.dump(results, f)
 
 
+def trace_memory(v_size: int = 100):
+    import gc
+    import tracemalloc
+    from copapy.backend import get_dag_stats
+
+    a = cp.tensor([[cp.value(float(i * v_size + j)) for j in range(v_size)] for i in range(v_size)])
+    b = cp.tensor([[cp.value(float(i + j)) for j in range(v_size)] for i in range(v_size)])
+
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    c = a @ b
+    elapsed = time.perf_counter() - t0
+    traced_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    op_count = sum(get_dag_stats([v.net for v in c.values]).values())
+    print(f"{v_size}x{v_size} matmul: {op_count} ops, {traced_bytes / op_count:.1f} bytes/op, "
+          f"{elapsed / op_count * 1e6:.2f} us/op")
+
+
 def plot_results(path: str):
     import json
     import matplotlib.pyplot as plt
@@ -278,6 +299,8 @@ if __name__ == "__main__":
     if 'no_simd' in sys.argv[1:]:
         os.environ["NPY_DISABLE_CPU_FEATURES"] = CPU_SIMD_FEATURES
         subprocess.run([sys.executable, "tests/benchmark.py"])
+    elif 'memory' in sys.argv[1:]:
+        trace_memory()
     elif 'plot' in sys.argv[1:]:
         plot_results(path1)
         #plot_results(path2)
@@ -0,0 +1,92 @@
+import copapy as cp
+import pytest
+
+
+def test_nested_plans():
+    v = cp.vector(cp.value(float(i)) for i in range(5))
+    m = cp.tensor([[cp.value(1.0), cp.value(2.0)], [cp.value(3.0), cp.value(4.0)]])
+    n = cp.value(3)
+    out = [v * 2.0, m @ m, n * n, (v.sum(), n > 2)]
+
+    tg = cp.Target()
+    tg.compile(out)
+    tg.run()
+
+    ref = [[0.0, 2.0, 4.0, 6.0, 8.0], [[7.0, 10.0], [15.0, 22.0]], 9, [10.0, True]]
+    reader = tg.get_read_plan(out)
+    result = reader.read()
+    assert isinstance(result[0], cp.vector) and isinstance(result[1], cp.tensor)
+    assert list(result[0].values) == pytest.approx(ref[0])  # pyright: ignore[reportUnknownMemberType]
+    assert result[1].shape == (2, 2) and list(result[1].values) == pytest.approx([7.0, 10.0, 15.0, 22.0])  # pyright: ignore[reportUnknownMemberType]
+    assert result[2] == 9 and result[3] == [10.0, True]
+    assert type(result[3][1]) is bool
+    assert [x.values for x in tg.read_value(out)[:2]] == [x.values for x in result[:2]]
+
+    # The plans can be reused for each cycle
+    writer = tg.get_write_plan([v, m, n], run=True)
+    for k in range(3):
+        writer.write([[k] * 5, cp.tensor([[1.0, 0.0], [0.0, float(k)]]), k])
+        result = reader.read()
+        assert list(result[0].values) == pytest.approx([2.0 * k] * 5)  # pyright: ignore[reportUnknownMemberType]
+        assert list(result[1].values) == pytest.approx([1.0, 0.0, 0.0, float(k * k)])  # pyright: ignore[reportUnknownMemberType]
+        assert result[2] == k * k and result[3] == [5.0 * k, k > 2]
+        assert type(result[3][1]) is bool
+
+
+def test_write_value_batch():
+    x = cp.vector(cp.value(0.0) for _ in range(200))
+    y = x * 3.0
+
+    tg = cp.Target()
+    tg.compile(y)
+    tg.write_value(x.values, [float(i) for i in range(200)])
+    tg.run()
+    assert tg.read_value(y.values) == pytest.approx([3.0 * i for i in range(200)])  # pyright: ignore[reportUnknownMemberType]
+
+    with pytest.raises(AssertionError):
+        tg.get_write_plan(x).write([1.0] * 199)
+
+
+def test_read_bool_values():
+    a = cp.value(2.0)
+    b = cp.value(1.0)
+    c = a > b
+    d = a < b
+
+    tg = cp.Target()
+    tg.compile(c, d)
+    tg.run()
+
+    # Comparison results are read as bool, also by read plans
+    for result in (tg.read_value([c, d]), list(tg.read_value(cp.vector([c, d])).values), [tg.read_value(c), tg.read_value(d)]):
+        assert result == [True, False]
+        assert all(type(r) is bool for r in result)
+
+
+def test_invalid_variables():
+    a = cp.value(1.0)
+    b = a * 2.0
+
+    # Strings and dicts are rejected instead of being iterated
+    tg = cp.Target()
+    with pytest.raises(TypeError):
+        tg.compile({'b': b})
+    with pytest.raises(TypeError):
+        tg.compile(b, 'a')
+
+    tg.compile(*{'b': b}.values())
+    tg.run()
+    assert tg.read_value(b) == 2.0
+    with pytest.raises(TypeError):
+        tg.read_value({'b': b})
+    with pytest.raises(TypeError):
+        tg.get_read_plan([b, 'b'])
+    with pytest.raises(TypeError):
+        tg.get_write_plan({'a': a})
+
+
+if __name__ == "__main__":
+    test_nested_plans()
+    test_write_value_batch()
+    test_read_bool_values()
+    test_invalid_variables()
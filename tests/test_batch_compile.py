@@ -0,0 +1,47 @@
+import copapy as cp
+from copapy.backend import Store, compile_to_dag, compile_batch
+from copapy._binwrite import Command
+
+
+def test_compile_batch():
+    x = cp.vector(cp.value(float(i)) for i in range(4))
+    k = cp.value(3)
+    graphs = [
+        [x * 2.0 + cp.sin(x[0]), k * k],
+        cp.vector(v ** 2 for v in x.values).sum() * k,
+        [cp.value(1.5) * 2.0 + x[1], k + 5, k > 2],
+    ]
+
+    # The second graph is compiled twice and lowered once
+    jobs = [(g, 'native', 'O3') for g in graphs] + [(graphs[1], 'native', 'O3')]
+    for processes in (1, 2):
+        programs = compile_batch(jobs, processes)
+        assert len(programs) == len(jobs)
+        for (data, variables), (g, _, _) in zip(programs, jobs):
+            flat = g if isinstance(g, list) else [g]
+            nodes = [Store(v) for gv in flat for v in (gv.values if isinstance(gv, cp.vector) else [gv])]
+            dw, ref_variables = compile_to_dag(nodes, cp.generic_sdb)
+            dw.write_com(Command.END_COM)
+            assert data == dw.get_data()
+            assert variables == ref_variables
+
+
+def test_ir_serialization():
+    a = cp.value(8)
+    b = cp.value(2.5)
+    c = (a * 3 + 7) * b - 0.1 + cp.cos(b)
+
+    ir = cp.backend.lower_dag([Store(c), Store(a > 3)])
+    loaded = cp.backend.dag_ir.from_bytes(ir.to_bytes())
+    assert loaded.op_names == ir.op_names
+    assert [list(a) for a in (loaded.codes, loaded.arg_offsets, loaded.args, loaded.dtypes)] == \
+        [list(a) for a in (ir.codes, ir.arg_offsets, ir.args, ir.dtypes)]
+    assert loaded.constants == ir.constants
+    assert all(type(loaded.constants[i]) is type(v) for i, v in ir.constants.items())
+    assert loaded.inputs == ir.inputs and loaded.commutative == ir.commutative
+    assert loaded.nets == [None] * len(ir)
+
+
+if __name__ == "__main__":
+    test_compile_batch()
+    test_ir_serialization()
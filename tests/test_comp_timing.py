@@ -157,7 +157,7 @@ def test_timing_compiler():
                     patch = sdb.get_patch(reloc, offset + len(data), offset, binw.Command.PATCH_FUNC.value)
                 else:
                     # Patch constants addresses on heap
-                    assert reloc.target_section_index in section_addr_lookup, f"- Function or object in {node.name} missing: {reloc.pelfy_reloc.symbol.name}"
+                    assert reloc.target_section_index in section_addr_lookup, f"- Function or object in {node.name} missing: {reloc.target_symbol_name}"
                     obj_addr = reloc.target_symbol_offset + section_addr_lookup[reloc.target_section_index]
                     patch = sdb.get_patch(reloc, obj_addr, offset, binw.Command.PATCH_OBJECT.value)
                     #print('* constants stancils', patch.type, patch.patch_address, binw.Command.PATCH_OBJECT, node.name)
@@ -186,7 +186,7 @@ def test_timing_compiler():
             if reloc.target_symbol_info in {'STT_OBJECT', 'STT_NOTYPE', 'STT_SECTION'}:
                 # Patch constants/variable addresses on heap
                 #print('--> DATA ', name, reloc.pelfy_reloc.symbol.name, reloc.pelfy_reloc.symbol.info, reloc.pelfy_reloc.symbol.section.name)
-                assert reloc.target_section_index in section_addr_lookup, f"- Function or object in {name} missing: {reloc.pelfy_reloc.symbol.name}"
+                assert reloc.target_section_index in section_addr_lookup, f"- Function or object in {name} missing: {reloc.target_symbol_name}"
                 obj_addr = reloc.target_symbol_offset + section_addr_lookup[reloc.target_section_index]
                 patch = sdb.get_patch(reloc, obj_addr, start, binw.Command.PATCH_OBJECT.value)
 
@@ -0,0 +1,77 @@
+import copapy as cp
+import copapy.backend as cpb
+from copapy import _target
+from typing import Any
+import os
+import pytest
+
+
+def build_program(x_init: float) -> tuple[cp.value[float], list[cp.value[float]]]:
+    x = cp.value(x_init)
+    y = cp.value(2.0)
+    return x, [x * y + 1.0, cp.sin(x) / 4, x ** 3]
+
+
+def test_compile_cache_hit(tmp_path: Any, monkeypatch: pytest.MonkeyPatch):
+    old_cache = cpb.get_compile_cache()
+    cpb.set_compile_cache(str(tmp_path))
+    try:
+        x, out = build_program(0.5)
+        tg = cp.Target()
+        tg.compile(out)
+        tg.run()
+        ref = tg.read_value(out)
+        assert len(os.listdir(tmp_path)) == 1
+
+        # A structurally equal DAG is loaded from the cache without compiling
+        def no_compile(*args: Any) -> Any:
+            raise AssertionError("Program should be loaded from the cache")
+        monkeypatch.setattr(_target, 'ir_compile', no_compile)
+
+        x2, out2 = build_program(0.5)
+        tg2 = cp.Target()
+        tg2.compile(out2)
+        tg2.run()
+        assert tg2.read_value(out2) == ref
+
+        tg2.write_value(x2, 1.5)
+        tg2.run()
+        assert tg2.read_value(out2) == pytest.approx([4.0, 0.2493737, 3.375])  # pyright: ignore[reportUnknownMemberType]
+    finally:
+        if old_cache:
+            cpb.set_compile_cache(old_cache.path, old_cache.max_size)
+        else:
+            cpb.set_compile_cache(None)
+
+
+def test_compile_cache_key():
+    sdb = cp.generic_sdb
+    keys = {cpb.get_dag_key(cpb.lower_dag([cpb.Store(v) for v in build_program(x)[1]]), sdb) for x in (0.5, 0.5, 1, 0.25)}
+    assert len(keys) == 3  # Constant 1 and 1.0 differ
+
+    _, out = build_program(0.5)
+    ir = cpb.lower_dag([cpb.Store(v) for v in out])
+    assert cpb.get_dag_key(ir, sdb) != cpb.get_dag_key(ir, sdb, reuse_slots=True)
+
+
+def test_compile_cache_eviction(tmp_path: Any):
+    cache = cpb.compile_cache(str(tmp_path), max_size=3000)
+    for i in range(10):
+        cache.put(f'key{i}', bytes(1000), [(i, 0, 4)])
+        os.utime(os.path.join(tmp_path, f'key{i}.cpc'), (i, i))
+        assert cache.get('key0')  # key0 stays recently used
+
+    names = sorted(os.listdir(tmp_path))
+    assert names == ['key0.cpc', 'key9.cpc']
+    assert cache.get('key9') == (bytes(1000), [(9, 0, 4)])
+    assert cache.get('key5') is None
+
+    cache.clear()
+    assert not os.listdir(tmp_path)
+
+
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as d:
+        test_compile_cache_eviction(d)
+    test_compile_cache_key()
@@ -0,0 +1,58 @@
+import copapy as cp
+import copapy.backend as cpb
+from copapy.backend import Store
+from copapy._basic_types import value_from_number
+from copapy._compiler import compile_to_dag, ir_get_constant_pool
+import pytest
+
+
+def test_constant_pool_layout():
+    x = cp.value(1.0)
+    y = cp.value(1.0)
+    c1 = value_from_number(0.5)
+    c2 = value_from_number(2)
+    zero_int = value_from_number(0)
+    zero_float = value_from_number(0.0)
+    out = [x * c1 + y, (x + c2) * 0.5, y - zero_int, x * zero_float]
+
+    ir = cpb.lower_dag([Store(v) for v in out])
+    layout, pool, end = ir_get_constant_pool(ir, cp.generic_sdb, 6)
+
+    starts = {i: start for i, start, _ in layout}
+    assert set(starts) == set(ir.constants)
+    assert min(starts.values()) == 8 and end == 8 + len(pool)
+
+    # Inputs come after the anonymous constants and have their own memory
+    inputs = sorted(ir.inputs)
+    assert sorted(starts[i] for i in inputs) == [end - 8, end - 4]
+    assert all(start < end - 8 for i, start in starts.items() if i not in ir.inputs)
+
+    # Equal anonymous constants share memory, also int 0 and float 0.0
+    zero_starts = {starts[i] for i, v in ir.constants.items() if v == 0 and i not in ir.inputs}
+    assert len(zero_starts) == 1
+    assert len(pool) == 4 * len(set(starts.values()))
+
+
+def test_single_copy_data():
+    v_size = 20
+    x = cp.vector(cp.value(float(i)) for i in range(v_size))
+    w = [value_from_number(i * 0.25 - 1) for i in range(v_size)]
+    y = sum(wi * xi for wi, xi in zip(w, x.values))
+
+    dw, variables = compile_to_dag([Store(y)], cp.generic_sdb)
+    assert [name for name, _, _ in dw._data].count('COPY_DATA') == 1
+
+    tg = cp.Target()
+    tg.compile(y)
+    tg.run()
+    assert tg.read_value(y) == pytest.approx(sum((i * 0.25 - 1) * i for i in range(v_size)))  # pyright: ignore[reportUnknownMemberType]
+
+    # Inputs in the pool can still be written
+    tg.write_value(x.values[3], 10.0)
+    tg.run()
+    assert tg.read_value(y) == pytest.approx(sum((i * 0.25 - 1) * (10 if i == 3 else i) for i in range(v_size)))  # pyright: ignore[reportUnknownMemberType]
+
+
+if __name__ == "__main__":
+    test_constant_pool_layout()
+    test_single_copy_data()
@@ -2,7 +2,10 @@ import copapy as cp
 from copapy import value
 from copapy.backend import get_dag_stats, Store
 import copapy.backend as cpb
+from copapy._basic_types import net_table
 from typing import Any
+import math
+import pytest
 
 
 def show_dag(val: value[Any]):
@@ -68,6 +71,66 @@ def test_dag_reduction():
     print(stat)
 
 
+def test_hash_consing():
+    a = value(8)
+    b = value(2.5)
+
+    c1 = a * 3 + 7
+    c2 = a * 3 + 7
+    assert c1.net is c2.net
+
+    # Commutative ops are interned independent of the operand order
+    assert (a * b).net is (b * a).net
+    assert (a - b).net is not (b - a).net
+
+    # Anonymous constants are shared, named ones are distinct
+    assert (c1 + 1.5).net.source.args[1] is (c2 + 1.5).net.source.args[1]
+    assert (a + value(3)).net is not (a + value(3)).net
+
+    # Interning does not keep graphs alive
+    import gc
+    gc.collect()
+    n = len(net_table)
+    d = sum(b * i for i in range(100))
+    assert len(net_table) > n
+    del d
+    gc.collect()
+    assert len(net_table) == n
+
+
+def test_compact_nodes():
+    a = value(8.0)
+    b = value(2.0)
+    c = a * b + a
+    d = b * a + b
+
+    # Graph objects use slots and carry no instance dicts
+    for obj in (c, c.net, c.net.source, a.net.source, Store(c)):
+        assert not hasattr(obj, '__dict__')
+
+    # Op names are shared between all ops of the same type
+    assert c.net.source.name is d.net.source.name
+    assert c.net.source.args[0].source.name is d.net.source.args[0].source.name
+
+
+def test_signed_zero_constants():
+    x = cp.value(-1.0)
+    a = cp.atan2(0.0, x)
+    b = cp.atan2(-0.0, x)
+
+    # -0.0 and 0.0 compare equal but are different constants
+    assert a.net is not b.net
+
+    tg = cp.Target()
+    tg.compile(a, b)
+    tg.run()
+    assert tg.read_value(a) == pytest.approx(math.pi)  # pyright: ignore[reportUnknownMemberType]
+    assert tg.read_value(b) == pytest.approx(-math.pi)  # pyright: ignore[reportUnknownMemberType]
+
+
 if __name__ == "__main__":
     test_get_dag_stats()
     test_dag_reduction()
+    test_hash_consing()
+    test_compact_nodes()
+    test_signed_zero_constants()
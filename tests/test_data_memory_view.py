@@ -0,0 +1,84 @@
+import copapy as cp
+import pytest
+
+
+def test_data_memory_view():
+    x = cp.vector(cp.value(float(i)) for i in range(8))
+    y = x.sum() * 2.0
+
+    tg = cp.Target()
+    tg.compile(y)
+    tg.run()
+    assert tg.read_value(y) == pytest.approx(56.0)  # pyright: ignore[reportUnknownMemberType]
+
+    # The inputs are stored contiguously, but not necessarily in vector order
+    inputs = sorted(x.values, key=lambda v: tg.get_variable_layout(v)[0])
+    view = tg.get_view(inputs)
+    assert view.format == 'f' and len(view) == 8
+    assert list(view) == [tg.read_value(v) for v in inputs]
+
+    # Writing through the view changes the inputs without copying
+    view[[id(v) for v in inputs].index(id(x.values[3]))] = 10.0
+    tg.run()
+    assert tg.read_value(x.values[3]) == pytest.approx(10.0)  # pyright: ignore[reportUnknownMemberType]
+    assert tg.read_value(y) == pytest.approx(70.0)  # pyright: ignore[reportUnknownMemberType]
+
+    # Non contiguous variables have no typed view
+    with pytest.raises(ValueError):
+        tg.get_view([inputs[0], inputs[2]])
+    view.release()
+
+
+def test_data_memory_lifetime():
+    a = cp.value(1.5)
+    b = a * 2.0
+
+    tg = cp.Target()
+    tg.compile(b)
+    tg.run()
+    view = tg.get_view([b])
+
+    # The data memory must not be freed while a view is in use
+    with pytest.raises(BufferError):
+        tg.compile(b)
+    assert view[0] == pytest.approx(3.0)
+
+    view.release()
+    tg.compile(b)
+    tg.run()
+
+    # Views stay valid if the target is deleted
+    view = tg.get_view([b])
+    del tg
+    assert view[0] == pytest.approx(3.0)
+
+
+def test_failed_recompile():
+    a = cp.value(1.5)
+    b = a * 2.0
+    c = cp.value(4.0)
+    d = c + 1.0
+
+    tg = cp.Target()
+    tg.compile(b)
+    tg.run()
+    view = tg.get_data_memory()[0:4]
+
+    # The target keeps the old program if the data memory is still in use
+    with pytest.raises(BufferError):
+        tg.compile(d)
+    assert tg.read_value(b) == pytest.approx(3.0)  # pyright: ignore[reportUnknownMemberType]
+    tg.write_value(a, 2.5)
+    tg.run()
+    assert tg.read_value(b) == pytest.approx(5.0)  # pyright: ignore[reportUnknownMemberType]
+
+    view.release()
+    tg.compile(d)
+    tg.run()
+    assert tg.read_value(d) == pytest.approx(5.0)  # pyright: ignore[reportUnknownMemberType]
+
+
+if __name__ == "__main__":
+    test_data_memory_view()
+    test_data_memory_lifetime()
+    test_failed_recompile()
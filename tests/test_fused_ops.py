@@ -0,0 +1,72 @@
+import copapy as cp
+import copapy.backend as cpb
+from copapy.backend import Store
+import pytest
+
+
+def test_fused_patterns():
+    a = cp.value(1.5)
+    b = cp.value(-2.0)
+    c = cp.value(0.25)
+    n = cp.value(3)
+    k = cp.value(-7)
+    m = cp.value(4)
+
+    t = a + b
+    u = b - c
+    out = [t + b * c, t - a * n, a * t - c, t * u + c, k * n + 5, t * t, a * a + k * k, n * n + m * m]
+
+    ir = cpb.ir_fuse(cpb.ir_simplify(cpb.lower_dag([Store(v) for v in out])))
+    names = [ir.get_name(i) for i in range(len(ir))]
+    print(names)
+    assert not any(n.startswith('mul_') and n.count('_') == 2 for n in names)
+    assert {'add_mul_float_float_float', 'sub_mul_float_float_int', 'mul_sub_float_float_float',
+            'mul_add_float_float_float', 'add_mul_int_int_int', 'square_float',
+            'sum_sq_float_int', 'sum_sq_int_int'} <= set(names)
+
+    tg = cp.Target()
+    tg.compile(out)
+    tg.run()
+    ref = [-0.5 - 2.0 * 0.25, -0.5 - 1.5 * 3, 1.5 * -0.5 - 0.25, -0.5 * -2.25 + 0.25, -21 + 5, 0.25, 2.25 + 49, 9 + 16]
+    assert tg.read_value(out) == pytest.approx(ref)  # pyright: ignore[reportUnknownMemberType]
+
+
+def test_fused_dot_product():
+    v_size = 50
+    v1 = cp.vector(cp.value(float(v)) for v in range(v_size))
+    v2 = cp.vector(cp.value(float(v % 7)) for v in range(v_size))
+    d = v1 @ v2 + v1.magnitude()
+
+    ir = cpb.lower_dag([Store(d)])
+    fused_ir = cpb.ir_fuse(ir)
+    print(len(ir), '->', len(fused_ir))
+    assert len(fused_ir) <= len(ir) - 2 * v_size + 2
+
+    tg = cp.Target()
+    tg.compile(d)
+    tg.run()
+    ref = sum(v * (v % 7) for v in range(v_size)) + sum(v * v for v in range(v_size)) ** 0.5
+    assert tg.read_value(d) == pytest.approx(ref)  # pyright: ignore[reportUnknownMemberType]
+
+
+def test_shared_operands():
+    # A product with more than one user must not be absorbed
+    a = cp.value(2.0)
+    b = cp.value(3.0)
+    p = a * b
+    out = [p + a, p - b, p]
+
+    ir = cpb.ir_fuse(cpb.lower_dag([Store(v) for v in out]))
+    names = [ir.get_name(i) for i in range(len(ir))]
+    assert 'mul_float_float' in names
+
+    tg = cp.Target()
+    tg.compile(out)
+    tg.run()
+    assert tg.read_value(out) == pytest.approx([8.0, 3.0, 6.0])  # pyright: ignore[reportUnknownMemberType]
+
+
+if __name__ == "__main__":
+    test_fused_patterns()
+    test_fused_dot_product()
+    test_shared_operands()
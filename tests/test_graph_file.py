@@ -0,0 +1,83 @@
+import copapy as cp
+import copapy.backend as cpb
+from copapy.backend import Store
+import pytest
+from typing import Any
+
+
+def trace_model() -> tuple[dict[str, Any], dict[str, Any]]:
+    x = cp.vector(cp.value(0.0) for _ in range(3))
+    gain = cp.value(2)
+    m = cp.tensor([[1.0, 0.5, 0.0], [0.0, cp.value(1.0), 2.0]])
+    y = m @ x * gain
+    inputs = {'x': x, 'gain': gain, 'm': m}
+    outputs = {'y': y, 'norm': [cp.sqrt((x * x).sum()), 1.5], 'positive': x[0] > 0, 'count': gain + 1}
+    return inputs, outputs
+
+
+def run_model(inputs: dict[str, Any], outputs: dict[str, Any], x_data: list[float]) -> Any:
+    tg = cp.Target()
+    tg.compile(outputs['y'], outputs['norm'], outputs['positive'], outputs['count'])
+    tg.write_value(inputs['x'], x_data)
+    tg.run()
+    return [tg.read_value(outputs[name]) for name in ('y', 'norm', 'positive', 'count')]
+
+
+def test_save_and_load_graph(tmp_path: Any):
+    inputs, outputs = trace_model()
+    path = str(tmp_path / 'model.cpg')
+    cp.save_graph(path, inputs, outputs)
+    loaded_inputs, loaded_outputs = cp.load_graph(path)
+
+    assert list(loaded_inputs) == ['x', 'gain', 'm'] and list(loaded_outputs) == ['y', 'norm', 'positive', 'count']
+    assert isinstance(loaded_inputs['x'], cp.vector) and isinstance(loaded_inputs['m'], cp.tensor)
+    assert loaded_inputs['m'].shape == (2, 3) and loaded_inputs['m'].values[0] == 1.0
+    assert loaded_outputs['norm'][1] == 1.5
+    assert loaded_outputs['positive'].dtype == 'bool'
+
+    for x_data in ([1.0, 2.0, 3.0], [-1.0, 0.5, 0.0]):
+        ref = run_model(inputs, outputs, x_data)
+        result = run_model(loaded_inputs, loaded_outputs, x_data)
+        assert list(result[0].values) == pytest.approx(list(ref[0].values))  # pyright: ignore[reportUnknownMemberType]
+        assert result[1:] == ref[1:]
+
+    # The loaded graph can be extended and saved again
+    z = loaded_outputs['y'].sum() * loaded_inputs['gain']
+    data = cpb.graph_to_bytes(loaded_inputs, {'z': z})
+    _, reloaded_outputs = cpb.graph_from_bytes(data)
+    assert isinstance(reloaded_outputs['z'], cp.value)
+
+
+def test_graph_ir():
+    inputs, outputs = trace_model()
+    data = cpb.graph_to_bytes(inputs, outputs)
+    ir, ir_inputs, ir_outputs = cpb.graph_ir_from_bytes(data)
+
+    ref_ir = cpb.lower_dag([Store(v) for v in [*outputs['y'].values, outputs['norm'][0], outputs['positive'], outputs['count']]] +
+                           [v.net.source for v in [*inputs['x'].values, inputs['gain'], inputs['m'].values[4]]])
+    assert [ir.get_name(i) for i in range(len(ir))] == [ref_ir.get_name(i) for i in range(len(ref_ir))]
+    assert ir_inputs['gain'] in ir.inputs and ir.get_dtype(ir_outputs['count']) == 'int'
+    assert all(isinstance(i, int) for i in ir_outputs['y'].values)
+
+    dw, variables = cpb.ir_compile(ir, cp.generic_sdb)
+    assert ir.nets[ir_outputs['norm'][0]] in variables
+
+
+def test_invalid_graph():
+    a = cp.value(1.0)
+    b = a * 2.0
+    with pytest.raises(ValueError):
+        cpb.graph_to_bytes({'b': b}, {'a': a})
+    with pytest.raises(TypeError):
+        cpb.graph_to_bytes({'a': a}, {'b': 'text'})
+    with pytest.raises(ValueError):
+        cpb.graph_from_bytes(b'CPIR' + bytes(16))
+
+
+if __name__ == "__main__":
+    import tempfile
+    import pathlib
+    with tempfile.TemporaryDirectory() as tmp:
+        test_save_and_load_graph(pathlib.Path(tmp))
+    test_graph_ir()
+    test_invalid_graph()
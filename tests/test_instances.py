@@ -0,0 +1,72 @@
+import copapy as cp
+import math
+import pytest
+from copapy._basic_types import value_from_number
+
+
+def test_instances():
+    x = cp.vector(cp.value(0.0) for _ in range(3))
+    gain = cp.value(1)
+    y = x * cp.sin(x[0] + 0.5) * gain
+    s = y.sum()
+
+    tg = cp.Target()
+    tg.compile(y, s)
+    data_size = len(tg.get_data_memory())
+
+    instances = tg.create_instances(16)
+    assert instances.state_size <= data_size
+
+    # The state starts at the first input, anonymous constants are shared
+    state_start = data_size - instances.state_size
+    assert state_start == min(tg.get_variable_layout(v)[0] for v in [*x.values, gain])
+    assert tg.get_variable_layout(value_from_number(0.5))[0] < state_start
+    for i in range(instances.n):
+        instances.write_value(i, x, [float(i), 1.0, -2.0])
+        instances.write_value(i, gain, i % 3)
+
+    instances.step_all()
+    for i in range(instances.n):
+        ref = [v * math.sin(i + 0.5) * (i % 3) for v in (float(i), 1.0, -2.0)]
+        assert list(instances.read_value(i, y).values) == pytest.approx(ref)  # pyright: ignore[reportUnknownMemberType]
+        assert instances.read_value(i, s) == pytest.approx(sum(ref))  # pyright: ignore[reportUnknownMemberType]
+
+    # The target holds the state of the last instance
+    assert tg.read_value(gain) == 15 % 3
+
+    # Instances are independent of the target and of each other
+    tg.write_value(gain, 100)
+    instances.get_state(0)[:] = instances.get_state(1)
+    instances.step_all()
+    assert instances.read_value(0, x.values[0]) == 1.0
+    assert instances.read_value(0, s) == pytest.approx(instances.read_value(1, s))  # pyright: ignore[reportUnknownMemberType]
+    assert instances.read_value(2, gain) == 2
+
+
+def test_instances_folded_constants():
+    a = cp.value(1.0)
+    b = a * 2.0
+    k = (a - a) + 4.0  # Folded into a shared constant
+    c = a + 1.0
+
+    tg = cp.Target()
+    tg.compile(b, k, c)
+    instances = tg.create_instances(3)
+    assert tg.get_variable_layout(k)[0] < len(tg.get_data_memory()) - instances.state_size
+
+    for i in range(instances.n):
+        instances.write_value(i, a, i + 0.5)
+    instances.step_all()
+    for i in range(instances.n):
+        assert instances.read_value(i, k) == 4.0
+        assert instances.read_value(i, [b, k, c]) == [2 * i + 1.0, 4.0, i + 1.5]
+
+    # Shared constants can not be written per instance
+    with pytest.raises(ValueError):
+        instances.write_value(1, k, 5.0)
+    assert instances.read_value(0, [k, c]) == [4.0, 1.5]
+
+
+if __name__ == "__main__":
+    test_instances()
+    test_instances_folded_constants()
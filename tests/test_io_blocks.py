@@ -0,0 +1,113 @@
+import copapy as cp
+from copapy._compiler import IO_BLOCK_ALIGNMENT
+import struct
+from array import array
+import pytest
+
+
+def test_io_blocks():
+    x = cp.vector(cp.value(float(i)) for i in range(6))
+    k = cp.value(2)
+    unused = cp.value(7.5)
+    y = x * 2.0
+    s = x.sum() * k
+
+    for reuse_slots in (False, True):
+        tg = cp.Target()
+        tg.compile(reuse_slots=reuse_slots, inputs=[x, k, unused], outputs=[s, y, k * 3])
+
+        # Variables are placed in declared order
+        input_layout = [tg.get_variable_layout(v) for v in [*x.values, k, unused]]
+        assert input_layout[0][0] % IO_BLOCK_ALIGNMENT == 0
+        assert [addr - input_layout[0][0] for addr, _, _ in input_layout] == [i * 4 for i in range(8)]
+        output_layout = [tg.get_variable_layout(v) for v in [s, *y.values]]
+        assert output_layout[0][0] % IO_BLOCK_ALIGNMENT == 0
+        assert [addr - output_layout[0][0] for addr, _, _ in output_layout] == [i * 4 for i in range(7)]
+
+        # Both blocks are copied at once
+        assert len(tg.get_input_block()) == 32
+        tg.get_input_block()[:] = struct.pack('=6fif', *[1.0] * 6, 3, 0.5)
+        tg.run()
+        assert struct.unpack('=7fi', tg.get_output_block()) == (18.0, *[2.0] * 6, 9)
+        assert tg.read_value(unused) == 0.5
+
+
+def test_invalid_io_blocks():
+    a = cp.value(1.0)
+    b = a * 2.0
+
+    tg = cp.Target()
+    with pytest.raises(ValueError):
+        tg.compile(b, inputs=[b])
+    with pytest.raises(ValueError):
+        tg.compile(b, outputs=[a])
+    with pytest.raises(ValueError):
+        tg.compile(b, outputs=[b, b])
+    with pytest.raises(ValueError):
+        tg.compile(b, inputs=[a, a])
+
+
+def test_run_with_buffers():
+    a = cp.value(1.0)
+    b = cp.value(2.0)
+    n = cp.value(1)
+    c = a * b + 1.0
+    m = n * 3
+
+    tg = cp.Target()
+    with pytest.raises(RuntimeError):
+        tg.run()
+
+    tg.compile(inputs=[a, b, n], outputs=[c, m])
+    tg.run()
+    assert tg.read_value([c, m]) == [3.0, 3]
+
+    outputs = bytearray(8)
+    tg.run(struct.pack('=ffi', 3.0, 4.0, 5), outputs)
+    assert struct.unpack('=fi', outputs) == (13.0, 15)
+
+    # Only outputs, the inputs are unchanged
+    outputs[:] = bytes(8)
+    tg.run(None, memoryview(outputs))
+    assert struct.unpack('=fi', outputs) == (13.0, 15)
+
+    with pytest.raises(ValueError):
+        tg.run(bytes(4))
+    with pytest.raises(ValueError):
+        tg.run(None, bytearray(16))
+
+
+def test_run_batch():
+    x = cp.value(0.0)
+    k = cp.value(0)
+    acc = cp.value(0.0)
+    y = x * 2.0 + acc
+    n = k + 1
+
+    tg = cp.Target()
+    tg.compile(inputs=[x, k], outputs=[y, n])
+
+    rows = 1000
+    inputs = bytearray()
+    for i in range(rows):
+        inputs += struct.pack('=fi', i * 0.5, i)
+    outputs = tg.run_batch(inputs)
+    assert len(outputs) == rows * 8
+    assert list(struct.iter_unpack('=fi', outputs)) == [(i * 1.0, i + 1) for i in range(rows)]
+
+    # Preallocated output buffer and runs with the last inputs
+    results = array('i', [0] * 20)
+    tg.run_batch(None, memoryview(results), 10)
+    assert set(struct.iter_unpack('=fi', results)) == {(999.0, 1000)}
+
+    with pytest.raises(ValueError):
+        tg.run_batch(inputs[:-1])
+    with pytest.raises(ValueError):
+        tg.run_batch(inputs, bytearray(8), 2)
+
+
+if __name__ == "__main__":
+    test_io_blocks()
+    test_invalid_io_blocks()
+    test_run_with_buffers()
+    test_run_batch()
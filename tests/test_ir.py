@@ -0,0 +1,56 @@
+import copapy as cp
+import copapy.backend as cpb
+from copapy.backend import Store
+
+
+def test_lower_dag():
+    a = cp.value(8)
+    b = cp.value(2.5)
+
+    c = (a * 3 + 7 + 2) + (a * 3 + 7 + 2)
+    d = c * b - b
+
+    ir = cpb.lower_dag([Store(c), Store(d)])
+
+    # Operands are always defined before they are used
+    for i, _, args in ir.iter_nodes():
+        assert all(a < i for a in args)
+
+    # Common subexpressions are merged
+    names = [ir.get_name(i) for i in range(len(ir))]
+    print(names)
+    assert names.count('mul_int_int') == 1
+    assert names.count('store_int') == 1 and names.count('store_float') == 1
+
+    # Node order matches the object based passes
+    ordered_ops = cpb.stable_toposort(cpb.get_all_dag_edges([Store(c), Store(d)]))
+    assert [n.name for n in ordered_ops] == names
+
+    assert {ir.constants[i] for i in ir.inputs} == {8, 2.5}
+    assert all(ir.nets[i] is not None for i in range(len(ir)) if not ir.get_name(i).startswith('store_'))
+
+
+def test_ir_load_store_ops():
+    a = cp.value(0.25)
+    b = cp.value(0.87)
+    c = a + b * 2.0
+    d = c ** 2 + cp.sin(a)
+
+    ir = cpb.lower_dag([Store(c), Store(d)])
+    ops = list(cpb.ir_add_store_ops(ir, cpb.ir_add_load_ops(ir)))
+
+    for i, code in ops:
+        name = ir.op_names[code]
+        print(name, i)
+        if name.startswith('load_') or name.startswith('store_'):
+            assert i >= 0
+            assert name.split('_')[1] == ir.get_dtype(i)
+        else:
+            assert i == -1
+
+    assert all(ir.op_names[code] in cp.generic_sdb.stencil_definitions for _, code in ops)
+
+
+if __name__ == "__main__":
+    test_lower_dag()
+    test_ir_load_store_ops()
@@ -1,4 +1,8 @@
 import copapy as cp
+from copapy import _target
+from collections import OrderedDict
+from typing import Any
+import pytest
 
 @cp.jit
 def calculation(x: float, y: float) -> float:
@@ -78,3 +82,42 @@ def test_hash():
     h = cp.jit(slow_31bit_int_list_hash)(nums)
     print(h, h_ref)
     assert h == h_ref
+
+
+def scaled_sum(values: list[Any], scale: Any) -> Any:
+    return [sum(v * scale for v in values), scale + 1, 0.5]
+
+
+def test_jit_signatures():
+    f = cp.jit(scaled_sum)
+
+    # New programs for new list lengths and int/float mixes
+    assert f([1, 2, 3], 2) == [12, 3, 0.5]
+    assert f([1, 2, 3, 4], 2) == [20, 3, 0.5]
+    assert f([1.5, 2], 2) == [7.0, 3, 0.5]
+    assert f([1, 2], 0.5) == [1.5, 1.5, 0.5]
+    assert f([3, 2, 1], 3) == [18, 4, 0.5]
+    assert isinstance(f([3, 2, 1], 3)[0], int)
+
+
+def test_jit_cache_eviction(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(_target, 'JIT_CACHE_SIZE', 2)
+    monkeypatch.setattr(_target, '_jit_cache', OrderedDict())
+
+    f = cp.jit(scaled_sum)
+    for n in range(1, 6):
+        assert f(list(range(n)), 2)[0] == n * (n - 1)
+        assert len(_target._jit_cache) <= 2
+    assert f([1], 1.0)[0] == 1.0
+    assert [sig for _, sig in _target._jit_cache] == [((int, int, int, int, int), int), ((int,), float)]
+
+
+def test_jit_bool_results():
+    @cp.jit
+    def compare(x: float, y: float) -> Any:
+        return x > y, [x < y, x == y], cp.vector([x > 0.0, y > 0.0])
+
+    greater, others, signs = compare(1.0, 2.0)
+    assert greater is False
+    assert others == [True, False] and all(type(r) is bool for r in others)
+    assert signs.values == (True, True) and all(type(r) is bool for r in signs.values)
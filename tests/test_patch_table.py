@@ -0,0 +1,78 @@
+import copapy as cp
+from copapy import _binwrite as binw
+from copapy._compiler import compile_to_dag
+from copapy.backend import Store
+import random
+import pytest
+
+
+def test_patch_table_encoding():
+    rnd = random.Random(0)
+    entries = sorted((rnd.randrange(0, 1 << 20), rnd.randint(-0x80000000, 0x7FFFFFFF)) for _ in range(500))
+    entries += [(entries[-1][0] + 1, -1), (entries[-1][0] + 300, 0)]
+
+    for byteorder in ('little', 'big'):
+        dw = binw.data_writer(byteorder)
+        dw.write_patch_table(binw.Command.PATCH_OBJECT, 0xFFFFFF, 4, entries)
+        dw.write_com(binw.Command.END_COM)
+
+        dr = binw.data_reader(dw.get_data(), byteorder)
+        assert dr.read_com() == binw.Command.PATCH_TABLE
+        assert dr.read_patch_table() == (binw.Command.PATCH_OBJECT, 0xFFFFFF, 4, entries)
+        assert dr.read_com() == binw.Command.END_COM
+
+
+def test_patch_table_stream():
+    a = cp.vector(cp.value(float(i)) for i in range(30))
+    b = cp.vector(cp.value(float(i % 4)) for i in range(30))
+    c = a @ b + cp.sin(a[2])
+
+    dw, _ = compile_to_dag([Store(c)], cp.generic_sdb)
+    commands = [name for name, _, flag in dw._data if flag]
+    print(commands)
+    assert 'PATCH_TABLE' in commands
+    assert len(commands) < 20
+
+    tg = cp.Target()
+    tg.compile(c)
+    tg.run()
+    ref = sum(i * (i % 4) for i in range(30)) + 0.9092974268256817
+    assert tg.read_value(c) == pytest.approx(ref)  # pyright: ignore[reportUnknownMemberType]
+
+
+def test_code_relative_patches_applied():
+    a = cp.value(0.5)
+    c = cp.sin(a) * cp.exp(a) + a
+
+    dw, _ = compile_to_dag([Store(c)], cp.generic_sdb)
+    dr = binw.data_reader(dw.get_data(), cp.generic_sdb.byteorder)
+
+    # Only data relative patches are left for the runner
+    patch_types: list[binw.Command] = []
+    com = dr.read_com()
+    while com != binw.Command.ENTRY_POINT:
+        if com == binw.Command.PATCH_TABLE:
+            patch_type, _, _, entries = dr.read_patch_table()
+            patch_types += [patch_type] * len(entries)
+        elif com.name.startswith('PATCH_'):
+            patch_types.append(com)
+            dr.read_bytes(16)
+        elif com in (binw.Command.COPY_CODE, binw.Command.COPY_DATA):
+            dr.read_int()
+            dr.read_bytes(dr.read_int())
+        elif com != binw.Command.FREE_MEMORY:
+            dr.read_int()
+        com = dr.read_com()
+    assert patch_types
+    assert binw.Command.PATCH_FUNC not in patch_types
+
+    tg = cp.Target()
+    tg.compile(c)
+    tg.run()
+    assert tg.read_value(c) == pytest.approx(0.4794255386 * 1.6487212707 + 0.5)  # pyright: ignore[reportUnknownMemberType]
+
+
+if __name__ == "__main__":
+    test_patch_table_encoding()
+    test_patch_table_stream()
+    test_code_relative_patches_applied()
@@ -0,0 +1,59 @@
+import copapy as cp
+import copapy.backend as cpb
+from copapy.backend import Store
+import pytest
+
+
+def test_register_swap():
+    a = cp.value(1.5)
+    c = cp.value(4.0)
+    t = c - a
+    y = a - t  # Operands are in crossed registers after computing t
+
+    ir = cpb.ir_schedule(cpb.lower_dag([Store(y)]))
+    names = [ir.op_names[code] for _, code in cpb.ir_add_store_ops(ir, cpb.ir_add_load_ops(ir))]
+    print(names)
+    assert 'swap_float_float' in names
+
+    tg = cp.Target()
+    tg.compile(y)
+    tg.run()
+    assert tg.read_value(y) == pytest.approx(1.5 - (4.0 - 1.5))  # pyright: ignore[reportUnknownMemberType]
+
+
+def test_commutative_operands():
+    a = cp.value(3)
+    b = cp.value(0.5)
+    t = b * 2.0
+    y = (a + t) * (t + a) + (a == t)
+
+    stats = cpb.get_load_store_stats([Store(y)])
+    ref_stats = cpb.get_load_store_stats([Store(y)], schedule=False)
+    print(ref_stats, '->', stats)
+    assert stats['load'] < ref_stats['load']
+
+    tg = cp.Target()
+    tg.compile(y)
+    tg.run()
+    assert tg.read_value(y) == pytest.approx((3 + 1.0) * (1.0 + 3))  # pyright: ignore[reportUnknownMemberType]
+
+
+def test_schedule_order():
+    v1 = cp.vector(cp.value(float(v)) for v in range(20))
+    v2 = cp.vector(cp.value(float(v)) for v in range(20, 40))
+    outputs = [Store(v) for v in (v1 * v2 + v1).values]
+
+    ir = cpb.lower_dag(outputs)
+    scheduled = cpb.ir_schedule(ir)
+
+    # Operands are still defined before their users
+    for i, _, args in scheduled.iter_nodes():
+        assert all(a < i for a in args)
+    assert sorted(scheduled.get_name(i) for i in range(len(scheduled))) == sorted(ir.get_name(i) for i in range(len(ir)))
+    assert {scheduled.constants[i] for i in scheduled.inputs} == {ir.constants[i] for i in ir.inputs}
+
+
+if __name__ == "__main__":
+    test_register_swap()
+    test_commutative_operands()
+    test_schedule_order()
@@ -0,0 +1,78 @@
+import copapy as cp
+import copapy.backend as cpb
+from copapy.backend import Store, get_simplify_stats
+from copapy._basic_types import value_from_number
+import pytest
+
+
+def test_constant_regrouping():
+    x = cp.value(2.0)
+    n = cp.value(7)
+
+    y1 = ((x + 1) + 2) - 0.5
+    y2 = (n * 3) * 4
+    y3 = -(-x)
+    y4 = n - n
+    out = [y1, y2, y3, y4]
+
+    stats = get_simplify_stats([Store(v) for v in out])
+    print(stats)
+    assert stats['neg_float'] == 2
+    assert stats['sub_int_int'] == 1
+    assert stats['mul_int_int'] == 1
+
+    ir = cpb.ir_simplify(cpb.lower_dag([Store(v) for v in out]))
+    names = [ir.get_name(i) for i in range(len(ir))]
+    print(names)
+    assert names.count('add_float_int') + names.count('add_float_float') == 1
+    assert 'sub_float_float' not in names
+
+    tg = cp.Target()
+    tg.compile(out)
+    tg.run()
+    assert tg.read_value(out) == pytest.approx([4.5, 84, 2.0, 0])  # pyright: ignore[reportUnknownMemberType]
+
+    tg.write_value(x, -1.0)
+    tg.write_value(n, 2)
+    tg.run()
+    assert tg.read_value(out) == pytest.approx([1.5, 24, -1.0, 0])  # pyright: ignore[reportUnknownMemberType]
+
+
+def test_constant_folding():
+    x = cp.value(0.5)
+    c16 = value_from_number(16.0)  # anonymous constant
+    c7 = value_from_number(7)
+
+    a = cp.sqrt(c16) * x
+    b = c7 // 2 + (-c7) % 3 + x
+
+    stats = get_simplify_stats([Store(a), Store(b)])
+    print(stats)
+    assert stats == {'sqrt_float': 1, 'floordiv_int_int': 1, 'neg_int': 1, 'mod_int_int': 1, 'add_int_int': 1}
+
+    tg = cp.Target()
+    tg.compile(a, b)
+    tg.run()
+    assert tg.read_value(a) == pytest.approx(2.0)  # pyright: ignore[reportUnknownMemberType]
+    assert tg.read_value(b) == pytest.approx(3 + -1 + 0.5)  # pyright: ignore[reportUnknownMemberType]
+
+
+def test_int_folding_semantics():
+    # Folded int ops follow the 32 bit C semantics of the stencils
+    c7 = value_from_number(7)
+    c_max = value_from_number(0x7FFFFFFF)
+    results = [(-c7) % 3, c_max + 1, (-c7) // 2, c7 >> 1, (-c7) << 2]
+
+    ir = cpb.ir_simplify(cpb.lower_dag([Store(v) for v in results]))
+    assert all(ir.get_name(i).startswith(('const_', 'store_')) for i in range(len(ir)))
+
+    tg = cp.Target()
+    tg.compile(results)
+    tg.run()
+    assert tg.read_value(results) == [-1, -0x80000000, -4, 3, -28]
+
+
+if __name__ == "__main__":
+    test_constant_regrouping()
+    test_constant_folding()
+    test_int_folding_semantics()
@@ -0,0 +1,64 @@
+import copapy as cp
+import copapy.backend as cpb
+from copapy._compiler import ir_get_data_layout, ir_get_shared_data_layout, ir_get_variables, ir_get_pinned_nodes
+from copapy.backend import Store
+import pytest
+
+
+def kinematics_chain(n: int) -> tuple[cp.vector[float], cp.value[float], cp.value[float]]:
+    theta1 = cp.value(0.1)
+    theta2 = cp.value(0.2)
+    pos = cp.vector([0.0, 0.0])
+    for i in range(n):
+        pos = pos + cp.vector([cp.cos(theta1 * i) * 1.5, cp.sin(theta2 + i) * 0.5])
+    return pos, theta1, theta2
+
+
+def test_shared_layout_size():
+    pos, _, _ = kinematics_chain(20)
+    ir = cpb.lower_dag([Store(v) for v in pos.values])
+    ops = list(cpb.ir_add_store_ops(ir, cpb.ir_add_load_ops(ir)))
+
+    _, full_length = ir_get_data_layout(ir, ir_get_variables(ir, ops), cp.generic_sdb)
+    layout, shared_length = ir_get_shared_data_layout(ir, ops, cp.generic_sdb)
+    print(f"data memory: {full_length} -> {shared_length} bytes")
+    assert shared_length < full_length
+
+    # Pinned variables never share memory with other variables
+    pinned = ir_get_pinned_nodes(ir)
+    pinned_offsets = [start for i, start, _ in layout if i in pinned]
+    assert len(set(pinned_offsets)) == len(pinned_offsets)
+    assert not set(pinned_offsets) & {start for i, start, _ in layout if i not in pinned}
+
+    # Temporaries sharing memory have disjoint live ranges
+    live: dict[int, tuple[int, int]] = {}
+    for p, (i, _) in enumerate(ops):
+        if i >= 0:
+            live[i] = (live.get(i, (p, p))[0], p)
+    by_offset: dict[int, list[int]] = {}
+    for i, start, _ in layout:
+        by_offset.setdefault(start, []).append(i)
+    for nodes in by_offset.values():
+        ranges = sorted(live[i] for i in nodes)
+        assert all(r1[1] < r2[0] for r1, r2 in zip(ranges, ranges[1:]))
+
+
+def test_shared_layout_results():
+    pos, theta1, theta2 = kinematics_chain(20)
+
+    tg1 = cp.Target()
+    tg1.compile(pos)
+    tg2 = cp.Target()
+    tg2.compile(pos, reuse_slots=True)
+
+    for tg in (tg1, tg2):
+        tg.write_value(theta1, 0.3)
+        tg.write_value(theta2, -0.4)
+        tg.run()
+
+    assert tg2.read_value(pos.values) == pytest.approx(tg1.read_value(pos.values))  # pyright: ignore[reportUnknownMemberType]
+
+
+if __name__ == "__main__":
+    test_shared_layout_size()
+    test_shared_layout_results()
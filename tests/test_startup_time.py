@@ -0,0 +1,48 @@
+import subprocess
+import sys
+import os
+
+# Startup time budget: "import copapy" must not load any stencil database
+# and take less than IMPORT_TIME_BUDGET seconds in a fresh interpreter.
+# Building the first operation only loads the op signature table and must
+# take less than FIRST_OP_BUDGET seconds. CLI tools and test collection
+# import copapy very often, so keep this fast. The time budgets are only
+# checked if CP_CHECK_STARTUP_TIME is set, since the tests also run in
+# emulated containers.
+IMPORT_TIME_BUDGET = 0.5
+FIRST_OP_BUDGET = 0.05
+
+startup_code = """
+import time
+t0 = time.perf_counter()
+import copapy as cp
+from copapy import _basic_types
+t1 = time.perf_counter()
+loaded_on_import = len(_basic_types.stencil_cache)
+c = cp.value(1.0) * 2.0 + cp.value(3)
+t2 = time.perf_counter()
+print(t1 - t0, t2 - t1, loaded_on_import)
+"""
+
+
+def run_startup() -> tuple[float, float, int]:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    ret = subprocess.run([sys.executable, '-c', startup_code], env=env,
+                         capture_output=True, text=True, check=True)
+    import_time, first_op_time, loaded_on_import = ret.stdout.split()
+    return float(import_time), float(first_op_time), int(loaded_on_import)
+
+
+def test_startup_time():
+    # Best of three runs, first run also writes the bytecode cache
+    results = [run_startup() for _ in range(3)]
+    print(results)
+
+    assert all(loaded == 0 for _, _, loaded in results)
+    if os.environ.get('CP_CHECK_STARTUP_TIME'):
+        assert min(r[0] for r in results) < IMPORT_TIME_BUDGET
+        assert min(r[1] for r in results) < FIRST_OP_BUDGET
+
+
+if __name__ == "__main__":
+    test_startup_time()
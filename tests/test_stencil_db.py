@@ -1,8 +1,11 @@
-from copapy._stencils import get_stencil_position
-from copapy._basic_types import stencil_db_from_package
+from copapy._stencils import get_stencil_position, stencil_database, detect_process_arch
+import pkgutil
 
 
-sdb = stencil_db_from_package()
+# Load the ELF object file directly, not the precompiled index
+obj_data = pkgutil.get_data('copapy', f"obj/stencils_{detect_process_arch()}_O3.o")
+assert obj_data
+sdb = stencil_database(obj_data)
 
 
 def test_list_symbols():
@@ -0,0 +1,64 @@
+import copapy as cp
+from copapy._stencils import stencil_database, stencil_index, detect_process_arch
+from copapy._compiler import compile_to_dag
+from copapy.backend import Store
+import pkgutil
+import pytest
+
+
+def get_obj_data() -> bytes:
+    obj_data = pkgutil.get_data('copapy', f"obj/stencils_{detect_process_arch()}_O3.o")
+    assert obj_data
+    return obj_data
+
+
+def test_index_queries():
+    obj_data = get_obj_data()
+    sdb = stencil_database(obj_data)
+    sdb_index = stencil_index(sdb.to_index(), obj_data)
+
+    assert sdb_index.stencil_definitions == sdb.stencil_definitions
+    assert sdb_index.byteorder == sdb.byteorder
+    assert sdb_index.thumb_mode == sdb.thumb_mode
+
+    for name in sdb.stencil_definitions:
+        assert list(sdb_index.get_relocations(name)) == list(sdb.get_relocations(name))
+        assert sdb_index.get_sub_functions([name]) == sdb.get_sub_functions([name])
+        assert sdb_index.const_sections_from_functions([name]) == sdb.const_sections_from_functions([name])
+        assert sdb_index.get_symbol_section_index(name) == sdb.get_symbol_section_index(name)
+        assert sdb_index.get_function_code(name) == sdb.get_function_code(name)
+        if name.startswith(('add_', 'load_', 'sin_')):
+            assert sdb_index.get_stencil_code(name) == sdb.get_stencil_code(name)
+            assert list(sdb_index.get_relocations(name, True)) == list(sdb.get_relocations(name, True))
+
+    for part in ('start', 'end'):
+        assert sdb_index.get_function_code('entry_function_shell', part) == sdb.get_function_code('entry_function_shell', part)
+
+
+def test_index_compile():
+    obj_data = get_obj_data()
+    sdb = stencil_database(obj_data)
+    sdb_index = stencil_index(sdb.to_index())
+
+    a = cp.vector(cp.value(float(i)) for i in range(8))
+    out = [a @ a + cp.sin(a[1]) * cp.exp(a[2]), cp.atan2(a[3], a[4]), cp.value(7) // 3 % 5]
+
+    dw, _ = compile_to_dag([Store(v) for v in out], sdb)
+    dw_index, _ = compile_to_dag([Store(v) for v in out], sdb_index)
+    assert dw_index.get_data() == dw.get_data()
+
+
+def test_outdated_index():
+    obj_data = get_obj_data()
+    index_data = stencil_database(obj_data).to_index()
+
+    with pytest.raises(ValueError):
+        stencil_index(index_data, obj_data + b'\0')
+    with pytest.raises(ValueError):
+        stencil_index(b'')
+
+
+if __name__ == "__main__":
+    test_index_queries()
+    test_index_compile()
+    test_outdated_index()
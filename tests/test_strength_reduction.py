@@ -0,0 +1,67 @@
+import copapy as cp
+import copapy.backend as cpb
+from copapy.backend import Store
+import pytest
+
+
+def get_op_names(values: list[cp.value[int]] | list[cp.value[float]]) -> list[str]:
+    ir = cpb.ir_simplify(cpb.lower_dag([Store(v) for v in values]))
+    return [ir.get_name(i) for i in range(len(ir))]
+
+
+def test_int_division():
+    x = cp.value(0)
+    divisors = [1, 2, 3, 7, 8, 10, 1000, 0x7FFFFFFF, -1, -3]
+    out = [x // d for d in divisors if d > 0] + [x % d for d in divisors] + [x * 8]
+
+    names = get_op_names(out)
+    print(names)
+    assert not any(n.startswith(('floordiv_int', 'mod_')) for n in names)
+    assert 'rshift_int_int' in names and 'lshift_int_int' in names
+
+    tg = cp.Target()
+    tg.compile(out)
+    for val in [0, 1, -1, 5, -5, 6, -6, 999, -1001, 123456789, -123456789, 0x7FFFFFFF, -0x80000000]:
+        tg.write_value(x, val)
+        tg.run()
+        ref = [val // d for d in divisors if d > 0] + [int(math_fmod(val, d)) for d in divisors] + [val * 8]
+        ref = [(r + 0x80000000) % 0x100000000 - 0x80000000 for r in ref]
+        assert tg.read_value(out) == ref, val
+
+
+def math_fmod(a: int, b: int) -> int:
+    # Remainder with the sign of the dividend like in C
+    r = abs(a) % abs(b)
+    return -r if a < 0 else r
+
+
+def test_float_division_and_pow():
+    x = cp.value(0.0)
+    out = [x / 4, x / 3, x ** 0.5, x ** 3, x ** -2, x ** 13]
+
+    names = get_op_names(out)
+    print(names)
+    assert not any(n.startswith('pow_') for n in names)
+    assert names.count('div_float_float') == 1  # Reciprocal of x ** -2
+    assert 'sqrt_float' in names
+
+    tg = cp.Target()
+    tg.compile(out)
+    for val in [0.5, 1.0, 1.5, 2.0]:
+        tg.write_value(x, val)
+        tg.run()
+        ref = [val / 4, val / 3, val ** 0.5, val ** 3, val ** -2, val ** 13]
+        assert tg.read_value(out) == pytest.approx(ref, rel=1e-5)  # pyright: ignore[reportUnknownMemberType]
+
+
+def test_no_strength_reduction():
+    x = cp.value(9)
+    ir = cpb.ir_simplify(cpb.lower_dag([Store(x // 3), Store(x % 3)]), strength_reduction=False)
+    names = [ir.get_name(i) for i in range(len(ir))]
+    assert 'floordiv_int_int' in names and 'mod_int_int' in names
+
+
+if __name__ == "__main__":
+    test_int_division()
+    test_float_division_and_pow()
+    test_no_strength_reduction()
@@ -0,0 +1,58 @@
+import copapy as cp
+import pytest
+
+
+def test_target_pool():
+    targets: list[cp.Target] = []
+    inputs: list[cp.value[float]] = []
+    outputs: list[cp.value[float]] = []
+    for k in range(12):
+        x = cp.value(float(k))
+        y = cp.sin(x) * 2.0 + x
+        tg = cp.Target()
+        tg.compile(y)
+        targets.append(tg)
+        inputs.append(x)
+        outputs.append(y)
+
+    u = cp.value(0.0)
+    v = cp.sin(u) * 2.0 + u
+    tg_inst = cp.Target()
+    tg_inst.compile(v)
+    instances = tg_inst.create_instances(5)
+    for i in range(instances.n):
+        instances.write_value(i, u, i * 0.25)
+    with pytest.raises(ValueError):
+        cp.TargetPool([tg_inst, instances])
+
+    for threads in (1, 3, 8):
+        with cp.TargetPool(targets + [instances], threads) as pool:
+            assert pool.threads == threads
+            for step in range(3):
+                for k, (tg, x) in enumerate(zip(targets, inputs)):
+                    tg.write_value(x, k + step * 0.5)
+                pool.step_all()
+                for k, (tg, y) in enumerate(zip(targets, outputs)):
+                    ref = k + step * 0.5
+                    assert tg.read_value(y) == pytest.approx(cp.sin(ref) * 2.0 + ref)  # pyright: ignore[reportUnknownMemberType]
+                for i in range(instances.n):
+                    assert instances.read_value(i, v) == pytest.approx(cp.sin(i * 0.25) * 2.0 + i * 0.25)  # pyright: ignore[reportUnknownMemberType]
+
+
+def test_target_pool_errors():
+    a = cp.value(1.0)
+    tg = cp.Target()
+    tg.compile(a * 2.0)
+
+    with cp.TargetPool([tg, cp.Target()], threads=2) as pool:
+        with pytest.raises(RuntimeError):
+            pool.step_all()
+
+        # The pool is still usable after an error
+        with pytest.raises(RuntimeError):
+            pool.step_all()
+
+
+if __name__ == "__main__":
+    test_target_pool()
+    test_target_pool_errors()
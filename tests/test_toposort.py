@@ -0,0 +1,83 @@
+import copapy as cp
+import copapy.backend as cpb
+from copapy.backend import Store
+from collections import defaultdict, deque
+import random
+import time
+
+
+def reference_toposort(edges: list[tuple[int, int]]) -> list[int]:
+    # Former implementation, that re-sorts the queue on each step
+    adj: defaultdict[int, list[int]] = defaultdict(list)
+    indeg: defaultdict[int, int] = defaultdict(int)
+    order: dict[int, int] = {}
+
+    pos = 0
+    for u, v in edges:
+        if u not in order:
+            order[u] = pos
+            pos += 1
+        if v not in order:
+            order[v] = pos
+            pos += 1
+        adj[u].append(v)
+        indeg[v] += 1
+        indeg.setdefault(u, 0)
+
+    queue = deque(sorted([n for n in indeg if indeg[n] == 0], key=lambda x: order[x]))
+    result: list[int] = []
+    while queue:
+        node = queue.popleft()
+        result.append(node)
+        for nei in adj[node]:
+            indeg[nei] -= 1
+            if indeg[nei] == 0:
+                queue.append(nei)
+        queue = deque(sorted(queue, key=lambda x: order[x]))
+
+    return result
+
+
+def test_toposort_matches_reference():
+    rnd = random.Random(42)
+    for _ in range(20):
+        n = rnd.randint(2, 200)
+        labels = list(range(n))
+        rnd.shuffle(labels)
+        edges = [(labels[u], labels[v]) for v in range(1, n) for u in rnd.sample(range(v), rnd.randint(1, min(v, 3)))]
+        rnd.shuffle(edges)
+
+        assert cpb.stable_toposort(edges) == reference_toposort(edges)  # type: ignore
+
+
+def test_toposort_dag():
+    t1 = cp.vector([10, 11] * 128) + cp.vector(cp.value(v) for v in range(256))
+    t2 = ((t1 * 2) * t1).magnitude()
+    edges = list(cpb.get_all_dag_edges([Store(t2)]))
+
+    ordered_ops = cpb.stable_toposort(edges)
+    position = {node: i for i, node in enumerate(ordered_ops)}
+
+    assert len(ordered_ops) == len({n for e in edges for n in e})
+    assert all(position[u] < position[v] for u, v in edges)
+
+
+def test_toposort_wide_graph():
+    n = 100000
+    edges = [(i, n + i % 1000) for i in range(n)]
+
+    t0 = time.perf_counter()
+    ordered = cpb.stable_toposort(edges)  # type: ignore
+    elapsed = time.perf_counter() - t0
+    print(f"toposort time for {n} nodes: {elapsed:.3f}s")
+
+    assert len(ordered) == n + 1000
+    # Each sink is emitted directly after its last predecessor
+    assert ordered[:n - 999] == list(range(n - 999))
+    assert ordered[n - 999:n - 995] == [n, n - 999, n + 1, n - 998]
+
+
+if __name__ == "__main__":
+    test_toposort_matches_reference()
+    test_toposort_dag()
+    test_toposort_wide_graph()
@@ -206,4 +206,8 @@ if [[ "$ARCH" == "arm-v7m-thumb" || "$ARCH" == "all" ]]; then
         src/coparun/coparun.c \
         src/coparun/mem_man.c \
         -o build/runner/coparun-armv7thumb
-fi
\ No newline at end of file
+fi
+#######################################
+# Stencil indexes
+#######################################
+python3 tools/build_stencil_index.py $DEST/stencils_*.o
@@ -0,0 +1,20 @@
+from copapy._stencils import stencil_database
+import argparse
+import os
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Create binary stencil indexes for stencil object files")
+    parser.add_argument("obj_files", nargs="+", help="Stencil object files (.o)")
+    args = parser.parse_args()
+
+    for obj_file in args.obj_files:
+        index_file = os.path.splitext(obj_file)[0] + '.idx'
+        index_data = stencil_database(obj_file).to_index()
+        with open(index_file, 'wb') as f:
+            f.write(index_data)
+        print(f"{index_file}: {len(index_data)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -108,6 +108,19 @@ if __name__ == "__main__":
             patch_hi21(program_data, offs, value // scale + data_section_offset // scale, byteorder)
             print(f"PATCH_OBJECT_HI31 patch_offs=0x{offs:x} mask=0x{mask:x} scale=0x{scale:x} value=0x{value + data_section_offset:x}")
             print(f" | calculated value: 0x{(value // scale + data_section_offset // scale):x}")
+        elif com == Command.PATCH_TABLE:
+            patch_type, mask, scale, entries = dr.read_patch_table()
+            print(f"PATCH_TABLE type={patch_type.name} mask=0x{mask:x} scale=0x{scale:x} count={len(entries)}")
+            for offs, value in entries:
+                if patch_type == Command.PATCH_FUNC:
+                    patch(program_data, offs, mask, value // scale, byteorder)
+                elif patch_type == Command.PATCH_OBJECT:
+                    patch(program_data, offs, mask, value // scale + data_section_offset // scale, byteorder)
+                elif patch_type == Command.PATCH_OBJECT_HI21:
+                    patch_hi21(program_data, offs, value // scale + data_section_offset // scale, byteorder)
+                else:
+                    assert False, f"Unsupported patch type in table: {patch_type}"
+                print(f" | patch_offs=0x{offs:x} value=0x{value:x}")
         elif com == Command.ENTRY_POINT:
             rel_entr_point = dr.read_int()
             print(f"ENTRY_POINT rel_entr_point=0x{rel_entr_point:x}")